@@ -0,0 +1,413 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术助手基准测试
+run：在合成语料上计时各场景并记录峰值内存，结果写入 JSON
+compare：与基线结果对比，标记性能回退
+"""
+
+import os
+import re
+import sys
+import json
+import time
+import platform
+import argparse
+import tempfile
+import tracemalloc
+from datetime import datetime
+from statistics import median
+from typing import Callable, Dict, List, Tuple
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCH_DIR)
+sys.path.insert(0, os.path.join(BENCH_DIR, '..'))
+
+import corpus  # noqa: E402
+from bibtex_parser import BibEntry, BibTeXParser  # noqa: E402
+from bib_dedup import DuplicateFinder  # noqa: E402
+from bib_watch import BibWatcher  # noqa: E402
+from citation_styles import STYLES  # noqa: E402
+from format_reference import ReferenceFormatter  # noqa: E402
+from thesis_timeline import ThesisPlanner  # noqa: E402
+import run as run_py  # noqa: E402
+
+
+class Corpus:
+    """一次运行共享的合成语料"""
+
+    def __init__(self, size: int, seed: int, workdir: str):
+        self.size = size
+        self.bib_text = ''.join(corpus.iter_bib(size, seed))
+        self.bib_path = os.path.join(workdir, f'corpus_{size}.bib')
+        with open(self.bib_path, 'w', encoding='utf-8') as f:
+            f.write(self.bib_text)
+        self.ref_lines = list(corpus.iter_reference_lines(size, seed))
+        parser = BibTeXParser()
+        self.raw_entries = list(parser._scan_entries(self.bib_text.encode('utf-8').splitlines(True)))
+        self.entries = parser.parse_string(self.bib_text)
+        # 回归检查：含 \% 与 %20 的字段值不能导致条目丢失
+        if len(self.entries) != size or parser.errors:
+            raise ValueError(f"语料解析结果异常：生成 {size} 条，解析出 {len(self.entries)} 条"
+                             + (f"（{parser.errors[0]}）" if parser.errors else ''))
+
+
+# 场景名 -> 准备函数；准备函数返回 (被计时的函数, 处理的条目数)
+SCENARIOS: Dict[str, Callable[[Corpus], Tuple[Callable[[], object], int]]] = {}
+
+
+def scenario(name: str):
+    def register(setup):
+        SCENARIOS[name] = setup
+        return setup
+    return register
+
+
+@scenario('parse_string')
+def _parse_string(c: Corpus):
+    return (lambda: BibTeXParser().parse_string(c.bib_text)), c.size
+
+
+@scenario('iter_entries')
+def _iter_entries(c: Corpus):
+    return (lambda: sum(1 for _ in BibTeXParser().iter_entries(c.bib_path))), c.size
+
+
+@scenario('parse_fields')
+def _parse_fields(c: Corpus):
+    parser = BibTeXParser()
+    bodies = [body.partition(',')[2] for _, body in c.raw_entries]
+
+    def run():
+        for fields_str in bodies:
+            parser._parse_fields(fields_str)
+    return run, len(bodies)
+
+
+# user-002 之前 _parse_fields 使用的正则，只作开销对照：它遇到第一个 } 即截断取值，结果并不正确
+LEGACY_FIELD_RE = re.compile(r'(\w+)\s*=\s*(?:\{([^}]*)\}|"([^"]*)"|(\d+)|([\w:/.-]+))', re.DOTALL)
+
+
+@scenario('parse_fields_regex')
+def _parse_fields_regex(c: Corpus):
+    bodies = [body.partition(',')[2] for _, body in c.raw_entries]
+
+    def run():
+        for fields_str in bodies:
+            fields = {}
+            for match in LEGACY_FIELD_RE.findall(fields_str):
+                value = match[1] or match[2] or match[3] or match[4] or ''
+                fields[match[0].lower()] = ' '.join(value.split())
+    return run, len(bodies)
+
+
+@scenario('scan_fields')
+def _scan_fields(c: Corpus):
+    # 不走快速路径，所有条目都由括号深度扫描器处理
+    parser = BibTeXParser()
+    bodies = [body.partition(',')[2] for _, body in c.raw_entries]
+
+    def run():
+        for fields_str in bodies:
+            parser._scan_fields(fields_str)
+    return run, len(bodies)
+
+
+def _format_file(jobs: int):
+    """bibtex_parser.py --jobs：解析并格式化整个文件；进程池启动开销计入耗时"""
+    def setup(c: Corpus):
+        return (lambda: sum(1 for _ in BibTeXParser().format_file(c.bib_path, jobs=jobs))), c.size
+    return setup
+
+
+# 不同进程数下的扩展性（N 为本机 CPU 数）
+for _jobs in sorted({1, 2, 4, os.cpu_count() or 1}):
+    scenario(f'format_file_j{_jobs}')(_format_file(_jobs))
+
+
+def _entries(slotted: bool):
+    """
+    解析结果的条目表示：BibEntry，或 user-005 之前每条一个字典（字段名与 type/citekey 都是字典键）
+    两者解析相同的字段，比较的是峰值内存（每条字节数）
+    """
+    def setup(c: Corpus):
+        parser = BibTeXParser()
+        raw = [(entry_type.lower(), body.partition(',')) for entry_type, body in c.raw_entries]
+
+        def run():
+            entries = []
+            for entry_type, (citekey, _, fields_str) in raw:
+                fields = parser._parse_fields(fields_str)
+                if slotted:
+                    entries.append(BibEntry(entry_type, citekey.strip(), fields))
+                else:
+                    fields['type'] = entry_type
+                    fields['citekey'] = citekey.strip()
+                    entries.append(fields)
+            return entries
+        return run, len(raw)
+    return setup
+
+
+scenario('entries_dict')(_entries(False))
+scenario('entries_slotted')(_entries(True))
+
+
+@scenario('format_all')
+def _format_all(c: Corpus):
+    def run():
+        # 每次使用新的解析器，避免作者缓存跨轮次预热
+        parser = BibTeXParser()
+        parser.entries = c.entries
+        return parser.format_all()
+    return run, len(c.entries)
+
+
+def _render(style_name: str):
+    """只计著录模板的渲染：作者串预先格式化，不含作者解析"""
+    def setup(c: Corpus):
+        style = STYLES[style_name]
+        parser = BibTeXParser(style=style_name)
+        rows = [(entry, parser._format_author(entry.get('author', '')), entry.get('title', '').strip() or '无标题')
+                for entry in c.entries]
+
+        def run():
+            render = style.render
+            for entry, author, title in rows:
+                render(entry, author, title)
+        return run, len(rows)
+    return setup
+
+
+for _style in STYLES:
+    scenario(f'render_{_style}')(_render(_style))
+
+
+@scenario('sort_author_year')
+def _sort_author_year(c: Corpus):
+    # 每次使用新的解析器，排序键与作者拆分都从零开始计算
+    return (lambda: BibTeXParser().sort_entries(c.entries)), len(c.entries)
+
+
+@scenario('watch_edit')
+def _watch_edit(c: Corpus):
+    # 监视模式下保存一次（改动文库中间一个条目的标题）到输出文件更新完毕；初次全量渲染不计时
+    path = os.path.join(os.path.dirname(c.bib_path), 'watch.bib')
+    pos = c.bib_text.find('title', len(c.bib_text) // 2)
+    versions = [c.bib_text[:pos + 9] + 'X' + c.bib_text[pos + 9:], c.bib_text]
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(c.bib_text)
+    watcher = BibWatcher(path, path + '.txt')
+    watcher.refresh()
+
+    def run():
+        for text in versions:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(text)
+            watcher.refresh()
+    return run, len(versions)
+
+
+@scenario('dedup')
+def _dedup(c: Corpus):
+    # 合成语料中标题重复度很高，可同时覆盖精确分桶与 LSH 两个阶段
+    return (lambda: DuplicateFinder().add_all(c.entries).clusters()), len(c.entries)
+
+
+@scenario('format_reference')
+def _format_reference(c: Corpus):
+    formatter = ReferenceFormatter()
+
+    def run():
+        for line in c.ref_lines:
+            formatter.format_reference(line)
+    return run, len(c.ref_lines)
+
+
+def _format_lines(jobs: int):
+    """format_reference.py --file 的批量模式；进程池启动开销计入耗时"""
+    def setup(c: Corpus):
+        formatter = ReferenceFormatter()
+
+        def run():
+            for _ in formatter.format_lines(c.ref_lines, jobs=jobs):
+                pass
+        return run, len(c.ref_lines)
+    return setup
+
+
+# 不同进程数下的扩展性
+for _jobs in (1, 2, 4, 8):
+    scenario(f'format_lines_j{_jobs}')(_format_lines(_jobs))
+
+
+# run.py 每条命令的调用延迟：进程内调用与 --isolated 子进程对照
+RUN_CALLS = 10
+
+
+def _run_command(command: str, isolated: bool):
+    def setup(c: Corpus):
+        small = os.path.join(os.path.dirname(c.bib_path), 'run_small.bib')
+        with open(small, 'w', encoding='utf-8') as f:
+            f.write(''.join(corpus.iter_bib(20)))
+        date = f"{datetime.now().year + 1}-06-15"
+        call = {
+            'ref': lambda: run_py.format_reference(c.ref_lines[0], isolated=isolated),
+            'bib': lambda: run_py.parse_bibtex(small, isolated=isolated),
+            'plan': lambda: run_py.plan_thesis(date, 'master', isolated=isolated),
+        }[command]
+
+        def run():
+            for _ in range(RUN_CALLS):
+                call()
+        return run, RUN_CALLS
+    return setup
+
+
+for _command in ('ref', 'bib', 'plan'):
+    scenario(f'run_{_command}_inprocess')(_run_command(_command, False))
+    scenario(f'run_{_command}_isolated')(_run_command(_command, True))
+
+
+@scenario('parse_reference')
+def _parse_reference(c: Corpus):
+    formatter = ReferenceFormatter()
+
+    def run():
+        for line in c.ref_lines:
+            formatter._parse_text(line)
+    return run, len(c.ref_lines)
+
+
+@scenario('generate_plan')
+def _generate_plan(c: Corpus):
+    planner = ThesisPlanner(datetime(datetime.now().year + 1, 6, 15), 'master')
+    rounds = 1000
+
+    def run():
+        for _ in range(rounds):
+            planner.generate_plan()
+    return run, rounds
+
+
+def measure(fn: Callable[[], object], repeat: int) -> Dict:
+    """计时 repeat 轮，另跑一轮统计峰值内存"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    try:
+        fn()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+    return {'seconds': median(timings), 'min_seconds': min(timings), 'peak_bytes': peak}
+
+
+def run_benchmarks(size: int, seed: int, repeat: int, only: List[str]) -> Dict:
+    names = only or list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        raise ValueError(f"未知场景：{', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        c = Corpus(size, seed, workdir)
+        for name in names:
+            fn, items = SCENARIOS[name](c)
+            result = measure(fn, repeat)
+            result['items'] = items
+            result['items_per_second'] = items / result['seconds'] if result['seconds'] else 0.0
+            result['peak_bytes_per_item'] = result['peak_bytes'] / items if items else 0.0
+            results[name] = result
+            print(f"  {name:<18} {result['seconds'] * 1000:10.1f} ms  "
+                  f"{result['items_per_second']:12.0f} 条/秒  峰值 {result['peak_bytes'] / 1024:10.0f} KB"
+                  f"（{result['peak_bytes_per_item']:.0f} 字节/条）")
+
+    return {
+        'meta': {
+            'size': size,
+            'seed': seed,
+            'repeat': repeat,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float, mem_threshold: float) -> List[str]:
+    """对比两次结果，打印对照表并返回发生回退的场景"""
+    if baseline['meta'].get('size') != current['meta'].get('size'):
+        print("⚠️ 两次运行的语料规模不同，对比结果仅供参考")
+
+    regressions = []
+    print(f"  {'场景':<16} {'基线 ms':>10} {'当前 ms':>10} {'耗时比':>8} {'内存比':>8}")
+    for name, cur in current['results'].items():
+        base = baseline['results'].get(name)
+        if not base:
+            print(f"  {name:<18} {'-':>10} {cur['seconds'] * 1000:10.1f}   （基线中无此场景）")
+            continue
+        time_ratio = cur['seconds'] / base['seconds'] if base['seconds'] else 1.0
+        mem_ratio = cur['peak_bytes'] / base['peak_bytes'] if base['peak_bytes'] else 1.0
+        flag = ''
+        if time_ratio > 1 + threshold or mem_ratio > 1 + mem_threshold:
+            flag = '  ❌ 回退'
+            regressions.append(name)
+        elif time_ratio < 1 - threshold:
+            flag = '  ✅ 提升'
+        print(f"  {name:<18} {base['seconds'] * 1000:10.1f} {cur['seconds'] * 1000:10.1f} "
+              f"{time_ratio:8.2f} {mem_ratio:8.2f}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='学术助手基准测试')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run_p = sub.add_parser('run', help='运行基准测试')
+    run_p.add_argument('--size', '-n', type=int, default=10000, help='语料规模（条目数）')
+    run_p.add_argument('--seed', type=int, default=42, help='随机种子')
+    run_p.add_argument('--repeat', '-r', type=int, default=5, help='每个场景计时轮数')
+    run_p.add_argument('--only', nargs='*', default=[], help=f"只运行指定场景：{', '.join(SCENARIOS)}")
+    run_p.add_argument('--output', '-o', type=str, help='结果 JSON 输出路径')
+
+    cmp_p = sub.add_parser('compare', help='与基线结果对比')
+    cmp_p.add_argument('baseline', type=str, help='基线结果 JSON')
+    cmp_p.add_argument('current', type=str, help='当前结果 JSON')
+    cmp_p.add_argument('--threshold', type=float, default=0.10, help='允许的耗时相对增长（默认 0.10）')
+    cmp_p.add_argument('--mem-threshold', type=float, default=0.25, help='允许的峰值内存相对增长（默认 0.25）')
+
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        print(f"📊 语料规模 {args.size}，每场景 {args.repeat} 轮")
+        try:
+            report = run_benchmarks(args.size, args.seed, args.repeat, args.only)
+        except ValueError as e:
+            print(f"错误：{e}")
+            sys.exit(1)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"✅ 已保存到：{args.output}")
+    else:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.current, 'r', encoding='utf-8') as f:
+            current = json.load(f)
+        regressions = compare(baseline, current, args.threshold, args.mem_threshold)
+        if regressions:
+            print(f"\n❌ 发现性能回退：{', '.join(regressions)}")
+            sys.exit(1)
+        print("\n✅ 未发现性能回退")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+基准测试用合成语料生成器
+同一 seed 与规模总是生成相同的内容，可生成 1k ~ 1M 条目的 .bib 文件与自由文本文献行
+"""
+
+import random
+import argparse
+from typing import Iterator, TextIO
+
+CN_SURNAMES = ['张', '王', '李', '赵', '刘', '陈', '杨', '黄', '周', '吴', '徐', '孙', '马', '朱', '胡', '郭']
+CN_GIVEN = ['伟', '芳', '娜', '敏', '静', '强', '磊', '军', '洋', '勇', '艳', '杰', '涛', '明', '超', '霞']
+EN_FIRST = ['Ashish', 'Noam', 'Niki', 'Jakob', 'Llion', 'Aidan', 'Lukasz', 'Illia', 'Kaiming',
+            'Xiangyu', 'Shaoqing', 'Jian', 'Geoffrey', 'Yoshua', 'Yann', 'Ian']
+EN_LAST = ['Vaswani', 'Shazeer', 'Parmar', 'Uszkoreit', 'Jones', 'Gomez', 'Kaiser', 'Polosukhin',
+           'He', 'Zhang', 'Ren', 'Sun', 'Hinton', 'Bengio', 'LeCun', 'Goodfellow']
+CN_JOURNALS = ['计算机学报', '软件学报', '自动化学报', '电子学报', '中国科学：信息科学', '计算机研究与发展']
+EN_JOURNALS = ['Advances in Neural Information Processing Systems', 'Nature',
+               'IEEE Transactions on Pattern Analysis and Machine Intelligence',
+               'Journal of Machine Learning Research', 'Neural Computation']
+CN_WORDS = ['深度学习', '图像识别', '自然语言处理', '强化学习', '知识图谱', '联邦学习', '目标检测', '推荐系统']
+EN_WORDS = ['Attention', 'Residual', 'Learning', 'Networks', 'Transformers', 'Graph', 'Vision',
+            'Language', 'Models', 'Scaling', 'Efficient', 'Robust']
+PUBLISHERS = [('北京', '清华大学出版社'), ('北京', '科学出版社'), ('Cambridge', 'MIT Press'),
+              ('New York', 'Springer')]
+SCHOOLS = [('北京', '清华大学'), ('北京', '北京大学'), ('上海', '复旦大学'), ('杭州', '浙江大学')]
+
+ENTRY_TYPES = ['article'] * 5 + ['inproceedings'] * 3 + ['book', 'phdthesis', 'mastersthesis', 'misc', 'techreport']
+
+
+def _cn_author(rng: random.Random) -> str:
+    return rng.choice(CN_SURNAMES) + rng.choice(CN_GIVEN) + (rng.choice(CN_GIVEN) if rng.random() < 0.5 else '')
+
+
+def _en_author(rng: random.Random) -> str:
+    if rng.random() < 0.5:
+        return f"{rng.choice(EN_LAST)}, {rng.choice(EN_FIRST)}"
+    return f"{rng.choice(EN_FIRST)} {rng.choice(EN_LAST)}"
+
+
+def _title(rng: random.Random, chinese: bool) -> str:
+    if chinese:
+        return '基于' + ''.join(rng.sample(CN_WORDS, 2)) + '的研究'
+    words = rng.sample(EN_WORDS, rng.randint(3, 6))
+    if rng.random() < 0.3:
+        # 保护大小写的嵌套括号
+        words[rng.randrange(len(words))] = '{' + rng.choice(['GPU', 'BERT', 'ImageNet', 'CNN']) + '}'
+    return ' '.join(words)
+
+
+def bib_entry(rng: random.Random, i: int) -> str:
+    """生成第 i 个 BibTeX 条目"""
+    chinese = rng.random() < 0.4
+    entry_type = rng.choice(ENTRY_TYPES)
+    make_author = _cn_author if chinese else _en_author
+    authors = ' and '.join(make_author(rng) for _ in range(rng.randint(1, 6)))
+    year = rng.randint(1990, 2025)
+    title = _title(rng, chinese)
+    if i % 50 == 0:
+        # 转义的 \% 不是注释（回归用例）
+        title += r' with 50\% Fewer Parameters'
+    fields = [('author', authors), ('title', title), ('year', str(year))]
+
+    if entry_type == 'article':
+        journal = rng.choice(CN_JOURNALS if chinese else EN_JOURNALS)
+        start = rng.randint(1, 900)
+        fields += [('journal', journal), ('volume', str(rng.randint(1, 60))),
+                   ('number', str(rng.randint(1, 12))), ('pages', f"{start}--{start + rng.randint(5, 20)}")]
+    elif entry_type == 'inproceedings':
+        fields += [('booktitle', 'Proceedings of the ' + rng.choice(['CVPR', 'ICML', 'NeurIPS', 'ACL']) + f" {year}"),
+                   ('pages', f"{rng.randint(1, 500)}--{rng.randint(501, 900)}")]
+    elif entry_type == 'book':
+        address, publisher = rng.choice(PUBLISHERS)
+        fields += [('publisher', publisher), ('address', address)]
+    elif entry_type in ('phdthesis', 'mastersthesis'):
+        address, school = rng.choice(SCHOOLS)
+        fields += [('school', school), ('address', address)]
+    elif entry_type == 'misc':
+        # URL 中的 %20 不是注释（回归用例）
+        fields += [('url', f"https://example.org/paper/{i}?q=deep%20learning"), ('urldate', f"{year}-01-01")]
+    else:
+        fields += [('institution', rng.choice(SCHOOLS)[1])]
+
+    body = ',\n'.join(f"  {name} = {{{value}}}" for name, value in fields)
+    return f"@{entry_type}{{ref{i},\n{body}\n}}\n\n"
+
+
+def iter_bib(size: int, seed: int = 42) -> Iterator[str]:
+    """逐条产出 BibTeX 条目文本"""
+    rng = random.Random(seed)
+    for i in range(size):
+        yield bib_entry(rng, i)
+
+
+def iter_reference_lines(size: int, seed: int = 42) -> Iterator[str]:
+    """逐行产出 format_reference.py 可解析的自由文本文献"""
+    rng = random.Random(seed)
+    for _ in range(size):
+        if rng.random() < 0.5:
+            authors = '，'.join(_cn_author(rng) for _ in range(rng.randint(1, 4)))
+            kind = rng.random()
+            if kind < 0.6:
+                yield (f"作者：{authors}，标题：{_title(rng, True)}，期刊：{rng.choice(CN_JOURNALS)}，"
+                       f"年份：{rng.randint(1990, 2025)}，卷：{rng.randint(1, 60)}，期：{rng.randint(1, 12)}，"
+                       f"页码：{rng.randint(1, 100)}-{rng.randint(101, 200)}")
+            elif kind < 0.8:
+                address, publisher = rng.choice(PUBLISHERS)
+                yield f"作者：{authors}，标题：{_title(rng, True)}，出版社：{publisher}，年份：{rng.randint(1990, 2025)}"
+            else:
+                address, school = rng.choice(SCHOOLS)
+                yield f"作者：{authors}，标题：{_title(rng, True)}，学校：{school}，年份：{rng.randint(1990, 2025)}"
+        else:
+            authors = ', '.join(f"{rng.choice(EN_FIRST)} {rng.choice(EN_LAST)}" for _ in range(rng.randint(1, 4)))
+            yield (f"Author: {authors}; Title: {_title(rng, False)}; Journal: {rng.choice(EN_JOURNALS)}; "
+                   f"Year: {rng.randint(1990, 2025)}; Volume: {rng.randint(1, 60)}; Pages: {rng.randint(1, 900)}-999")
+
+
+def write_bib(out: TextIO, size: int, seed: int = 42):
+    for entry in iter_bib(size, seed):
+        out.write(entry)
+
+
+def write_reference_lines(out: TextIO, size: int, seed: int = 42):
+    for line in iter_reference_lines(size, seed):
+        out.write(line + '\n')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成基准测试用合成语料')
+    parser.add_argument('--kind', choices=['bib', 'ref'], default='bib', help='bib=BibTeX 文件，ref=自由文本文献行')
+    parser.add_argument('--size', '-n', type=int, default=1000, help='条目/行数（1k ~ 1M）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    parser.add_argument('--output', '-o', type=str, required=True, help='输出文件路径')
+
+    args = parser.parse_args()
+
+    with open(args.output, 'w', encoding='utf-8') as f:
+        if args.kind == 'bib':
+            write_bib(f, args.size, args.seed)
+        else:
+            write_reference_lines(f, args.size, args.seed)
+    print(f"✓ 已生成 {args.size} 条 → {args.output}")
+
+
+if __name__ == '__main__':
+    main()
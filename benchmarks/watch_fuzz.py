@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+监视模式的随机编辑一致性检查
+在合成语料上反复做随机编辑（插入/删除括号、引号、%、换行与 @type{ 等），每次保存后增量刷新，
+并与对同一文件整体运行 format_file() 的输出与警告逐项比较；发现不一致时打印种子与步数并以非零状态退出
+"""
+
+import os
+import sys
+import random
+import argparse
+import tempfile
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(BENCH_DIR, '..', 'scripts'))
+sys.path.insert(0, BENCH_DIR)
+
+import corpus  # noqa: E402
+from bibtex_parser import BibTeXParser  # noqa: E402
+from bib_watch import BibWatcher  # noqa: E402
+
+# 随机插入的片段：覆盖括号配对、引号值、注释、转义与行首重新同步
+FRAGMENTS = ['{', '}', '"', '%', '\\%', ',', '\n', '\n@book{', '@', 'x', ' # ',
+             '\n@string{ieee = {IEEE}}\n', '\n@comment{', 'ieee']
+
+
+def mutate(text: str, rng: random.Random) -> str:
+    """做 1~3 处随机编辑：删除一段字符、插入片段，或改写某行开头"""
+    for _ in range(rng.randint(1, 3)):
+        pos = rng.randrange(len(text) + 1)
+        op = rng.random()
+        if op < 0.3 and text:
+            text = text[:pos] + text[pos + rng.randint(1, 3):]
+        elif op < 0.85:
+            text = text[:pos] + rng.choice(FRAGMENTS) + text[pos:]
+        else:
+            # 行首的 @type{ 改成不能重新同步的写法（@book"{ 等），或反过来
+            start = text.rfind('\n', 0, pos) + 1
+            if text.startswith('@', start):
+                brace = text.find('{', start)
+                if brace != -1:
+                    text = text[:brace] + '"' + text[brace:]
+            else:
+                text = text[:start] + '@misc{' + text[start:]
+    return text
+
+
+def expected(path: str):
+    parser = BibTeXParser()
+    lines = [line + '\n' for line in parser.format_file(path)]
+    return ''.join(lines), parser.errors
+
+
+def check(seed: int, size: int, steps: int, workdir: str) -> bool:
+    rng = random.Random(seed)
+    text = ''.join(corpus.iter_bib(size, seed))
+    path = os.path.join(workdir, f'fuzz_{seed}.bib')
+    output = path + '.txt'
+    for name in (path, output):
+        if os.path.exists(name):
+            os.remove(name)
+    watcher = BibWatcher(path, output)
+    for step in range(steps + 1):
+        if step:
+            text = mutate(text, rng)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(text)
+        watcher.refresh()
+        with open(output, 'rb') as f:
+            actual = f.read().decode('utf-8', 'replace')
+        want, errors = expected(path)
+        if actual != want or watcher.errors() != errors:
+            what = '输出' if actual != want else '警告'
+            print(f"❌ 种子 {seed} 第 {step} 步：{what}与 format_file() 不一致（文件：{path}）")
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description='监视模式的随机编辑一致性检查')
+    parser.add_argument('--seeds', type=int, default=5, help='随机种子数（默认 5）')
+    parser.add_argument('--size', type=int, default=60, help='每个语料的条目数（默认 60）')
+    parser.add_argument('--steps', type=int, default=200, help='每个种子的编辑次数（默认 200）')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='watch_fuzz_')
+    failed = [seed for seed in range(args.seeds) if not check(seed, args.size, args.steps, workdir)]
+    if failed:
+        sys.exit(1)
+    print(f"✅ {args.seeds} 个种子 × {args.steps} 次编辑，输出与警告均与 format_file() 一致")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,9 +7,18 @@
 
 import os
 import sys
+import json
+import time
 import subprocess
 import argparse
 
+SCRIPT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'scripts')
+sys.path.insert(0, SCRIPT_DIR)
+
+from format_reference import ReferenceFormatter  # noqa: E402
+from bibtex_parser import AuthorNormalizer, BibTeXParser  # noqa: E402
+from thesis_timeline import ThesisPlanner, parse_date  # noqa: E402
+
 
 def print_banner():
     print("=" * 60)
@@ -18,33 +27,130 @@ def print_banner():
     print()
 
 
+class Result:
+    """运行结果：stdout 为可直接打印的文本，stderr 为错误信息，data 为结构化数据"""
+    
+    __slots__ = ('stdout', 'stderr', 'data')
+    
+    def __init__(self, stdout: str = '', stderr: str = '', data=None):
+        self.stdout = stdout
+        self.stderr = stderr
+        self.data = data
+
+
+# 进程内复用的实例，交互模式下多次调用无需重复初始化
+_formatter = ReferenceFormatter()
+_authors = AuthorNormalizer()
+
+
 def run_script(cmd):
-    """运行脚本并返回结果"""
+    """在子进程中运行脚本（隔离模式），返回文本结果"""
     result = subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, universal_newlines=True)
-    return result
+    return Result(result.stdout, result.stderr)
 
 
-def format_reference(text):
+def format_reference(text, isolated=False):
     """单篇文献格式化"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cmd = [sys.executable, os.path.join(script_dir, 'scripts/format_reference.py'), '-i', text]
-    return run_script(cmd)
+    if isolated:
+        return run_script([sys.executable, os.path.join(SCRIPT_DIR, 'format_reference.py'), '-i', text])
+    
+    formatted = _formatter.format_reference(text)
+    return Result(formatted + '\n', data={'reference': formatted})
 
 
-def parse_bibtex(filepath, output=None):
-    """BibTeX 批量解析"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cmd = [sys.executable, os.path.join(script_dir, 'scripts/bibtex_parser.py'), '-i', filepath]
+def parse_bibtex(filepath, output=None, isolated=False, profile=None):
+    """
+    BibTeX 批量解析
+    profile 为 '' 时在输出中附带分阶段耗时，为路径时写入 JSON 文件
+    """
+    if isolated:
+        cmd = [sys.executable, os.path.join(SCRIPT_DIR, 'bibtex_parser.py'), '-i', filepath]
+        if output:
+            cmd.extend(['-o', output])
+        if profile is not None:
+            cmd.extend(['--profile', profile] if profile else ['--profile'])
+        return run_script(cmd)
+    
+    parser = BibTeXParser(use_cache=True, profile=profile is not None)
+    parser.authors = _authors
+    results = list(parser.format_file(filepath))
+    data = {
+        'results': results,
+        'stats': dict(parser.stats),
+        'errors': list(parser.get_errors()),
+        'summary': parser.get_stats_summary(),
+    }
+    if parser.profiler is not None:
+        data['profile'] = parser.profiler.snapshot()
+    
+    lines = []
+    if not results:
+        lines.append("❌ 未找到任何 BibTeX 条目")
+        lines.extend(f"  {err}" for err in data['errors'])
+        return Result('\n'.join(lines) + '\n', data=data)
+    
     if output:
-        cmd.extend(['-o', output])
-    return run_script(cmd)
+        with open(output, 'w', encoding='utf-8') as f:
+            for result in results:
+                f.write(result + '\n')
+        lines.append(f"✅ 已保存到：{output}")
+    else:
+        lines.extend(results)
+    
+    lines.append(f"\n📊 {data['summary']}")
+    if data['errors']:
+        lines.append("\n⚠️ 警告信息：")
+        lines.extend(f"  {err}" for err in data['errors'])
+    if profile:
+        with open(profile, 'w', encoding='utf-8') as f:
+            json.dump(data['profile'], f, ensure_ascii=False, indent=2)
+        lines.append(f"\n⏱️ 分阶段耗时已保存到：{profile}")
+    elif profile is not None:
+        lines.append(f"\n{parser.profiler.report()}")
+    return Result('\n'.join(lines) + '\n', data=data)
+
 
+def watch_bibtex(filepath, output=None, interval=0.2, debounce=0.1):
+    """
+    监视 .bib 文件，保存后增量更新输出文件（只重新解析改动的条目），Ctrl+C 退出
+    未指定 output 时写入与 .bib 同名的 .txt
+    """
+    from bib_watch import BibWatcher, watch
+    
+    output = output or os.path.splitext(filepath)[0] + '.txt'
+    parser = BibTeXParser()
+    parser.authors = _authors
+    watcher = BibWatcher(filepath, output, parser)
+    stats = watcher.refresh()
+    if stats is None:
+        print(f"❌ 无法读取：{filepath}")
+        return
+    print(f"✅ 已生成：{output}（{stats['total']} 篇，用时 {stats['seconds'] * 1000:.0f} ms）")
+    print(f"👀 正在监视 {filepath}，保存后自动更新（Ctrl+C 退出）")
+    
+    def on_update(watcher, stats):
+        errors = watcher.errors()
+        print(f"🔄 {time.strftime('%H:%M:%S')} 重新解析 {stats['parsed']} 篇，共 {stats['total']} 篇，"
+              f"用时 {stats['seconds'] * 1000:.1f} ms" + (f"，⚠️ {len(errors)} 条警告" if errors else ''))
+    
+    try:
+        watch([watcher], interval, debounce, on_update)
+    except KeyboardInterrupt:
+        print("\n👋 已停止监视")
 
-def plan_thesis(date, thesis_type='undergraduate'):
+
+def plan_thesis(date, thesis_type='undergraduate', isolated=False):
     """毕设时间规划"""
-    script_dir = os.path.dirname(os.path.abspath(__file__))
-    cmd = [sys.executable, os.path.join(script_dir, 'scripts/thesis_timeline.py'), '-d', date, '-t', thesis_type]
-    return run_script(cmd)
+    if isolated:
+        return run_script([sys.executable, os.path.join(SCRIPT_DIR, 'thesis_timeline.py'),
+                           '-d', date, '-t', thesis_type])
+    
+    try:
+        planner = ThesisPlanner(parse_date(date), thesis_type)
+        plan = planner.generate_plan()
+    except Exception as e:
+        return Result(f"错误：{e}\n", data={'error': str(e)})
+    return Result(plan + '\n', data={'plan': plan, 'stages': planner.calculate_stages()})
 
 
 def main():
@@ -55,18 +161,35 @@ def main():
     parser.add_argument('--input', '-i', type=str, help='输入文件/文本')
     parser.add_argument('--output', '-o', type=str, help='输出文件路径')
     parser.add_argument('--type', '-t', type=str, default='undergraduate', help='论文类型（plan 模式用）')
+    parser.add_argument('--isolated', action='store_true', help='在独立子进程中运行各脚本（隔离模式）')
+    parser.add_argument('--profile', nargs='?', const='', metavar='JSON',
+                       help='输出 BibTeX 解析的分阶段耗时；指定路径时写入 JSON 文件（bib 模式用）')
+    parser.add_argument('--watch', action='store_true', help='监视 .bib 文件，保存后增量更新输出文件（bib 模式用）')
+    parser.add_argument('--interval', type=float, default=0.2, help='监视时的轮询间隔秒数（watch 模式用）')
+    parser.add_argument('--serve', action='store_true', help='以常驻服务方式运行（本地 HTTP / Unix 套接字）')
+    parser.add_argument('--host', type=str, default='127.0.0.1', help='服务监听地址（serve 模式用）')
+    parser.add_argument('--port', type=int, default=8765, help='服务监听端口（serve 模式用）')
+    parser.add_argument('--socket', type=str, help='改为监听 Unix 套接字路径（serve 模式用）')
+    parser.add_argument('--jobs', '-j', type=int, default=2, help='工作进程数（serve 模式用）')
+    parser.add_argument('--max-pending', type=int, default=64, help='最大在途请求数，超出返回 503（serve 模式用）')
     
     args = parser.parse_args()
     
     print_banner()
     
+    # 常驻服务模式
+    if args.serve:
+        from assistant_server import serve
+        serve(args.host, args.port, args.socket, jobs=args.jobs, max_pending=args.max_pending)
+        return
+    
     # 命令行模式
     if args.mode and args.mode != 'auto':
         if args.mode == 'ref':
             if not args.input:
                 print("❌ 请提供文献信息：-i '作者：张三，标题：...'")
                 return
-            result = format_reference(args.input)
+            result = format_reference(args.input, isolated=args.isolated)
             print(result.stdout)
             if result.stderr:
                 print(f"⚠️  {result.stderr}")
@@ -75,7 +198,10 @@ def main():
             if not args.input:
                 print("❌ 请提供 .bib 文件路径：-i references.bib")
                 return
-            result = parse_bibtex(args.input, args.output)
+            if args.watch:
+                watch_bibtex(args.input, args.output, interval=args.interval)
+                return
+            result = parse_bibtex(args.input, args.output, isolated=args.isolated, profile=args.profile)
             print(result.stdout)
             if result.stderr:
                 print(f"⚠️  {result.stderr}")
@@ -84,7 +210,7 @@ def main():
             if not args.input:
                 print("❌ 请提供答辩日期：-i 2026-06-15")
                 return
-            result = plan_thesis(args.input, args.type)
+            result = plan_thesis(args.input, args.type, isolated=args.isolated)
             print(result.stdout)
             if result.stderr:
                 print(f"⚠️  {result.stderr}")
@@ -105,14 +231,14 @@ def main():
         if choice == '1':
             text = input("请输入文献信息：").strip()
             if text:
-                result = format_reference(text)
+                result = format_reference(text, isolated=args.isolated)
                 print("\n" + result.stdout)
         
         elif choice == '2':
             filepath = input("请输入 .bib 文件路径：").strip()
             if filepath and os.path.exists(filepath):
                 output = input("输出文件路径（可选）：").strip() or None
-                result = parse_bibtex(filepath, output)
+                result = parse_bibtex(filepath, output, isolated=args.isolated, profile=args.profile)
                 print("\n" + result.stdout)
             else:
                 print("❌ 文件不存在")
@@ -122,7 +248,7 @@ def main():
             if date:
                 thesis_type = input("论文类型（1=本科，2=硕士）：").strip()
                 type_arg = 'master' if thesis_type == '2' else 'undergraduate'
-                result = plan_thesis(date, type_arg)
+                result = plan_thesis(date, type_arg, isolated=args.isolated)
                 print("\n" + result.stdout)
         
         elif choice == '0':
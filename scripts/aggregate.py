@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多次运行结果的流式分组汇总（data_visualize.py --aggregate 使用）
+按键列（如 step、method）分组，逐块计算各组的计数、均值与离差平方和，再以 Chan 等人的并行公式
+（Welford 算法的分块形式）合并到累计结果；内存只与分组数有关，与行数无关
+"""
+
+from statistics import NormalDist
+from typing import List, Optional
+
+import numpy as np
+
+
+def t_quantile(q: float, dof: np.ndarray) -> np.ndarray:
+    """
+    Student t 分布的上侧分位数（0.5 < q < 1，逐元素计算，dof < 1 时为 NaN）
+    Hill (1970) 算法 396，相对误差约 1e-6，不依赖 scipy
+    """
+    p = 2 * (1 - q)     # 双侧尾概率
+    n = np.asarray(dof, dtype=np.float64)
+    with np.errstate(all='ignore'):
+        a = 1 / (n - 0.5)
+        b = 48 / (a * a)
+        c = ((20700 * a / b - 98) * a - 16) * a + 96.36
+        d = ((94.5 / (b + c) - 3) / b + 1) * np.sqrt(a * np.pi / 2) * n
+        y = (d * p) ** (2 / n)
+        # 尾部：以正态分位数为起点修正
+        x = NormalDist().inv_cdf(0.5 * p)
+        c_tail = np.where(n < 5, c + 0.3 * (n - 4.5) * (x + 0.6), c)
+        c_tail = (((0.05 * d * x - 5) * x - 7) * x - 2) * x + b + c_tail
+        tail = (((((0.4 * x * x + 6.3) * x * x + 36) * x * x + 94.5) / c_tail - x * x - 3) / b + 1) * x
+        tail = a * tail * tail
+        tail = np.where(tail > 0.002, np.expm1(tail), 0.5 * tail * tail + tail)
+        # 中心：级数展开
+        center = (((1 / (((n + 6) / (n * y) - 0.089 * d - 0.822) * (n + 2) * 3) + 0.5 / (n + 4)) * y - 1)
+                  * (n + 1) / (n + 2) + 1 / y)
+        t = np.sqrt(n * np.where(y > 0.05 + a, tail, center))
+        t = np.where(n == 1, 1 / np.tan(p * np.pi / 2), t)
+        t = np.where(n == 2, np.sqrt(2 / (p * (2 - p)) - 2), t)
+    return np.where(n >= 1, t, np.nan)
+
+
+class GroupAccumulator:
+    """逐块累加 value 列按 keys 分组的计数、均值与离差平方和"""
+
+    def __init__(self, keys: List[str], value: str):
+        self.keys = list(keys)
+        self.value = value
+        self.rows = 0
+        self.state = None   # 以分组键为索引，列为 n、mean、m2
+
+    @property
+    def groups(self) -> int:
+        return 0 if self.state is None else len(self.state)
+
+    def add(self, pd, chunk):
+        """累加一个分块；value 无法转换为数值或键为空的行被忽略"""
+        self.rows += len(chunk)
+        frame = chunk[self.keys].assign(_value=pd.to_numeric(chunk[self.value], errors='coerce'))
+        stats = frame.groupby(self.keys, sort=False)['_value'].agg(['count', 'mean', 'var'])
+        stats = stats[stats['count'] > 0]
+        part = pd.DataFrame({'n': stats['count'].astype(np.float64), 'mean': stats['mean'],
+                             'm2': (stats['var'] * (stats['count'] - 1)).fillna(0.0)})
+        if self.state is None:
+            self.state = part
+            return
+        a, b = self.state.align(part, join='outer', fill_value=0.0)
+        n = a['n'] + b['n']
+        delta = b['mean'] - a['mean']
+        self.state = pd.DataFrame({
+            'n': n,
+            'mean': a['mean'] + delta * b['n'] / n,
+            'm2': a['m2'] + b['m2'] + delta * delta * a['n'] * b['n'] / n,
+        })
+
+    def result(self, pd, confidence: float = 0.95):
+        """
+        返回各组的汇总表：键列、n、mean、std（样本标准差）、sem（标准误）与置信区间 ci_low、ci_high
+        只有一个样本的组 std、sem 与置信区间为 NaN；结果按键排序
+        """
+        if self.state is None:
+            columns = self.keys + ['n', 'mean', 'std', 'sem', 'ci_low', 'ci_high']
+            return pd.DataFrame(columns=columns)
+        state = self.state.sort_index()
+        n = state['n'].to_numpy()
+        mean = state['mean'].to_numpy()
+        with np.errstate(all='ignore'):
+            std = np.sqrt(state['m2'].to_numpy() / (n - 1))
+            std[n < 2] = np.nan
+            sem = std / np.sqrt(n)
+        half = t_quantile((1 + confidence) / 2, n - 1) * sem
+        table = state.index.to_frame(index=False)
+        table['n'] = n.astype(np.int64)
+        table['mean'] = mean
+        table['std'] = std
+        table['sem'] = sem
+        table['ci_low'] = mean - half
+        table['ci_high'] = mean + half
+        return table
+
+
+def plot_bands(ax, table, x: str, groups: List[str], band: str = 'ci', error_bars: bool = False,
+               max_points: int = 0, label: Optional[str] = None):
+    """
+    每个分组画一条均值曲线，以阴影带（或误差棒）表示置信区间（band='ci'）或 ±1 个标准差（band='std'）
+    max_points > 0 且点数更多时对均值曲线做 LTTB 降采样，区间取相同的点
+    """
+    series = table.groupby(groups, sort=True) if groups else [((), table)]
+    for key, part in series:
+        part = part.sort_values(x)
+        xs = part[x].to_numpy()
+        mean = part['mean'].to_numpy()
+        if band == 'std':
+            low, high = mean - part['std'].to_numpy(), mean + part['std'].to_numpy()
+        else:
+            low, high = part['ci_low'].to_numpy(), part['ci_high'].to_numpy()
+        if 0 < max_points < len(xs) and np.issubdtype(xs.dtype, np.number):
+            from downsample import lttb_indices
+            idx = lttb_indices(xs.astype(np.float64), mean, max_points)
+            xs, mean, low, high = xs[idx], mean[idx], low[idx], high[idx]
+        name = ', '.join(map(str, key if isinstance(key, tuple) else (key,))) or label
+        if error_bars:
+            ax.errorbar(xs, mean, yerr=[mean - low, high - mean], capsize=2, linewidth=1, label=name)
+        else:
+            line, = ax.plot(xs, mean, linewidth=1, label=name)
+            ax.fill_between(xs, low, high, color=line.get_color(), alpha=0.2, linewidth=0)
+    if groups:
+        ax.legend()
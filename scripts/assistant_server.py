@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+学术助手常驻服务
+保持格式化器与解析器常驻内存，通过本地 HTTP 或 Unix 套接字提供服务
+接口：POST /format、POST /bib、POST /plan、GET /metrics、GET /health
+"""
+
+import json
+import time
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+from format_reference import ReferenceFormatter
+from bibtex_parser import BibTeXParser
+from thesis_timeline import ThesisPlanner, parse_date
+
+
+# 单次请求体上限（字节）
+MAX_BODY = 64 * 1024 * 1024
+# 批量格式化超过该条数时分块交给进程池
+BATCH_INLINE_LIMIT = 256
+
+STATUS_TEXT = {
+    200: 'OK',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    413: 'Payload Too Large',
+    500: 'Internal Server Error',
+    503: 'Service Unavailable',
+}
+
+
+class LatencyHistogram:
+    """固定分桶的延迟直方图（单位：秒）"""
+
+    BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+
+    def observe(self, seconds: float):
+        for i, bound in enumerate(self.BUCKETS):
+            if seconds <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.total += seconds
+        self.count += 1
+
+
+class Metrics:
+    """请求计数与延迟统计，以 Prometheus 文本格式导出"""
+
+    def __init__(self):
+        self.latency = {}
+        self.requests = {}
+        self.rejected = 0
+        self.in_flight = 0
+
+    def observe(self, path: str, status: int, seconds: float):
+        self.latency.setdefault(path, LatencyHistogram()).observe(seconds)
+        key = (path, status)
+        self.requests[key] = self.requests.get(key, 0) + 1
+
+    def render(self) -> str:
+        lines = [
+            '# TYPE assistant_request_latency_seconds histogram',
+        ]
+        for path, hist in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip(hist.BUCKETS, hist.counts):
+                cumulative += count
+                lines.append(f'assistant_request_latency_seconds_bucket{{path="{path}",le="{bound}"}} {cumulative}')
+            lines.append(f'assistant_request_latency_seconds_bucket{{path="{path}",le="+Inf"}} {hist.count}')
+            lines.append(f'assistant_request_latency_seconds_sum{{path="{path}"}} {hist.total:.6f}')
+            lines.append(f'assistant_request_latency_seconds_count{{path="{path}"}} {hist.count}')
+        lines.append('# TYPE assistant_requests_total counter')
+        for (path, status), count in sorted(self.requests.items()):
+            lines.append(f'assistant_requests_total{{path="{path}",status="{status}"}} {count}')
+        lines.append('# TYPE assistant_requests_rejected_total counter')
+        lines.append(f'assistant_requests_rejected_total {self.rejected}')
+        lines.append('# TYPE assistant_requests_in_flight gauge')
+        lines.append(f'assistant_requests_in_flight {self.in_flight}')
+        return '\n'.join(lines) + '\n'
+
+
+# 进程池工作进程内常驻的实例
+_worker_formatter = None
+_worker_parser = None
+
+
+def _format_references(texts: List[str]) -> List[str]:
+    """进程池任务：批量格式化文献文本"""
+    global _worker_formatter
+    if _worker_formatter is None:
+        _worker_formatter = ReferenceFormatter()
+    return [_worker_formatter.format_reference(text) for text in texts]
+
+
+def _format_bibtex(content: str, show_citekey: bool) -> Dict:
+    """进程池任务：解析并格式化 BibTeX 文本"""
+    global _worker_parser
+    if _worker_parser is None:
+        _worker_parser = BibTeXParser()
+    parser = BibTeXParser()
+    parser.authors = _worker_parser.authors  # 共享作者缓存
+    entries = parser.parse_string(content)
+    results = list(parser.iter_formatted(entries, show_citekey))
+    return {
+        'results': results,
+        'stats': dict(parser.stats),
+        'errors': list(parser.get_errors()),
+        'summary': parser.get_stats_summary(),
+    }
+
+
+class RequestError(Exception):
+    """可直接返回给客户端的请求错误"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class AssistantServer:
+    """基于 asyncio 的常驻服务，CPU 密集任务交给进程池"""
+
+    def __init__(self, jobs: int = 2, max_pending: int = 64):
+        self.jobs = max(jobs, 1)
+        self.max_pending = max_pending
+        self.formatter = ReferenceFormatter()
+        self.executor = None
+        self.metrics = Metrics()
+        self.routes = {
+            ('POST', '/format'): self.handle_format,
+            ('POST', '/bib'): self.handle_bib,
+            ('POST', '/plan'): self.handle_plan,
+            ('GET', '/metrics'): self.handle_metrics,
+            ('GET', '/health'): self.handle_health,
+        }
+
+    async def start(self, host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None):
+        """启动服务并一直运行"""
+        self.executor = ProcessPoolExecutor(max_workers=self.jobs)
+        try:
+            if socket_path:
+                server = await asyncio.start_unix_server(self.handle_connection, path=socket_path)
+                print(f"🚀 服务已启动：unix:{socket_path}")
+            else:
+                server = await asyncio.start_server(self.handle_connection, host, port)
+                print(f"🚀 服务已启动：http://{host}:{port}")
+            async with server:
+                await server.serve_forever()
+        finally:
+            self.executor.shutdown()
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        """处理一个连接上的若干 HTTP/1.1 请求（支持 keep-alive）"""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode('latin-1').split()
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                length = int(headers.get('content-length', 0) or 0)
+                if length > MAX_BODY:
+                    await self._respond(writer, 413, {'error': '请求体过大'}, keep_alive=False)
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                path = path.split('?', 1)[0]
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                await self._respond(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, body: bytes) -> Tuple[int, object]:
+        """路由请求，统计延迟；在途请求超过上限时直接拒绝（背压）"""
+        start = time.perf_counter()
+        handler = self.routes.get((method, path))
+        if handler is None:
+            status = 405 if any(p == path for _, p in self.routes) else 404
+            return status, {'error': STATUS_TEXT[status]}
+
+        if method == 'POST' and self.metrics.in_flight >= self.max_pending:
+            self.metrics.rejected += 1
+            return 503, {'error': '服务繁忙，请稍后重试'}
+
+        self.metrics.in_flight += 1
+        try:
+            data = json.loads(body.decode('utf-8')) if body else {}
+            if not isinstance(data, dict):
+                raise RequestError(400, '请求格式错误：请求体必须是 JSON 对象')
+            status, payload = 200, await handler(data)
+        except RequestError as e:
+            status, payload = e.status, {'error': str(e)}
+        except ValueError as e:
+            status, payload = 400, {'error': f'请求格式错误：{e}'}
+        except Exception as e:
+            status, payload = 500, {'error': str(e)}
+        finally:
+            self.metrics.in_flight -= 1
+        self.metrics.observe(path, status, time.perf_counter() - start)
+        return status, payload
+
+    async def _respond(self, writer: asyncio.StreamWriter, status: int, payload, keep_alive: bool):
+        if isinstance(payload, str):
+            body = payload.encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        else:
+            body = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+            content_type = 'application/json; charset=utf-8'
+        head = (
+            f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+            f"Content-Type: {content_type}\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n"
+        )
+        if status == 503:
+            head += "Retry-After: 1\r\n"
+        writer.write(head.encode('latin-1') + b'\r\n' + body)
+        await writer.drain()
+
+    async def handle_format(self, data: Dict) -> Dict:
+        """单篇 {"text": ...} 或批量 {"texts": [...]} 文献格式化"""
+        if 'texts' in data:
+            texts = data['texts']
+            if not isinstance(texts, list) or not all(isinstance(text, str) for text in texts):
+                raise RequestError(400, 'texts 必须是字符串列表')
+            if len(texts) <= BATCH_INLINE_LIMIT:
+                results = [self.formatter.format_reference(text) for text in texts]
+            else:
+                loop = asyncio.get_running_loop()
+                step = max(BATCH_INLINE_LIMIT, -(-len(texts) // self.jobs))
+                futures = [loop.run_in_executor(self.executor, _format_references, texts[i:i + step])
+                           for i in range(0, len(texts), step)]
+                results = [r for part in await asyncio.gather(*futures) for r in part]
+            return {'references': results}
+
+        text = data.get('text')
+        if not text:
+            raise RequestError(400, '缺少 text 字段')
+        if not isinstance(text, str):
+            raise RequestError(400, 'text 必须是字符串')
+        return {'reference': self.formatter.format_reference(text)}
+
+    async def handle_bib(self, data: Dict) -> Dict:
+        """解析 {"bibtex": ...} 中的 BibTeX 文本并格式化"""
+        content = data.get('bibtex')
+        if content is None:
+            raise RequestError(400, '缺少 bibtex 字段')
+        if not isinstance(content, str):
+            raise RequestError(400, 'bibtex 必须是字符串')
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, _format_bibtex, content,
+                                          bool(data.get('with_citekey')))
+
+    async def handle_plan(self, data: Dict) -> Dict:
+        """根据 {"date": ..., "type": ...} 生成毕设计划"""
+        date = data.get('date')
+        thesis_type = data.get('type', 'undergraduate')
+        if not date:
+            raise RequestError(400, '缺少 date 字段')
+        if not isinstance(date, str) or not isinstance(thesis_type, str):
+            raise RequestError(400, 'date 与 type 必须是字符串')
+        try:
+            planner = ThesisPlanner(parse_date(date), thesis_type)
+            plan = planner.generate_plan()
+        except ValueError as e:
+            raise RequestError(400, str(e))
+        return {'plan': plan}
+
+    async def handle_metrics(self, data: Dict) -> str:
+        return self.metrics.render()
+
+    async def handle_health(self, data: Dict) -> Dict:
+        return {'status': 'ok'}
+
+
+def serve(host: str = '127.0.0.1', port: int = 8765, socket_path: Optional[str] = None,
+          jobs: int = 2, max_pending: int = 64):
+    """启动常驻服务（阻塞直到 Ctrl+C）"""
+    server = AssistantServer(jobs=jobs, max_pending=max_pending)
+    try:
+        asyncio.run(server.start(host, port, socket_path))
+    except KeyboardInterrupt:
+        print("\n👋 服务已停止")
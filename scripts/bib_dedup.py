@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BibTeX 重复文献检测
+第一阶段：按 DOI 与规范化标题精确分桶
+第二阶段：对标题与作者的 shingle 做 MinHash + LSH，找出近似重复
+整体耗时与条目数近似线性
+"""
+
+import re
+import hashlib
+import operator
+import unicodedata
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+class _UnionFind:
+    """并查集（按条目序号）"""
+
+    def __init__(self):
+        self.parent = []
+
+    def add(self) -> int:
+        self.parent.append(len(self.parent))
+        return len(self.parent) - 1
+
+    def find(self, i: int) -> int:
+        parent = self.parent
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    def union(self, a: int, b: int) -> bool:
+        ra, rb = self.find(a), self.find(b)
+        if ra == rb:
+            return False
+        if ra > rb:
+            ra, rb = rb, ra
+        self.parent[rb] = ra
+        return True
+
+
+class DuplicateFinder:
+    """
+    重复文献检测器
+    逐条 add() 条目后调用 clusters() 获取重复分组及建议保留的条目
+    """
+
+    # MinHash 签名长度 = BANDS * ROWS；相似度阈值约为 (1 / BANDS) ** (1 / ROWS)
+    BANDS = 16
+    ROWS = 4
+    # 候选对的签名相似度需达到该值才认定为近似重复
+    THRESHOLD = 0.7
+    # 单个 LSH 桶的最大条目数，超过则视为无区分度的桶而跳过，避免退化为平方复杂度
+    MAX_BUCKET = 50
+    SHINGLE_SIZE = 3
+
+    REASON_LABELS = {'doi': 'DOI 相同', 'title': '标题相同', 'similar': '标题/作者相似'}
+
+    DOI_PREFIX_RE = re.compile(r'^(?:https?://(?:dx\.)?doi\.org/|doi:\s*)', re.IGNORECASE)
+    NON_WORD_RE = re.compile(r'[\W_]+')
+    AND_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+
+    def __init__(self, threshold: float = THRESHOLD):
+        self.threshold = threshold
+        self.size = self.BANDS * self.ROWS
+        self._uf = _UnionFind()
+        self._info = []         # 每个条目：(引用键, 非空字段数, 是否有 DOI, 年份)
+        self._years = []        # 按并查集根：该组内已知的年份（组内至多一个），未知为空字符串
+        self._signatures = []
+        self._reasons = {}      # (较小序号, 较大序号) -> 原因
+        self._by_doi = {}       # 规范化 DOI -> {年份: 该年份的首个序号}
+        self._by_title = {}     # 规范化标题 -> {年份: 该年份的首个序号}
+        self._buckets = {}
+
+    def add(self, entry) -> int:
+        """加入一个条目（BibEntry 或字典），返回其序号；精确重复在此时即合并"""
+        index = self._uf.add()
+        doi = self.normalize_doi(entry.get('doi', '') or '')
+        title = self.normalize_title(entry.get('title', '') or '')
+        year = (entry.get('year', '') or '').strip()
+        self._info.append((entry.get('citekey', ''), sum(1 for _ in entry.items()), bool(doi), year))
+        self._years.append(year)
+
+        if doi:
+            self._link_exact(self._by_doi.setdefault(doi, {}), index, year, 'doi')
+        if title:
+            self._link_exact(self._by_title.setdefault(title, {}), index, year, 'title')
+
+        signature = self._minhash(self._shingles(title, entry.get('author', '') or ''))
+        self._signatures.append(signature)
+        if signature is not None:
+            rows = self.ROWS
+            for band in range(self.BANDS):
+                key = (band,) + signature[band * rows:(band + 1) * rows]
+                bucket = self._buckets.setdefault(key, [])
+                if len(bucket) < self.MAX_BUCKET:
+                    bucket.append(index)
+        return index
+
+    def add_all(self, entries: Iterable) -> 'DuplicateFinder':
+        for entry in entries:
+            self.add(entry)
+        return self
+
+    def clusters(self) -> List[Dict]:
+        """
+        返回重复分组，每组为：
+        {'canonical': 建议保留的引用键, 'members': [组内引用键], 'reasons': [原因]}
+        """
+        self._link_similar()
+
+        groups = {}
+        for index in range(len(self._info)):
+            groups.setdefault(self._uf.find(index), []).append(index)
+
+        reasons = {}
+        for (a, b), reason in self._reasons.items():
+            reasons.setdefault(self._uf.find(a), set()).add(reason)
+
+        # 组内序号递增，按各组首个条目在原文中的位置输出
+        result = []
+        for root, members in sorted(groups.items(), key=lambda item: item[1][0]):
+            if len(members) < 2:
+                continue
+            canonical = max(members, key=self._canonical_rank)
+            result.append({
+                'canonical': self._info[canonical][0],
+                'members': [self._info[i][0] for i in members],
+                'reasons': sorted(reasons.get(root, ())),
+            })
+        return result
+
+    def _canonical_rank(self, index: int) -> Tuple:
+        # 字段最全者优先，其次有 DOI 者，再次出现最早者
+        citekey, field_count, has_doi, year = self._info[index]
+        return field_count, has_doi, -index
+
+    def _link(self, a: int, b: int, reason: str):
+        if a != b and self._compatible(a, b):
+            year = self._years[self._uf.find(a)] or self._years[self._uf.find(b)]
+            if self._uf.union(a, b):
+                self._years[self._uf.find(a)] = year
+                self._reasons[(min(a, b), max(a, b))] = reason
+
+    def _link_exact(self, bucket: Dict[str, int], index: int, year: str, reason: str):
+        """
+        与同一 DOI/标题桶内所有年份相容的条目合并：同年份的只需连到该年份的首个条目，
+        年份未知的与各年份都相容；每个桶按年份只保留一个代表，比较次数与年份数有关
+        """
+        if year:
+            targets = [bucket[key] for key in (year, '') if key in bucket]
+        else:
+            targets = list(bucket.values())
+        for target in targets:
+            self._link(target, index, reason)
+        bucket.setdefault(year, index)
+
+    def _compatible(self, a: int, b: int) -> bool:
+        # 两组已知的年份不同时不视为重复（同名论文的不同版本）；按组比较，
+        # 避免经由年份未知的条目把不同年份的条目传递地合并到一组
+        find = self._uf.find
+        year_a, year_b = self._years[find(a)], self._years[find(b)]
+        return not (year_a and year_b and year_a != year_b)
+
+    def _link_similar(self):
+        """在 LSH 桶内比较候选对，签名相似度达到阈值即合并；同一候选对只比较一次"""
+        signatures = self._signatures
+        find = self._uf.find
+        min_same = self.threshold * self.size
+        compared = set()
+        for bucket in self._buckets.values():
+            if len(bucket) < 2:
+                continue
+            for i, a in enumerate(bucket):
+                sig_a = signatures[a]
+                for b in bucket[i + 1:]:
+                    if (a, b) in compared:
+                        continue
+                    compared.add((a, b))
+                    if find(a) == find(b) or not self._compatible(a, b):
+                        continue
+                    if sum(map(operator.eq, sig_a, signatures[b])) >= min_same:
+                        self._link(a, b, 'similar')
+        self._buckets.clear()
+
+    @classmethod
+    def normalize_doi(cls, doi: str) -> str:
+        return cls.DOI_PREFIX_RE.sub('', doi.strip()).lower()
+
+    @classmethod
+    def normalize_title(cls, title: str) -> str:
+        """全角转半角、转小写、去掉括号/标点/空白"""
+        title = unicodedata.normalize('NFKC', title).lower()
+        return cls.NON_WORD_RE.sub('', title)
+
+    def _shingles(self, title: str, author: str) -> set:
+        k = self.SHINGLE_SIZE
+        shingles = {title[i:i + k] for i in range(max(len(title) - k + 1, 1))} if title else set()
+        # 第一作者姓氏（中文为全名）作为额外特征
+        first = self.AND_RE.split(author.strip(), 1)[0]
+        surname = first.split(',', 1)[0] if ',' in first else (first.split() or [''])[-1]
+        surname = self.normalize_title(surname)
+        if surname:
+            shingles.add('@' + surname)
+        return shingles
+
+    def _minhash(self, shingles: set) -> Optional[Tuple[int, ...]]:
+        """
+        单次哈希 MinHash（one permutation hashing）：每个 shingle 只哈希一次，
+        按哈希值分箱取各箱最小值，空箱用右侧相邻箱的值填充
+        """
+        if not shingles:
+            return None
+        size = self.size
+        mins = [None] * size
+        for shingle in shingles:
+            h = int.from_bytes(hashlib.blake2b(shingle.encode('utf-8'), digest_size=8).digest(), 'little')
+            slot = h % size
+            value = h // size
+            if mins[slot] is None or value < mins[slot]:
+                mins[slot] = value
+        # 稠密化：空箱借用右侧最近的非空箱（循环），从右向左扫描两遍即可覆盖
+        if None in mins:
+            original = mins[:]
+            carry = None
+            for i in range(2 * size - 1, -1, -1):
+                j = i % size
+                if original[j] is not None:
+                    carry = original[j]
+                elif mins[j] is None and carry is not None:
+                    mins[j] = carry
+        return tuple(mins)
+
+    def format_report(self, clusters: List[Dict]) -> List[str]:
+        """生成可读的重复分组报告"""
+        lines = [f"🔍 发现 {len(clusters)} 组重复文献："]
+        for i, cluster in enumerate(clusters, 1):
+            reasons = '、'.join(self.REASON_LABELS.get(r, r) for r in cluster['reasons'])
+            lines.append(f"[{i}] 建议保留：{cluster['canonical']}（{reasons}）")
+            for citekey in cluster['members']:
+                if citekey != cluster['canonical']:
+                    lines.append(f"    - {citekey}")
+        return lines
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BibTeX 引用键索引
+记录每个条目在 .bib 文件中的字节偏移与长度，保存为旁路 SQLite 文件（<bib>.index.db；
+目录不可写时改存用户缓存目录，仍不可用时只在内存中建索引）
+.bib 的修改时间或大小变化时自动重建；查询时以 mmap 打开 .bib，只读取所需条目
+"""
+
+import os
+import mmap
+import hashlib
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Tuple
+
+
+class BibIndex:
+    """
+    .bib 文件的引用键偏移索引
+    条目按原文字节范围记录；@string 单独记录，供查询时按位置还原宏定义
+    """
+
+    SUFFIX = '.index.db'
+    # 索引格式版本；修改切分规则时递增，使旧索引失效
+    VERSION = '2'
+    # 重建时每批写入的行数
+    BATCH_SIZE = 10000
+    # 单条 SQL 中 IN (...) 的参数个数上限
+    QUERY_CHUNK = 500
+
+    # .bib 所在目录不可写时索引的存放目录
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'academic-assistant', 'index')
+
+    def __init__(self, bib_path: str, index_path: str = None):
+        """
+        依次尝试 index_path（默认为 .bib 旁的 <bib>.index.db）、用户缓存目录下的索引文件，
+        都无法创建或写入时在内存中建索引（每次打开都重新扫描一遍 .bib）
+        """
+        self.bib_path = bib_path
+        self.rebuilt = False
+        os.stat(bib_path)  # .bib 不存在时直接抛出 FileNotFoundError
+        candidates = [index_path] if index_path else [bib_path + self.SUFFIX, self._cache_path(bib_path)]
+        for path in candidates + [':memory:']:
+            try:
+                self._open(path)
+                break
+            except (OSError, sqlite3.Error):
+                if path == ':memory:':
+                    raise
+                self.close()
+
+    @classmethod
+    def _cache_path(cls, bib_path: str) -> str:
+        digest = hashlib.blake2b(os.path.abspath(bib_path).encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(cls.CACHE_DIR, digest + cls.SUFFIX)
+
+    def _open(self, path: str):
+        self.path = path
+        self.conn = None
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path)
+        self.conn.execute('CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'citekey TEXT PRIMARY KEY, offset INTEGER NOT NULL, length INTEGER NOT NULL)')
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS strings (offset INTEGER PRIMARY KEY, length INTEGER NOT NULL)')
+        if not self.is_fresh():
+            self.build()
+
+    def _signature(self) -> str:
+        st = os.stat(self.bib_path)
+        return f"{self.VERSION}:{st.st_mtime_ns}:{st.st_size}"
+
+    def is_fresh(self) -> bool:
+        """索引是否与当前 .bib 文件一致（版本、修改时间、大小）"""
+        row = self.conn.execute("SELECT value FROM meta WHERE key = 'signature'").fetchone()
+        return row is not None and row[0] == self._signature()
+
+    def build(self):
+        """扫描 .bib 文件重建索引；重复的引用键保留第一次出现的条目"""
+        signature = self._signature()
+        conn = self.conn
+        conn.execute('DELETE FROM entries')
+        conn.execute('DELETE FROM strings')
+        conn.execute("DELETE FROM meta WHERE key = 'signature'")
+
+        entries, strings = [], []
+        with open(self.bib_path, 'rb') as f:
+            for entry_type, citekey, offset, length in self._scan(f):
+                if entry_type == 'string':
+                    strings.append((offset, length))
+                elif citekey:
+                    entries.append((citekey, offset, length))
+                    if len(entries) >= self.BATCH_SIZE:
+                        conn.executemany('INSERT OR IGNORE INTO entries VALUES (?, ?, ?)', entries)
+                        entries = []
+        conn.executemany('INSERT OR IGNORE INTO entries VALUES (?, ?, ?)', entries)
+        conn.executemany('INSERT OR IGNORE INTO strings VALUES (?, ?)', strings)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('signature', ?)", (signature,))
+        conn.commit()
+        self.rebuilt = True
+
+    def _scan(self, lines: Iterable[bytes]) -> Iterator[Tuple[str, str, int, int]]:
+        """
+        切分条目（规则见 bibtex_parser.scan_entries），产出 (小写条目类型, 引用键, 字节偏移, 字节长度)
+        引用键无效（为空、含空白或没有逗号）时为空字符串；括号不匹配的条目被丢弃
+        """
+        from bibtex_parser import SKIP_TYPES, scan_entries
+
+        for entry_type, body, start, end, line, resync_line in scan_entries(lines):
+            entry_type = entry_type.lower()
+            if end is None or resync_line or entry_type in SKIP_TYPES:
+                continue
+            yield entry_type, self._citekey(body), start, end - start
+
+    @staticmethod
+    def _citekey(head: bytes) -> str:
+        citekey, sep, _ = head.partition(b',')
+        citekey = citekey.strip()
+        if not sep or not citekey or any(c.isspace() for c in citekey.decode('utf-8', 'replace')):
+            return ''
+        return citekey.decode('utf-8', 'replace')
+
+    def __len__(self) -> int:
+        return self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+
+    def locate(self, citekeys: Iterable[str]) -> Dict[str, Tuple[int, int]]:
+        """批量查询引用键，返回 {引用键: (字节偏移, 字节长度)}；不存在的键不出现在结果中"""
+        citekeys = list(dict.fromkeys(citekeys))
+        found = {}
+        for i in range(0, len(citekeys), self.QUERY_CHUNK):
+            part = citekeys[i:i + self.QUERY_CHUNK]
+            placeholders = ','.join('?' * len(part))
+            rows = self.conn.execute(
+                f'SELECT citekey, offset, length FROM entries WHERE citekey IN ({placeholders})', part)
+            for citekey, offset, length in rows:
+                found[citekey] = (offset, length)
+        return found
+
+    def strings_before(self, offset: int) -> List[Tuple[int, int]]:
+        """位于 offset 之前的 @string 条目（按原文顺序）"""
+        return self.conn.execute(
+            'SELECT offset, length FROM strings WHERE offset < ? ORDER BY offset', (offset,)).fetchall()
+
+    def read_many(self, citekeys: Iterable[str]) -> Tuple[List[Tuple[int, str]], Dict[str, Tuple[int, str]]]:
+        """
+        以 mmap 读取条目原文
+        返回 (所需 @string 的 [(偏移, 原文)], {引用键: (偏移, 条目原文)})，@string 只取最后一个条目之前的
+        """
+        found = self.locate(citekeys)
+        if not found:
+            return [], {}
+        strings = self.strings_before(max(offset for offset, _ in found.values()))
+        with open(self.bib_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            texts = {citekey: (offset, mm[offset:offset + length].decode('utf-8'))
+                     for citekey, (offset, length) in found.items()}
+            string_texts = [(offset, mm[offset:offset + length].decode('utf-8')) for offset, length in strings]
+        return string_texts, texts
+
+    def close(self):
+        if self.conn is not None:
+            self.conn.close()
+            self.conn = None
+
+    def __enter__(self) -> 'BibIndex':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
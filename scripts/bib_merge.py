@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多个 .bib 文件的流式合并
+逐文件、逐条目读取并立即写出合并后的 .bib（及可选的 GB/T 7714 文本）
+内存只保存已使用的引用键与条目内容摘要，与文件大小无关
+"""
+
+import os
+import sys
+import hashlib
+import argparse
+from typing import Dict, Iterable, Iterator, List, Optional, TextIO
+
+from bibtex_parser import BibEntry, BibTeXParser
+from bib_writers import BibTeXWriter, GBTWriter
+
+
+class BibMerger:
+    """
+    流式合并器
+    - 内容完全相同的条目（忽略引用键）只保留第一次出现的；只有保护大小写的括号（{GPU} 与 GPU）不同时也视为相同
+    - 写出的 .bib 保留条目原文中的括号组（见 BibEntry.raw）
+    - 引用键冲突时按输入顺序处理：先出现的保留原键，后出现的依次改为 key-2、key-3 ...
+    """
+
+    # 内容摘要字节数；以整数保存，每个条目只占一个小整数
+    DIGEST_SIZE = 8
+
+    def __init__(self, parser: Optional[BibTeXParser] = None, jobs: int = 1):
+        self.parser = parser or BibTeXParser()
+        self.jobs = jobs
+        self.keys = set()
+        self.digests = {}       # 内容摘要 -> 保留的引用键
+        self.stats = {'read': 0, 'written': 0, 'duplicates': 0, 'renamed': 0}
+        self.renamed = []       # (文件, 原引用键, 新引用键)
+        self.aliases = []       # (文件, 被丢弃的引用键, 保留的引用键)，仅记录引用键不同的重复
+
+    def iter_merged(self, paths: Iterable[str]) -> Iterator[BibEntry]:
+        """按输入顺序流式产出去重、解决键冲突后的条目"""
+        for path in paths:
+            for entry in self.parser.iter_entries(path, self.jobs):
+                self.stats['read'] += 1
+                digest = self._digest(entry)
+                kept = self.digests.get(digest)
+                if kept is not None:
+                    self.stats['duplicates'] += 1
+                    if kept != entry.citekey:
+                        self.aliases.append((path, entry.citekey, kept))
+                    continue
+
+                citekey = self._resolve(entry.citekey)
+                if citekey != entry.citekey:
+                    self.stats['renamed'] += 1
+                    self.renamed.append((path, entry.citekey, citekey))
+                    entry.citekey = citekey
+                self.keys.add(citekey)
+                self.digests[digest] = citekey
+                self.stats['written'] += 1
+                yield entry
+
+    def merge(self, paths: Iterable[str], bib_out: TextIO, text_out: Optional[TextIO] = None) -> Dict:
+        """合并并逐条写出 .bib；指定 text_out 时同时写出带编号的 GB/T 7714 文本"""
+        writers = [BibTeXWriter(bib_out, self.parser)]
+        if text_out is not None:
+            writers.append(GBTWriter(text_out, self.parser))
+        try:
+            for entry in self.iter_merged(paths):
+                for writer in writers:
+                    writer.write(entry)
+        finally:
+            for writer in writers:
+                writer.close()
+        return self.stats
+
+    def _resolve(self, citekey: str) -> str:
+        if citekey not in self.keys:
+            return citekey
+        n = 2
+        while f"{citekey}-{n}" in self.keys:
+            n += 1
+        return f"{citekey}-{n}"
+
+    def _digest(self, entry: BibEntry) -> int:
+        """条目类型与全部字段（不含引用键）的摘要，字段顺序不影响结果"""
+        h = hashlib.blake2b(entry.type.encode('utf-8'), digest_size=self.DIGEST_SIZE)
+        for name, value in sorted(entry.items()):
+            if name != 'type' and name != 'citekey':
+                h.update(f"\0{name}\x1f{value}".encode('utf-8'))
+        return int.from_bytes(h.digest(), 'little')
+
+    def report(self) -> List[str]:
+        """生成合并报告（统计、重命名与重复的引用键）"""
+        stats = self.stats
+        lines = [f"📊 共读取 {stats['read']} 篇，写出 {stats['written']} 篇，"
+                 f"丢弃重复 {stats['duplicates']} 篇，重命名 {stats['renamed']} 个引用键"]
+        if self.renamed:
+            lines.append("\n🔀 引用键冲突，已重命名：")
+            lines.extend(f"  {path}: {old} → {new}" for path, old, new in self.renamed)
+        if self.aliases:
+            lines.append("\n🔁 内容重复，已合并到先出现的条目：")
+            lines.extend(f"  {path}: {old} → {kept}" for path, old, kept in self.aliases)
+        return lines
+
+
+def _same_file(a: str, b: str) -> bool:
+    """两个路径是否指向同一文件（含符号链接、硬链接；文件不存在时比较规范化路径）"""
+    try:
+        return os.path.samefile(a, b)
+    except OSError:
+        return os.path.realpath(a) == os.path.realpath(b)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='合并多个 BibTeX 文件（流式，去重并解决引用键冲突）')
+    parser.add_argument('inputs', nargs='+', help='输入 .bib 文件（按优先级排列，先出现的保留原引用键）')
+    parser.add_argument('--output', '-o', type=str, required=True, help='合并后的 .bib 输出路径')
+    parser.add_argument('--gbt', type=str, help='同时输出 GB/T 7714 格式文本的路径（可选）')
+    parser.add_argument('--quiet', '-q', action='store_true', help='静默模式（只显示统计信息）')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（默认 1，即串行）')
+    parser.add_argument('--no-cache', action='store_true', help='不读写 .bib 旁的解析缓存')
+
+    args = parser.parse_args()
+
+    # 输出文件在读取输入前就会被清空，不能与任何输入（或彼此）相同
+    outputs = [path for path in (args.output, args.gbt) if path]
+    for out in outputs:
+        clash = next((path for path in args.inputs if _same_file(out, path)), None)
+        if clash is not None:
+            print(f"❌ 输出路径 {out} 与输入文件 {clash} 相同，合并前会被清空；请改用其他输出路径")
+            sys.exit(1)
+    if len(outputs) == 2 and _same_file(*outputs):
+        print(f"❌ --output 与 --gbt 不能是同一文件：{args.output}")
+        sys.exit(1)
+
+    merger = BibMerger(BibTeXParser(use_cache=not args.no_cache), jobs=args.jobs)
+    text_out = open(args.gbt, 'w', encoding='utf-8') if args.gbt else None
+    try:
+        with open(args.output, 'w', encoding='utf-8') as bib_out:
+            merger.merge(args.inputs, bib_out, text_out)
+    finally:
+        if text_out is not None:
+            text_out.close()
+
+    if merger.stats['read'] == 0:
+        print("❌ 未找到任何 BibTeX 条目")
+        for err in merger.parser.get_errors():
+            print(f"  {err}")
+        sys.exit(1)
+
+    print(f"✅ 已保存到：{args.output}" + (f"，{args.gbt}" if args.gbt else ''))
+    report = merger.report()
+    print(f"\n{report[0]}" if args.quiet else '\n' + '\n'.join(report))
+
+    errors = merger.parser.get_errors()
+    if errors and not args.quiet:
+        print(f"\n⚠️ 警告信息：")
+        for err in errors:
+            print(f"  {err}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+著者-出版年制排序
+按 GB/T 7714 的著者-出版年制排列参考文献：先按文种分组（中文、日文、西文、俄文、其他），
+组内按著者字顺（中文按汉语拼音）、出版年、题名排列；同一著者同一年的多篇文献在年份后加 a、b、c ...
+每个条目只计算一次排序键，排序时只比较键
+"""
+
+import os
+import re
+import unicodedata
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class PinyinTable:
+    """
+    离线拼音排序表（pinyin_table.txt）
+    每个汉字映射为一个私用区字符，其码位次序即拼音次序，转写后的字符串可直接按码位比较
+    """
+
+    PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'pinyin_table.txt')
+    CJK_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\U00020000-\U0002ffff]')
+    # 表中汉字映射到第 15 平面私用区；表外汉字映射到第 16 平面，排在所有表内汉字之后
+    BASE = 0xF0000
+    UNKNOWN_BASE = 0x100000
+
+    def __init__(self, path: str = PATH):
+        self.path = path
+        ranks = {}
+        with open(path, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                # 跳过注释与 [A] 等首字母分组行
+                if not line or line.startswith('#') or line.startswith('['):
+                    continue
+                for ch in line:
+                    ranks.setdefault(ch, len(ranks))
+        self.ranks = ranks
+        # str.translate 用的映射：汉字 -> 私用区字符，组合附加符号 -> 删除
+        table = {ord(ch): chr(self.BASE + rank) for ch, rank in ranks.items()}
+        table.update(dict.fromkeys(range(0x300, 0x370)))
+        self._table = table
+
+    def __len__(self) -> int:
+        return len(self.ranks)
+
+    def transliterate(self, text: str) -> str:
+        """
+        转写为可直接比较的排序串：汉字按拼音次序，拉丁字母去掉附加符号并统一大小写
+        表外汉字按码位排在表内汉字之后
+        """
+        if text.isascii():
+            return text.lower()
+        text = unicodedata.normalize('NFKD', text).translate(self._table).casefold()
+        if not text.isascii() and self.CJK_RE.search(text):
+            text = self.CJK_RE.sub(lambda m: chr(self.UNKNOWN_BASE + ord(m.group()) % 0xFFFE), text)
+        return text
+
+
+_default_table = None
+
+
+def default_table() -> PinyinTable:
+    """进程内共享的拼音排序表（首次使用时加载）"""
+    global _default_table
+    if _default_table is None:
+        _default_table = PinyinTable()
+    return _default_table
+
+
+class SortKeyBuilder:
+    """
+    为条目计算著者-出版年制排序键：(文种, 著者, 出版年, 题名)
+    著者键由全部作者的规范化姓名（姓在前）转写后拼成一个字符串（作者之间用 \x00 分隔，
+    比较结果与逐位作者比较相同）；无著者时以题名代替
+    """
+
+    # 文种分组次序：中文、日文、西文、俄文、其他
+    CHINESE, JAPANESE, WESTERN, CYRILLIC, OTHER = range(5)
+
+    CJK_RE = PinyinTable.CJK_RE
+    KANA_RE = re.compile(r'[\u3040-\u30ff]')
+    CYRILLIC_RE = re.compile(r'[\u0400-\u04ff]')
+    LATIN_RE = re.compile(r'[A-Za-z\u00c0-\u024f]')
+    AND_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+    YEAR_RE = re.compile(r'\d{4}')
+    BRACE_RE = re.compile(r'[{}]')
+
+    # 无出版年的条目排在同一著者的最后
+    NO_YEAR = 10000
+
+    def __init__(self, split_names: Callable[[str], Sequence[str]], table: Optional[PinyinTable] = None):
+        """
+        split_names：作者字符串 -> 姓在前的规范化姓名列表，通常为 AuthorNormalizer.split
+        （其结果有缓存，排序时拆分的作者在随后渲染时可直接命中）
+        """
+        self.split_names = split_names
+        self.table = table or default_table()
+        self._authors = {}      # 原始作者字符串 -> (文种, 著者键)
+
+    def key(self, entry: Dict) -> Tuple[int, str, int, str]:
+        raw_title = entry.get('title', '') or ''
+        title = self._fold(raw_title)
+        author = entry.get('author', '') or ''
+        if author:
+            cached = self._authors.get(author)
+            if cached is None:
+                cached = self._authors[author] = self._author_key(author)
+            group, names = cached
+            # 日文姓名多为汉字，结合题名中的假名判断
+            if group == self.CHINESE and self.KANA_RE.search(raw_title):
+                group = self.JAPANESE
+        else:
+            group, names = self._group(raw_title), title
+        m = self.YEAR_RE.search(entry.get('year', '') or '')
+        return group, names, int(m.group()) if m else self.NO_YEAR, title
+
+    def _author_key(self, author: str) -> Tuple[int, str]:
+        group = self._group(self.AND_RE.split(author.strip(), 1)[0])
+        return group, self._fold('\x00'.join(self.split_names(author)))
+
+    def _group(self, text: str) -> int:
+        if self.KANA_RE.search(text):
+            return self.JAPANESE
+        if self.CJK_RE.search(text):
+            return self.CHINESE
+        if self.LATIN_RE.search(text):
+            return self.WESTERN
+        if self.CYRILLIC_RE.search(text):
+            return self.CYRILLIC
+        return self.OTHER
+
+    def _fold(self, text: str) -> str:
+        if '{' in text or '}' in text:
+            text = self.BRACE_RE.sub('', text)
+        return self.table.transliterate(text.strip())
+
+
+def year_suffix(n: int) -> str:
+    """第 n 篇（从 0 开始）的年份后缀：a, b, ..., z, aa, ab, ..."""
+    suffix = ''
+    n += 1
+    while n:
+        n, r = divmod(n - 1, 26)
+        suffix = chr(ord('a') + r) + suffix
+    return suffix
+
+
+def sort_author_year(entries: Iterable[Dict], builder: SortKeyBuilder) -> List[Tuple[Dict, str]]:
+    """
+    按著者-出版年制排序，返回 [(条目, 年份后缀), ...]
+    同一文种、同一著者、同一出版年的多篇文献依次得到后缀 a、b、c ...，其余后缀为空
+    """
+    # (键, 序号) 唯一，元组比较不会比较到条目本身；相同键保持原文顺序
+    keyed = [(builder.key(entry), i, entry) for i, entry in enumerate(entries)]
+    keyed.sort()
+
+    result = []
+    i = 0
+    while i < len(keyed):
+        (group, names, year, _), _, _ = keyed[i]
+        j = i + 1
+        while j < len(keyed) and keyed[j][0][:3] == (group, names, year):
+            j += 1
+        if j - i > 1 and year != SortKeyBuilder.NO_YEAR:
+            result.extend((entry, year_suffix(n)) for n, (_, _, entry) in enumerate(keyed[i:j]))
+        else:
+            result.extend((entry, '') for _, _, entry in keyed[i:j])
+        i = j
+    return result
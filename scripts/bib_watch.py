@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+.bib 文件的监视与增量渲染
+保存后只重新扫描改动所在的区域、只重新解析文本变化的条目，并从第一处变化的行起改写输出文件
+文件变化通过轮询修改时间与大小发现（标准库没有跨平台的文件事件接口），连续保存经去抖后只处理一次
+"""
+
+import os
+import time
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from bibtex_parser import SKIP_TYPES, BibTeXParser, scan_entries
+
+
+class BibWatcher:
+    """
+    单个 .bib 文件的增量渲染器
+    记住上次的文件内容与每个条目（含 @string/@comment/@preamble）的字节范围：
+    - 新旧内容公共前缀之前的条目不变；从前缀所在行起重新扫描，扫描到与旧条目逐字节一致（仅平移）的位置即停止
+    - 只有被替换的条目重新解析；@string 有变化时其后的条目全部重新解析（宏定义可能改变）
+    - 输出与 format_file() 一致（"[i] ..." 每条一行），只改写第一处变化的行之后的部分
+    """
+
+    # 比较新旧内容时每次比较的字节数
+    BLOCK = 1 << 16
+
+    def __init__(self, path: str, output: str, parser: Optional[BibTeXParser] = None):
+        self.path = path
+        self.output = output
+        self.parser = parser or BibTeXParser()
+        self.data = None
+        self.starts = []    # 各条目的起始字节偏移
+        self.ends = []      # 各条目的结束字节偏移（不含）
+        self.records = []   # 各条目的 (小写条目类型, 其后生效的宏定义, 条目, 格式化结果, 错误信息)
+        self.kinds = []     # 各条目在输出中的占位：0=不编号，1=编号但无输出行，2=编号且输出一行
+        self.lines = []     # 输出文件各行（已编码）
+        self.offsets = [0]  # 输出文件各行的起始偏移，最后一项为文件长度
+        self.unclosed = None    # 文件末尾未闭合条目的起始偏移（其后内容都属于它）
+        self.unclosed_errors = []   # 该条目的警告
+        self.signature = None
+
+    def poll(self) -> Optional[Tuple[int, int]]:
+        """返回文件当前的 (修改时间, 大小)；文件暂不存在（如编辑器替换保存的间隙）时返回 None"""
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def errors(self) -> List[str]:
+        """当前内容的全部警告/错误信息（按原文顺序，与 format_file() 一致）"""
+        return [err for record in self.records for err in record[4]] + self.unclosed_errors
+
+    def refresh(self) -> Optional[Dict]:
+        """
+        读取文件并增量更新输出，返回本次更新的统计；内容没有变化时返回 None
+        统计：parsed（重新解析的条目数）、total（条目总数）、full（是否整体重建）、seconds
+        """
+        start = time.perf_counter()
+        self.signature = self.poll()
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except OSError:
+            return None
+        full = self.data is None or not os.path.exists(self.output)
+        if not full and data == self.data:
+            return None
+
+        old = self.data or b''
+        old_count = len(self.records)
+        first = self._common_prefix(old, data)
+        # 从公共前缀所在行的行首开始，且该处必须位于所有旧条目之外
+        # 用 bisect_left：括号未闭合、截止于行首 @type{ 的条目结束偏移恰为该行行首，
+        # 这一行被改动（如不再能重新同步）时该条目可能向后延伸，必须一并重新扫描
+        # 文件末尾的未闭合条目延伸到文件末尾，改动在其后时从它开始
+        pos = old.rfind(b'\n', 0, first) + 1
+        if self.unclosed is not None and self.unclosed < pos:
+            pos = old.rfind(b'\n', 0, self.unclosed) + 1
+        i = bisect_left(self.ends, pos)
+        while i < old_count and self.starts[i] < pos:
+            pos = old.rfind(b'\n', 0, self.starts[i]) + 1
+            i = bisect_left(self.ends, pos)
+
+        # 扫描越过改动区域之后，遇到与旧条目一致（仅平移 delta）的条目即停止，其后的条目全部沿用
+        delta = len(data) - len(old)
+        edit_end = len(data) - self._common_suffix(old, data, min(len(old), len(data)) - first)
+        spans = []
+        stop = old_count
+        unclosed = None if self.unclosed is None else self.unclosed + delta
+        for s, e, entry_type in self._scan(data, pos):
+            if e is None:
+                unclosed = s
+                break
+            if s >= edit_end:
+                k = bisect_right(self.starts, s - delta) - 1
+                if k >= i and self.starts[k] == s - delta and self.ends[k] == e - delta \
+                        and self.records[k][0] == entry_type:
+                    stop = k
+                    break
+            spans.append((s, e, entry_type))
+        else:
+            unclosed = None
+
+        # 宏定义变化时，其后的条目也要检查：只重新解析引用了取值有变化的宏的条目
+        tail = range(stop, old_count)
+        if stop < old_count and (any(t == 'string' for _, _, t in spans) or
+                                 any(r[0] == 'string' for r in self.records[i:stop])):
+            spans.extend((self.starts[k] + delta, self.ends[k] + delta, self.records[k][0]) for k in tail)
+            stop = old_count
+        else:
+            tail = ()
+        reused = dict(zip(range(len(spans) - len(tail), len(spans)), tail))
+
+        macros = self.records[i - 1][1] if i > 0 else self.parser.MONTH_MACROS
+        added = []
+        parsed = 0
+        changed = {}    # (旧宏定义, 新宏定义) 的 id -> 取值不同的宏名（小写、编码后）
+        line = 1        # 当前条目的起始行号，只在需要解析时递增计算
+        counted = 0
+        for n, (s, e, entry_type) in enumerate(spans):
+            k = reused.get(n)
+            # 括号未闭合的条目重新处理，使警告中的行号与当前内容一致
+            if k is not None and entry_type != 'string' and not self._has_warning(self.records[k]):
+                old_record = self.records[k]
+                pair = (id(old_record[1]), id(macros))
+                if pair not in changed:
+                    changed[pair] = [name.lower().encode('utf-8') for name in old_record[1].keys() | macros.keys()
+                                     if old_record[1].get(name) != macros.get(name)]
+                # 宏名不区分大小写
+                text = data[s:e].lower()
+                if not any(name in text for name in changed[pair]):
+                    added.append((entry_type, macros) + old_record[2:])
+                    continue
+            line += data.count(b'\n', counted, s)
+            counted = s
+            record = self._process(entry_type, data[s:e], macros, line)
+            if record[2] is not None:
+                parsed += 1
+            macros = record[1]
+            added.append(record)
+
+        # 沿用的条目行号随改动平移时，重新生成其中带行号的警告
+        if stop < old_count and data.count(b'\n', first, edit_end) != old.count(b'\n', first, edit_end - delta):
+            self._renumber(data, range(stop, old_count), delta)
+        self.data = data
+        self.unclosed = unclosed
+        self.unclosed_errors = [] if unclosed is None else self._process(
+            '', data[unclosed:], {}, data.count(b'\n', 0, unclosed) + 1, resync=False)[4]
+        tail_starts, tail_ends = self.starts[stop:], self.ends[stop:]
+        if delta:
+            tail_starts = [s + delta for s in tail_starts]
+            tail_ends = [e + delta for e in tail_ends]
+        self.starts[i:] = [s for s, _, _ in spans] + tail_starts
+        self.ends[i:] = [e for _, e, _ in spans] + tail_ends
+        self.records[i:stop] = added
+        kinds = [0 if record[2] is None else 2 if record[3] else 1 for record in added]
+        self._write(i, self.kinds[i:stop], kinds, full)
+        self.kinds[i:stop] = kinds
+        return {
+            'parsed': parsed,
+            'total': len(self.kinds) - self.kinds.count(0),
+            'full': full,
+            'seconds': time.perf_counter() - start,
+        }
+
+    def _common_prefix(self, a: bytes, b: bytes) -> int:
+        """公共前缀长度：按块比较，再在第一个不同的块内二分"""
+        n = min(len(a), len(b))
+        i = 0
+        while i + self.BLOCK <= n and a[i:i + self.BLOCK] == b[i:i + self.BLOCK]:
+            i += self.BLOCK
+        lo, hi = i, min(i + self.BLOCK, n)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if a[i:mid] == b[i:mid]:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _common_suffix(self, a: bytes, b: bytes, limit: int) -> int:
+        """公共后缀长度，不超过 limit（避免与公共前缀重叠）"""
+        la, lb = len(a), len(b)
+        i = 0
+        while i + self.BLOCK <= limit and a[la - i - self.BLOCK:la - i] == b[lb - i - self.BLOCK:lb - i]:
+            i += self.BLOCK
+        lo, hi = i, min(i + self.BLOCK, limit)
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if a[la - mid:la - i] == b[lb - mid:lb - i]:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    @staticmethod
+    def _scan(data: bytes, pos: int) -> Iterator[Tuple[int, Optional[int], str]]:
+        """
+        从行首 pos 起切分条目（规则见 bibtex_parser.scan_entries），产出 (起始偏移, 结束偏移, 小写条目类型)
+        括号不匹配的条目截止于行首的下一个 @type{ 之前；文件末尾的条目未闭合时，最后产出 (起始偏移, None, 小写条目类型)
+        """
+        def lines():
+            start = pos
+            size = len(data)
+            while start < size:
+                nl = data.find(b'\n', start)
+                end = size if nl == -1 else nl + 1
+                yield data[start:end]
+                start = end
+
+        for entry_type, body, start, end, line, resync_line in scan_entries(lines(), pos):
+            yield start, end, entry_type.lower()
+
+    def _process(self, entry_type: str, text: bytes, macros: Dict, line: int, resync: bool = True) -> Tuple:
+        """
+        解析单个条目（规则与整体解析相同），返回记录；text 为条目原文，line 为条目起始行号
+        条目在 text 内未闭合时记录与整体解析相同的警告：截止于行首的下一个 @type{（resync 为 False 时为文件末尾）
+        """
+        parser = self.parser
+        for raw_type, body, _, end, _, _ in scan_entries(text.splitlines(True), 0, line):
+            if end is None:
+                resync_line = line + text.count(b'\n') if resync else 0
+                return entry_type, macros, None, '', [parser._unbalanced_warning(raw_type, body, line, resync_line)]
+            if entry_type in SKIP_TYPES:
+                break
+            body = body.decode('utf-8', 'replace')
+            if entry_type == 'string':
+                parser.macros = dict(macros)
+                parser._build_entry(raw_type, body)
+                return entry_type, parser.macros, None, '', []
+            parser.macros = macros
+            _, entry, formatted, errors = parser._process_entry(raw_type, body, True)
+            return entry_type, macros, entry, formatted, errors
+        return entry_type, macros, None, '', []
+
+    @staticmethod
+    def _has_warning(record: Tuple) -> bool:
+        """未产生条目且带警告（如括号未闭合，警告含行号）的记录"""
+        return record[2] is None and bool(record[4])
+
+    def _renumber(self, data: bytes, indices: Iterable[int], delta: int):
+        """重新处理沿用的条目中带行号警告的记录；条目位置按 delta 平移"""
+        line, counted = 1, 0
+        for k in indices:
+            record = self.records[k]
+            if not self._has_warning(record):
+                continue
+            s = self.starts[k] + delta
+            line += data.count(b'\n', counted, s)
+            counted = s
+            self.records[k] = self._process(record[0], data[s:self.ends[k] + delta], record[1], line)
+
+    def _write(self, i: int, removed: List[int], added: List[int], full: bool):
+        """重建受影响的输出行，并从第一处变化的行起改写输出文件；removed / added 为新旧条目的占位（见 kinds）"""
+        # 第 i 个条目之前的编号与输出行数
+        before = self.kinds[:i]
+        number = i - before.count(0)
+        line = before.count(2)
+        numbered = len(added) - added.count(0)
+        segment = list(self._render(self.records[i:i + len(added)], number))
+        if numbered != len(removed) - removed.count(0):
+            # 条目数变化时其后编号整体平移，需重新生成
+            segment.extend(self._render(self.records[i + len(added):], number + numbered))
+            end = len(self.lines)
+        else:
+            end = line + removed.count(2)
+
+        same_size = end - line == len(segment) and \
+            self.offsets[end] - self.offsets[line] == sum(map(len, segment))
+        self.lines[line:end] = segment
+        if same_size:
+            # 总长不变但各行长度可能不同
+            self.offsets[line:end + 1] = accumulate(map(len, segment), initial=self.offsets[line])
+        else:
+            self.offsets[line:] = accumulate(map(len, self.lines[line:]), initial=self.offsets[line])
+
+        if full:
+            with open(self.output, 'wb') as f:
+                f.write(b''.join(self.lines))
+            return
+        with open(self.output, 'r+b') as f:
+            f.seek(self.offsets[line])
+            if same_size:
+                f.write(b''.join(segment))
+            else:
+                f.write(b''.join(self.lines[line:]))
+                f.truncate()
+
+    @staticmethod
+    def _render(records: Iterable[Tuple], number: int) -> Iterator[bytes]:
+        """与 format_file() 相同的编号规则：每个有效条目占一个编号，格式化结果为空的不输出"""
+        for _, _, entry, formatted, _ in records:
+            if entry is None:
+                continue
+            number += 1
+            if formatted:
+                yield f"[{number}] {formatted}\n".encode('utf-8')
+
+
+def watch(watchers: List[BibWatcher], interval: float = 0.2, debounce: float = 0.1,
+          on_update: Optional[Callable[[BibWatcher, Dict], None]] = None,
+          should_stop: Optional[Callable[[], bool]] = None):
+    """
+    轮询监视各文件：修改时间或大小变化后，等内容稳定 debounce 秒（连续保存只处理最后一次）再增量更新
+    on_update(watcher, stats) 在每次更新后调用；should_stop() 返回 True 时退出
+    """
+    changed = {}    # watcher -> (最近一次看到的签名, 看到的时间)
+    while should_stop is None or not should_stop():
+        now = time.monotonic()
+        for watcher in watchers:
+            signature = watcher.poll()
+            if signature is None:
+                continue
+            if signature == watcher.signature:
+                changed.pop(watcher, None)
+                continue
+            seen = changed.get(watcher)
+            if seen is None or seen[0] != signature:
+                changed[watcher] = (signature, now)
+            elif now - seen[1] >= debounce:
+                del changed[watcher]
+                stats = watcher.refresh()
+                if stats is not None and on_update is not None:
+                    on_update(watcher, stats)
+        time.sleep(min(interval, debounce) if changed else interval)
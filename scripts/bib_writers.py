@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+BibTeX 条目的流式输出
+每种格式一个写出器：逐条写入缓冲输出流，不在内存中保留结果
+格式：gbt（著录文本，默认 GB/T 7714）、jsonl、csv、bibtex（规范化 BibTeX）、markdown
+"""
+
+import re
+import csv
+import json
+from typing import Dict, Optional, TextIO
+
+
+class EntryWriter:
+    """
+    写出器基类
+    write() 接收条目及其格式化结果（未预先渲染时为 None）；close() 只刷新，不关闭输出流
+    """
+
+    # 需要著录样式渲染结果的格式设为 True，解析时可一并在工作进程中渲染
+    NEEDS_RENDER = False
+
+    def __init__(self, out: TextIO, parser, show_citekey: bool = False):
+        self.out = out
+        self.parser = parser
+        self.show_citekey = show_citekey
+        self.index = 0      # 已处理的条目数（编号）
+        self.count = 0      # 已写出的条目数
+
+    def write(self, entry: Dict, formatted: Optional[str] = None):
+        self.index += 1
+        if self._write(entry, formatted):
+            self.count += 1
+
+    def _write(self, entry: Dict, formatted: Optional[str]) -> bool:
+        raise NotImplementedError
+
+    def _formatted(self, entry: Dict, formatted: Optional[str]) -> str:
+        return self.parser.format_entry(entry) if formatted is None else formatted
+
+    def close(self):
+        self.out.flush()
+
+
+class GBTWriter(EntryWriter):
+    """著录文本（默认 GB/T 7714，随解析器的著录样式），与 format_file() 的输出一致"""
+
+    NEEDS_RENDER = True
+
+    def _write(self, entry, formatted):
+        formatted = self._formatted(entry, formatted)
+        if not formatted:
+            return False
+        citekey = entry.get('citekey', '')
+        if self.show_citekey and citekey:
+            self.out.write(f"[{self.index}] {citekey}: {formatted}\n")
+        else:
+            self.out.write(f"[{self.index}] {formatted}\n")
+        return True
+
+
+class JSONLinesWriter(EntryWriter):
+    """每行一个 JSON 对象（字段 + type + citekey）"""
+
+    def _write(self, entry, formatted):
+        self.out.write(json.dumps(entry.to_dict() if hasattr(entry, 'to_dict') else dict(entry),
+                                  ensure_ascii=False) + '\n')
+        return True
+
+
+class CSVWriter(EntryWriter):
+    """固定列的 CSV；非常用字段以 JSON 形式放入 extra 列"""
+
+    COLUMNS = (
+        'citekey', 'type', 'author', 'title', 'journal', 'booktitle', 'year', 'volume', 'number',
+        'issue', 'pages', 'publisher', 'address', 'location', 'edition', 'school', 'university',
+        'institution', 'organization', 'editor', 'series', 'month', 'url', 'urldate', 'doi', 'note',
+    )
+
+    def __init__(self, out, parser, show_citekey=False):
+        super().__init__(out, parser, show_citekey)
+        self._columns = set(self.COLUMNS)
+        self._csv = csv.writer(out)
+        self._csv.writerow(self.COLUMNS + ('extra',))
+
+    def _write(self, entry, formatted):
+        extra = {name: value for name, value in entry.items() if name not in self._columns}
+        row = [entry.get(name, '') or '' for name in self.COLUMNS]
+        row.append(json.dumps(extra, ensure_ascii=False) if extra else '')
+        self._csv.writerow(row)
+        return True
+
+
+class BibTeXWriter(EntryWriter):
+    """规范化 BibTeX（宏已展开，字段值统一用括号包裹，保留保护大小写的括号组）"""
+
+    def _write(self, entry, formatted):
+        self.out.write(self.parser.to_bibtex(entry) + '\n')
+        return True
+
+
+class MarkdownWriter(EntryWriter):
+    """Markdown 有序列表，内容为著录样式的渲染结果"""
+
+    NEEDS_RENDER = True
+
+    ESCAPE_RE = re.compile(r'([\\`*_<>])')
+
+    def _write(self, entry, formatted):
+        formatted = self._formatted(entry, formatted)
+        if not formatted:
+            return False
+        text = self.ESCAPE_RE.sub(r'\\\1', formatted)
+        citekey = entry.get('citekey', '')
+        if self.show_citekey and citekey:
+            self.out.write(f"{self.index}. `{citekey}` {text}\n")
+        else:
+            self.out.write(f"{self.index}. {text}\n")
+        return True
+
+
+WRITERS = {
+    'gbt': GBTWriter,
+    'jsonl': JSONLinesWriter,
+    'csv': CSVWriter,
+    'bibtex': BibTeXWriter,
+    'markdown': MarkdownWriter,
+}
+
+
+def make_writer(fmt: str, out: TextIO, parser, show_citekey: bool = False) -> EntryWriter:
+    """按格式名创建写出器"""
+    writer_cls = WRITERS.get(fmt)
+    if writer_cls is None:
+        raise ValueError(f"不支持的输出格式：{fmt}（可选：{', '.join(WRITERS)}）")
+    return writer_cls(out, parser, show_citekey)
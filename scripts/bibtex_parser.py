@@ -6,276 +6,1136 @@ BibTeX 文件解析工具 v1.2
 优化：英文作者解析、错误提示、统计信息
 """
 
+import os
 import re
 import sys
+import json
+import time
+import sqlite3
+import hashlib
 import argparse
-from typing import Dict, List, Optional, Tuple
+from collections import deque
+from functools import lru_cache
+import heapq
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, TextIO, Tuple
+
+from bib_dedup import DuplicateFinder
+from citation_styles import GBT7714, STYLES, CitationStyle, get_style
+from bib_index import BibIndex
+from bib_sort import SortKeyBuilder, sort_author_year
+from bib_writers import WRITERS, make_writer
+from latex_cites import CitationScanner, missing_keys
+
+
+class BibEntry:
+    """
+    紧凑的 BibTeX 条目
+    常用字段存放在 __slots__ 中，其余字段放入按需创建的 extra 字典；字段名与常见取值均驻留（intern）
+    保留字典式访问（entry['title']、entry.get(...)、items() 等）以兼容旧代码
+    字段值中保护大小写的括号组（{GPU}）在取值时去掉，原文另存于按需创建的 raw 字典，供 BibTeX 输出使用
+    """
+    
+    FIELDS = (
+        'author', 'title', 'journal', 'booktitle', 'year', 'volume', 'number', 'issue',
+        'pages', 'publisher', 'address', 'location', 'edition', 'school', 'university',
+        'institution', 'organization', 'editor', 'series', 'month', 'url', 'urldate',
+        'doi', 'note',
+    )
+    # 在大型文献库中高度重复的取值
+    INTERNED_VALUES = frozenset((
+        'journal', 'booktitle', 'year', 'volume', 'publisher', 'address', 'location',
+        'school', 'university', 'institution', 'organization', 'series', 'month',
+    ))
+    
+    # 保留分组括号的姓名字段（{World Health Organization} 等，由作者拆分处理）
+    NAME_FIELDS = frozenset(('author', 'editor'))
+    GROUP_BRACE_RE = re.compile(r'(?<!\\)[{}]')
+    
+    __slots__ = ('type', 'citekey', 'extra', 'raw') + FIELDS
+    
+    _FIELD_SET = frozenset(FIELDS)
+    
+    def __init__(self, entry_type: str, citekey: str, fields: Optional[Dict] = None):
+        """fields 的取值可含括号组（如解析器的输出或 to_dict(raw=True) 的结果）"""
+        self.extra = None
+        self.raw = None
+        if fields:
+            for name, value in fields.items():
+                if name == 'type' or name == 'citekey':
+                    continue
+                self._set(name, value)
+        # 条目类型与引用键优先于同名字段
+        self.type = sys.intern(entry_type)
+        self.citekey = citekey
+    
+    def _set(self, name: str, value: str):
+        if ('{' in value or '}' in value) and name not in self.NAME_FIELDS:
+            clean = ' '.join(self.GROUP_BRACE_RE.sub('', value).split())
+            if clean != value:
+                if self.raw is None:
+                    self.raw = {}
+                self.raw[name] = value
+                value = clean
+        if name in self._FIELD_SET:
+            if name in self.INTERNED_VALUES:
+                value = sys.intern(value)
+            setattr(self, name, value)
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[sys.intern(name)] = value
+    
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'BibEntry':
+        """由旧式条目字典（含 type、citekey）构建"""
+        fields = dict(data)
+        return cls(fields.pop('type', 'misc'), fields.pop('citekey', ''), fields)
+    
+    def copy(self) -> 'BibEntry':
+        """浅拷贝（字段值为不可变字符串，可直接共享）"""
+        new = BibEntry.__new__(BibEntry)
+        for name in self.__slots__:
+            value = getattr(self, name, None)
+            if value is not None:
+                setattr(new, name, value)
+        new.extra = dict(self.extra) if self.extra else None
+        new.raw = dict(self.raw) if self.raw else None
+        return new
+    
+    def to_dict(self, raw: bool = False) -> Dict:
+        """转换为普通字典（含 type、citekey）；raw 为 True 时字段值保留原文中的括号组"""
+        data = dict(self._iter_fields(raw))
+        data['type'] = self.type
+        data['citekey'] = self.citekey
+        return data
+    
+    def _iter_fields(self, raw: bool = False) -> Iterator[Tuple[str, str]]:
+        originals = self.raw if raw and self.raw else {}
+        for name in self.FIELDS:
+            value = getattr(self, name, None)
+            if value is not None:
+                yield name, originals.get(name, value)
+        if self.extra:
+            for name, value in self.extra.items():
+                yield name, originals.get(name, value)
+    
+    def get(self, name: str, default=None):
+        if name in self._FIELD_SET or name == 'type' or name == 'citekey':
+            return getattr(self, name, default)
+        if self.extra:
+            return self.extra.get(name, default)
+        return default
+    
+    def __getitem__(self, name: str) -> str:
+        value = self.get(name)
+        if value is None:
+            raise KeyError(name)
+        return value
+    
+    def __setitem__(self, name: str, value: str):
+        if name == 'type':
+            self.type = sys.intern(value)
+        elif name == 'citekey':
+            self.citekey = value
+        else:
+            if self.raw:
+                self.raw.pop(name, None)
+            self._set(name, value)
+    
+    def __delitem__(self, name: str):
+        self[name]  # 不存在时抛出 KeyError
+        if self.raw:
+            self.raw.pop(name, None)
+        if name in self._FIELD_SET:
+            delattr(self, name)
+        elif name in ('type', 'citekey'):
+            raise KeyError(name)
+        else:
+            del self.extra[name]
+    
+    def __contains__(self, name) -> bool:
+        return self.get(name) is not None
+    
+    def keys(self) -> List[str]:
+        return [name for name, _ in self._iter_fields()] + ['type', 'citekey']
+    
+    def values(self) -> List[str]:
+        return [self[name] for name in self.keys()]
+    
+    def items(self) -> List[Tuple[str, str]]:
+        return [(name, self[name]) for name in self.keys()]
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(self.keys())
+    
+    def __len__(self) -> int:
+        return len(self.keys())
+    
+    def __eq__(self, other) -> bool:
+        if isinstance(other, BibEntry):
+            return self.to_dict() == other.to_dict()
+        if isinstance(other, dict):
+            return self.to_dict() == other
+        return NotImplemented
+    
+    def __getstate__(self):
+        return self.type, self.citekey, list(self._iter_fields(raw=True))
+    
+    def __setstate__(self, state):
+        entry_type, citekey, fields = state
+        self.__init__(entry_type, citekey, dict(fields))
+    
+    def __repr__(self) -> str:
+        return f"BibEntry({self.type!r}, {self.citekey!r}, {dict(self._iter_fields())!r})"
+
+
+class AuthorNormalizer:
+    """
+    作者姓名规范化引擎
+    同一原始作者字符串在每种著录样式下只解析一次，拆分结果与渲染结果保存在有界 LRU 缓存中
+    """
+    
+    MAX_CACHE = 65536
+    
+    AND_RE = re.compile(r'\s+and\s+', re.IGNORECASE)
+    TOKEN_RE = re.compile(r'[^\s,]+')
+    CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+    ESCAPED_BRACE_RE = re.compile(r'\{\\[A-Za-z]+\}')
+    
+    def __init__(self, maxsize: int = MAX_CACHE):
+        self.maxsize = maxsize
+        # 著录样式 -> 该样式的 LRU 查询函数；按样式分开缓存，键只含作者字符串
+        self._lookups = {}
+    
+    @property
+    def hits(self) -> int:
+        return sum(lookup.cache_info().hits for lookup in self._lookups.values())
+    
+    @property
+    def misses(self) -> int:
+        return sum(lookup.cache_info().misses for lookup in self._lookups.values())
+    
+    def _lookup(self, style: CitationStyle) -> Callable[[str], Tuple[Tuple[str, ...], str]]:
+        lookup = self._lookups.get(style)
+        if lookup is None:
+            lookup = self._lookups[style] = lru_cache(maxsize=self.maxsize)(
+                lambda author: self._normalize(author, style))
+        return lookup
+    
+    def split(self, author: str) -> Tuple[str, ...]:
+        """拆分并规范化作者列表，返回每位作者的 GB/T 7714 写法"""
+        if not author:
+            return ()
+        return self._lookup(GBT7714)(author)[0]
+    
+    def format(self, author: str, style: CitationStyle = GBT7714) -> str:
+        """返回作者列表在指定著录样式下的写法"""
+        if not author:
+            return ""
+        lookup = self._lookups.get(style)
+        if lookup is None:
+            lookup = self._lookup(style)
+        return lookup(author)[1]
+    
+    def build_table(self, entries: Iterable) -> Dict[str, List[str]]:
+        """构建作者表：规范化作者名 -> 引用键列表（按条目出现顺序）"""
+        table = {}
+        for entry in entries:
+            citekey = entry.get('citekey', '')
+            for name in self.split(entry.get('author', '')):
+                table.setdefault(name, []).append(citekey)
+        return table
+    
+    def _normalize(self, author: str, style: CitationStyle) -> Tuple[Tuple[str, ...], str]:
+        format_name = style.format_name
+        names = tuple([sys.intern(surname if initials is None else format_name(surname, initials))
+                       for surname, initials in self._split_parts(author)])
+        return names, style.join_names(list(names))
+    
+    def _split_parts(self, author: str) -> Iterator[Tuple[str, Optional[List[str]]]]:
+        """
+        拆分作者列表，产出每位作者的 (姓, 名首字母)
+        整个姓名是一个括号组（如 {World Health Organization}）时为机构名，原样输出，名首字母为 None；
+        含汉字的姓名（如 王小明、王, 小明）按书写顺序去掉空格与逗号后整体输出，名首字母同样为 None；
+        其余括号组内的空格、逗号与 and 不作分隔
+        """
+        # 清理转义字符的括号（如 {\L}ukasz），其余括号组保留到拆分之后
+        author = self.ESCAPED_BRACE_RE.sub(lambda m: m.group()[1:-1], author)
+        masked = self._mask_groups(author)
+        start = 0
+        # BibTeX 作者格式：First Last and First Last 或 Last, First and Last, First
+        for m in [*self.AND_RE.finditer(masked), None]:
+            end = m.start() if m else len(author)
+            a, top = author[start:end], masked[start:end]
+            start = m.end() if m else end
+            
+            tokens = [a[t.start():t.end()] for t in self.TOKEN_RE.finditer(top)]
+            if not tokens:
+                continue
+            if len(tokens) == 1 and tokens[0][0] == '{' and tokens[0][-1] == '}' and '{' not in top[1:]:
+                yield ' '.join(tokens[0][1:-1].split()), None
+                continue
+            if not a.isascii() and self.CJK_RE.search(a):
+                yield ''.join(self._strip_groups(a).replace(',', ' ').split()), None
+                continue
+            
+            # 处理 "Last, First" 格式
+            comma = top.find(',')
+            if comma != -1:
+                last = self._strip_groups(a[:comma].strip())
+                yield last, self._initials(self._strip_groups(a[comma + 1:]).split())
+            else:
+                # 处理 "First Last" 格式，最后一个是姓
+                parts = [self._strip_groups(token) for token in tokens]
+                if len(parts) >= 2:
+                    yield parts[-1], self._initials(parts[:-1])
+                else:
+                    yield parts[0], []
+    
+    @staticmethod
+    def _mask_groups(text: str) -> str:
+        """把括号组内部的字符替换为占位符（长度不变），只在顶层查找分隔符"""
+        if '{' not in text:
+            return text
+        chars = list(text)
+        depth = 0
+        for i, c in enumerate(text):
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth = max(depth - 1, 0)
+            elif depth:
+                chars[i] = '_'
+        return ''.join(chars)
+    
+    @staticmethod
+    def _strip_groups(text: str) -> str:
+        return text.replace('{', '').replace('}', '') if '{' in text else text
+    
+    @staticmethod
+    def _initials(parts: List[str]) -> List[str]:
+        """名缩写"""
+        return [p[0].upper() for p in parts if p and p not in [',', ';']]
+
+
+class StageProfiler:
+    """
+    分阶段性能统计（默认关闭）
+    累计各阶段耗时与次数，记录最慢的若干条目，并可通过钩子把观测值转发给外部指标系统
+    钩子签名：hook(阶段名, 耗时秒数, 次数)
+    """
+    
+    STAGE_LABELS = {
+        'match_entries': '条目切分',
+        'cache_lookup': '缓存查询',
+        'parse_fields': '字段解析',
+        'format_author': '作者格式化',
+        'render': '格式渲染',
+        'sort': '排序',
+    }
+    TOP_N = 10
+    
+    def __init__(self, top_n: int = TOP_N):
+        self.top_n = top_n
+        self.seconds = {}
+        self.counts = {}
+        self.hooks = []
+        self._slowest = []  # 最小堆：(耗时, 引用键)
+    
+    def add_hook(self, hook: Callable[[str, float, int], None]):
+        """注册钩子，每次记录阶段耗时时调用"""
+        self.hooks.append(hook)
+    
+    def add(self, stage: str, seconds: float, count: int = 1):
+        """累计某阶段的耗时与次数"""
+        self.seconds[stage] = self.seconds.get(stage, 0.0) + seconds
+        self.counts[stage] = self.counts.get(stage, 0) + count
+        for hook in self.hooks:
+            hook(stage, seconds, count)
+    
+    def add_entry(self, citekey: str, seconds: float):
+        """记录单个条目的处理耗时，只保留最慢的 top_n 条"""
+        if len(self._slowest) < self.top_n:
+            heapq.heappush(self._slowest, (seconds, citekey))
+        elif seconds > self._slowest[0][0]:
+            heapq.heapreplace(self._slowest, (seconds, citekey))
+    
+    def slowest(self) -> List[Tuple[str, float]]:
+        """最慢条目列表（从慢到快）"""
+        return [(citekey, seconds) for seconds, citekey in sorted(self._slowest, reverse=True)]
+    
+    def snapshot(self) -> Dict:
+        """导出为可 JSON 序列化的字典"""
+        return {
+            'stages': {stage: {'seconds': self.seconds[stage], 'count': self.counts[stage]}
+                       for stage in self.seconds},
+            'slowest': [{'citekey': citekey, 'seconds': seconds} for citekey, seconds in self.slowest()],
+        }
+    
+    def merge(self, snapshot: Dict):
+        """合并另一个统计（如进程池中工作进程）的快照"""
+        for stage, item in snapshot['stages'].items():
+            self.add(stage, item['seconds'], item['count'])
+        for item in snapshot['slowest']:
+            self.add_entry(item['citekey'], item['seconds'])
+    
+    def report(self) -> str:
+        """生成可读的分阶段耗时报告"""
+        total = sum(self.seconds.values()) or 1.0
+        lines = ["⏱️ 分阶段耗时：",
+                 f"  {'阶段':<10} {'耗时(ms)':>12} {'次数':>10} {'占比':>7}"]
+        for stage, seconds in sorted(self.seconds.items(), key=lambda item: -item[1]):
+            label = self.STAGE_LABELS.get(stage, stage)
+            lines.append(f"  {label:<10} {seconds * 1000:12.1f} {self.counts[stage]:10d} {seconds / total:7.1%}")
+        slowest = self.slowest()
+        if slowest:
+            lines.append("")
+            lines.append("🐢 最慢条目：")
+            for citekey, seconds in slowest:
+                lines.append(f"  {citekey}: {seconds * 1000:.3f} ms")
+        return '\n'.join(lines)
+
+
+class EntryCache:
+    """
+    条目级持久化缓存（SQLite）
+    以 "格式化版本 + 宏定义 + 原始条目文本" 的哈希为键，保存解析字段与 GB/T 7714 结果
+    """
+    
+    SUFFIX = '.cache.db'
+    # 超出上限时按最近使用时间淘汰
+    MAX_ENTRIES = 200000
+    
+    def __init__(self, path: str, version: str, max_entries: int = MAX_ENTRIES):
+        self.path = path
+        self.version = version
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._stamp = int(time.time())
+        self._touched = []
+        self._macros_key = None
+        self._macros_digest = b''
+        self.conn = sqlite3.connect(path)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS entries ('
+            'key BLOB PRIMARY KEY, fields TEXT NOT NULL, formatted TEXT NOT NULL, used INTEGER NOT NULL)')
+    
+    def make_keys(self, macros: Dict, chunk: List[Tuple[str, str]]) -> List[bytes]:
+        """计算分块内每个条目的缓存键"""
+        macros_key = sorted(macros.items())
+        if macros_key != self._macros_key:
+            self._macros_key = macros_key
+            self._macros_digest = hashlib.blake2b(
+                json.dumps(macros_key, ensure_ascii=False).encode('utf-8'), digest_size=16).digest()
+        prefix = self.version.encode('utf-8') + b'\0' + self._macros_digest
+        keys = []
+        for entry_type, body in chunk:
+            h = hashlib.blake2b(prefix, digest_size=16)
+            h.update(f"{entry_type.lower()}\0{body}".encode('utf-8'))
+            keys.append(h.digest())
+        return keys
+    
+    def get_many(self, keys: List[bytes]) -> Dict[bytes, Tuple[BibEntry, str]]:
+        """批量查询，返回命中的 {键: (字段, 格式化结果)}"""
+        if not keys:
+            return {}
+        placeholders = ','.join('?' * len(keys))
+        rows = self.conn.execute(
+            f'SELECT key, fields, formatted FROM entries WHERE key IN ({placeholders})', keys)
+        hits = {key: (BibEntry.from_dict(json.loads(fields)), formatted)
+                for key, fields, formatted in rows}
+        self.hits += len(hits)
+        self.misses += len(keys) - len(hits)
+        self._touched.extend(hits)
+        return hits
+    
+    def put_many(self, rows: List[Tuple[bytes, BibEntry, str]]):
+        """批量写入新解析的条目"""
+        self.conn.executemany(
+            'INSERT OR REPLACE INTO entries (key, fields, formatted, used) VALUES (?, ?, ?, ?)',
+            [(key, json.dumps(entry.to_dict(raw=True), ensure_ascii=False), formatted, self._stamp)
+             for key, entry, formatted in rows])
+    
+    def close(self):
+        """刷新使用时间、按上限淘汰最久未用的条目并提交"""
+        try:
+            if self._touched:
+                self.conn.executemany('UPDATE entries SET used = ? WHERE key = ?',
+                                      [(self._stamp, key) for key in self._touched])
+            count = self.conn.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            if count > self.max_entries:
+                self.conn.execute(
+                    'DELETE FROM entries WHERE key IN '
+                    '(SELECT key FROM entries ORDER BY used ASC LIMIT ?)',
+                    (count - self.max_entries,))
+            self.conn.commit()
+        finally:
+            self.conn.close()
+
+
+# 条目切分规则（BibTeXParser、BibIndex 与 BibWatcher 共用），作用于字节以便记录偏移
+ENTRY_START_RE = re.compile(rb'@(\w+)\s*\{')
+# 括号、引号与注释符（\% 为转义的百分号，单独匹配以便跳过）
+ENTRY_SCAN_RE = re.compile(rb'\\%|[{}"%]')
+COMMENT_RE = re.compile(rb'(?<!\\)%')
+LINE_ENTRY_RE = re.compile(rb'\s*@(\w+)\s*\{')
+# 不产生参考文献的特殊条目；其内部不做重新同步
+SKIP_TYPES = frozenset(('comment', 'preamble'))
+
+
+def scan_entries(lines: Iterable[bytes], offset: int = 0,
+                 first_line: int = 1) -> Iterator[Tuple[str, bytes, int, Optional[int], int, int]]:
+    """
+    按括号深度切分条目（含 @string、@comment、@preamble），产出
+    (条目类型, 主体, 起始偏移, 结束偏移, 起始行号, 重新同步的行号)
+    主体为 "citekey, fields..."，不含最外层括号，字段之间的注释换成换行；offset 为第一行的字节偏移
+    % 只在条目之外与字段之间（不在括号或引号值内，且不是 \\%）视为注释
+    条目未闭合时，遇到行首的下一个 @type{（@comment、@preamble 内除外）即从该行重新同步：
+    该条目的结束偏移为这一行的行首，重新同步的行号为这一行的行号；正常闭合的条目重新同步的行号为 0
+    输入结束时仍未闭合的条目最后产出，结束偏移为 None
+    """
+    entry_type = None
+    parts = []
+    depth = 0
+    quoted = False
+    start = start_line = 0
+    
+    for lineno, line in enumerate(lines, first_line):
+        if entry_type is not None and LINE_ENTRY_RE.match(line) and entry_type.lower() not in SKIP_TYPES:
+            yield entry_type, b''.join(parts), start, offset, start_line, lineno
+            entry_type = None
+        
+        pos = 0
+        while True:
+            if entry_type is None:
+                # 条目之外：% 之后为注释
+                comment = COMMENT_RE.search(line, pos)
+                m = ENTRY_START_RE.search(line, pos, comment.start() if comment else len(line))
+                if not m:
+                    break
+                entry_type = m.group(1).decode('ascii')
+                parts = []
+                depth = 1
+                quoted = False
+                start = offset + m.start()
+                start_line = lineno
+                pos = m.end()
+            
+            end = None
+            for t in ENTRY_SCAN_RE.finditer(line, pos):
+                c = t.group()
+                if c == b'{':
+                    depth += 1
+                elif c == b'}':
+                    depth -= 1
+                    if depth == 0:
+                        end = t.end()
+                        break
+                elif c == b'"':
+                    if depth == 1:
+                        quoted = not quoted
+                elif c == b'%' and depth == 1 and not quoted:
+                    # 字段之间的注释：丢弃到行尾
+                    parts.append(line[pos:t.start()])
+                    parts.append(b'\n')
+                    pos = len(line)
+                    break
+            
+            if end is None:
+                parts.append(line[pos:])
+                break
+            parts.append(line[pos:end - 1])
+            yield entry_type, b''.join(parts), start, offset + end, start_line, 0
+            entry_type = None
+            pos = end
+        
+        offset += len(line)
+    
+    if entry_type is not None:
+        yield entry_type, b''.join(parts), start, None, start_line, 0
 
 
 class BibTeXParser:
     """BibTeX 文件解析器"""
     
-    TYPE_MAP = {
-        'article': 'J',
-        'inproceedings': 'C',
-        'proceedings': 'C',
-        'book': 'M',
-        'inbook': 'M',
-        'incollection': 'M',
-        'phdthesis': 'D',
-        'mastersthesis': 'D',
-        'thesis': 'D',
-        'techreport': 'R',
-        'manual': 'R',
-        'misc': 'EB/OL',
-        'online': 'EB/OL',
-        'www': 'EB/OL',
-        'patent': 'P',
-        'standard': 'S',
+    # GB/T 7714 文献类型标识
+    TYPE_MAP = GBT7714.labels
+    
+    # 不产生参考文献的特殊条目
+    SKIP_TYPES = SKIP_TYPES
+    
+    # BibTeX 内置月份宏
+    MONTH_MACROS = {
+        'jan': 'January', 'feb': 'February', 'mar': 'March', 'apr': 'April',
+        'may': 'May', 'jun': 'June', 'jul': 'July', 'aug': 'August',
+        'sep': 'September', 'oct': 'October', 'nov': 'November', 'dec': 'December',
     }
     
-    def __init__(self):
+    BRACE_RE = re.compile(r'[{}]')
+    QUOTE_SCAN_RE = re.compile(r'[{}"]')
+    FIELD_NAME_RE = re.compile(r'[\s,]*([^\s=,{}"#]+)\s*=\s*')
+    # 简单字段：括号值内最多再嵌套一层（如 {A {GPU} Study}）；括号值分组只取括号内的内容
+    SIMPLE_FIELD_RE = re.compile(
+        r'([^\s=,{}"#]+)\s*=\s*(?:\{([^{}]*(?:\{[^{}]*\}[^{}]*)*)\}|("[^"{}]*")|([^\s,{}"]+))')
+    BARE_VALUE_RE = re.compile(r'[^\s,#{}"]+')
+    CONCAT_RE = re.compile(r'\s*#\s*')
+    
+    # 格式化规则版本；修改著录样式的输出时递增，使旧缓存失效
+    FORMATTER_VERSION = '1.5'
+    
+    def __init__(self, use_cache: bool = False, profile: bool = False, style: str = GBT7714.name):
         self.entries = []
         self.errors = []
         self.stats = {'total': 0, 'success': 0, 'failed': 0}
+        self.macros = dict(self.MONTH_MACROS)
+        self.use_cache = use_cache
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self.authors = AuthorNormalizer()
+        self.author_stats = {'hits': 0, 'misses': 0}
+        self._helper = None
+        # 著录样式（见 citation_styles.STYLES）
+        self.style = get_style(style)
+        # 分阶段性能统计；为 None 时不计时
+        self.profiler = StageProfiler() if profile else None
+    
+    def _reset(self):
+        """开始新一轮解析前重置统计与宏定义"""
+        self.stats = {'total': 0, 'success': 0, 'failed': 0}
+        self.macros = dict(self.MONTH_MACROS)
+        self.cache_stats = {'hits': 0, 'misses': 0}
+        self.author_stats = {'hits': 0, 'misses': 0}
+    
+    # 每个分块（并行任务 / 缓存批量查询）包含的条目数
+    CHUNK_SIZE = 500
+    
+    def parse_file(self, filepath: str, jobs: int = 1) -> List[BibEntry]:
+        """解析 BibTeX 文件，jobs > 1 时在多进程中解析"""
+        self.entries = list(self.iter_entries(filepath, jobs))
+        return self.entries
+    
+    def iter_entries(self, filepath: str, jobs: int = 1) -> Iterator[BibEntry]:
+        """
+        流式解析 BibTeX 文件
+        逐行读取、按块产出条目，内存占用与文件大小无关
+        """
+        for outcome, entry, formatted, errors in self._iter_records(filepath, jobs, render=False):
+            if entry is not None:
+                yield entry
+    
+    def format_file(self, filepath: str, show_citekey: bool = False, jobs: int = 1) -> Iterator[str]:
+        """
+        解析并格式化 BibTeX 文件，按原文顺序流式产出 "[i] ..." 结果
+        jobs > 1 时解析与格式化在进程池中进行，编号、统计与错误信息与串行一致
+        """
+        i = 0
+        for outcome, entry, formatted, errors in self._iter_records(filepath, jobs, render=True):
+            if entry is None:
+                continue
+            i += 1
+            citekey = entry.get('citekey', '')
+            if formatted:
+                if show_citekey and citekey:
+                    yield f"[{i}] {citekey}: {formatted}"
+                else:
+                    yield f"[{i}] {formatted}"
     
-    def parse_file(self, filepath: str) -> List[Dict]:
-        """解析 BibTeX 文件"""
+    def _iter_records(self, filepath: str, jobs: int, render: bool) -> Iterator[Tuple]:
+        """
+        按条目边界切块处理，按原文顺序产出 (结果, 条目, 格式化结果, 错误信息) 记录
+        命中缓存的条目不再解析；其余条目在本进程或进程池中处理
+        同时在途的分块数受限，保证内存占用不随文件大小增长
+        """
+        self._reset()
+        cache = self._open_cache(filepath)
+        if cache is not None:
+            render = True  # 缓存总是同时保存字段与格式化结果
+        executor = ProcessPoolExecutor(max_workers=jobs) if jobs > 1 else None
         try:
-            with open(filepath, 'r', encoding='utf-8') as f:
-                content = f.read()
-            return self.parse_string(content)
+            with open(filepath, 'rb') as f:
+                pending = deque()
+                for macros, chunk, warnings in self._iter_chunks(f):
+                    pending.append(self._submit_chunk(executor, cache, macros, chunk, render) + (warnings,))
+                    # 串行时处理完一块即输出；并行时保持每个进程约两块在途
+                    if executor is None or len(pending) >= jobs * 2:
+                        yield from self._collect_chunk(cache, *pending.popleft())
+                while pending:
+                    yield from self._collect_chunk(cache, *pending.popleft())
         except FileNotFoundError:
             self.errors.append(f"错误：文件不存在：{filepath}")
-            return []
         except Exception as e:
             self.errors.append(f"错误：{e}")
-            return []
+        finally:
+            if executor is not None:
+                executor.shutdown()
+            if cache is not None:
+                self.cache_stats['hits'] += cache.hits
+                self.cache_stats['misses'] += cache.misses
+                cache.close()
     
-    def parse_string(self, content: str) -> List[Dict]:
-        """解析 BibTeX 字符串"""
-        entries = []
-        self.stats['total'] = 0
+    def _iter_chunks(self, lines: Iterable[bytes]) -> Iterator[Tuple[Dict, List[Tuple[str, str]], Dict[int, List[str]]]]:
+        """
+        将原始条目按 CHUNK_SIZE 分块，产出 (宏定义快照, 条目列表, 扫描警告)
+        扫描警告（括号未闭合等）为 {块内位置: [警告]}，与条目记录一起按原文顺序输出
+        @string 在主进程中登记，遇到时先提交当前块，保证宏的作用顺序不变
+        """
+        chunk = []
+        warnings = {}
+        for entry_type, body in self._scan_entries(lines, inline_warnings=True):
+            if entry_type is None:
+                warnings.setdefault(len(chunk), []).append(body)
+                continue
+            if entry_type.lower() == 'string':
+                if chunk or warnings:
+                    yield dict(self.macros), chunk, warnings
+                    chunk, warnings = [], {}
+                self._build_entry(entry_type, body)
+                continue
+            chunk.append((entry_type, body))
+            if len(chunk) >= self.CHUNK_SIZE:
+                yield dict(self.macros), chunk, warnings
+                chunk, warnings = [], {}
+        if chunk or warnings:
+            yield dict(self.macros), chunk, warnings
+    
+    def _submit_chunk(self, executor, cache, macros: Dict, chunk: List[Tuple[str, str]], render: bool) -> Tuple:
+        """查询缓存后，将未命中的条目交给进程池（或直接在本进程处理）"""
+        keys = None
+        hits = {}
+        todo = chunk
+        if cache is not None:
+            start = time.perf_counter()
+            keys = cache.make_keys(macros, chunk)
+            hits = cache.get_many(keys)
+            todo = [raw for key, raw in zip(keys, chunk) if key not in hits]
+            if self.profiler is not None:
+                self.profiler.add('cache_lookup', time.perf_counter() - start, len(chunk))
         
-        # 移除注释
-        content = re.sub(r'%.*$', '', content, flags=re.MULTILINE)
+        if executor is not None:
+            result = executor.submit(_process_chunk, macros, todo, render, self.profiler is not None,
+                                     self.style.name)
+        else:
+            if self._helper is None:
+                # 串行模式下复用同一个辅助解析器，并共享作者缓存
+                self._helper = BibTeXParser()
+                self._helper.authors = self.authors
+            self._helper.profiler = self.profiler
+            result = _process_chunk(macros, todo, render, self.profiler is not None, self.style.name, self._helper)
+        return keys, hits, result
+    
+    def _collect_chunk(self, cache, keys: Optional[List], hits: Dict, result,
+                       warnings: Dict[int, List[str]]) -> Iterator[Tuple]:
+        """按原文顺序合并缓存命中、新处理的记录与扫描警告，更新统计、错误与缓存"""
+        records, author_hits, author_misses, profile = result.result() if isinstance(result, Future) else result
+        self.author_stats['hits'] += author_hits
+        self.author_stats['misses'] += author_misses
+        if profile is not None and self.profiler is not None:
+            self.profiler.merge(profile)
         
-        # 匹配 BibTeX 条目 - 改进的正则
-        pattern = r'@(\w+)\{([^,\s]+)\s*,(.+?)\n\}'
-        matches = re.findall(pattern, content, re.DOTALL | re.IGNORECASE)
+        fresh = []
+        if keys is not None:
+            processed = iter(records)
+            records = []
+            for key in keys:
+                if key in hits:
+                    fields, formatted = hits[key]
+                    record = ('success', fields, formatted, self._validate(fields))
+                else:
+                    record = next(processed)
+                    if record[0] == 'success':
+                        fresh.append((key, record[1], record[2]))
+                records.append(record)
         
-        for match in matches:
+        # 扫描警告作为不含条目的记录，插在其后第一个条目之前
+        for index, record in enumerate(records):
+            if index in warnings:
+                yield self._merge_record((None, None, '', warnings.pop(index)))
+            yield self._merge_record(record)
+        for errors in warnings.values():
+            yield self._merge_record((None, None, '', errors))
+        if fresh:
+            cache.put_many(fresh)
+    
+    def _merge_record(self, record: Tuple) -> Tuple:
+        """将单条记录的统计与错误信息合并到当前解析器"""
+        outcome, entry, formatted, errors = record
+        if outcome:
             self.stats['total'] += 1
-            entry_type, cite_key, fields_str = match
-            
-            try:
-                fields = self._parse_fields(fields_str)
-                fields['type'] = entry_type.lower()
-                fields['citekey'] = cite_key
-                
-                # 验证必填字段
-                if not fields.get('title'):
-                    self.errors.append(f"警告：{cite_key} 缺少标题字段")
-                
-                entries.append(fields)
-                self.stats['success'] += 1
-            except Exception as e:
-                self.errors.append(f"解析 {cite_key} 失败：{str(e)}")
-                self.stats['failed'] += 1
+            self.stats[outcome] += 1
+        self.errors.extend(errors)
+        return record
+    
+    def _open_cache(self, filepath: str) -> Optional['EntryCache']:
+        """打开 .bib 旁的缓存文件；未启用或无法写入时返回 None"""
+        if not self.use_cache or not os.path.isfile(filepath):
+            return None
+        try:
+            return EntryCache(filepath + EntryCache.SUFFIX, f"{self.FORMATTER_VERSION}/{self.style.name}")
+        except sqlite3.Error as e:
+            self.errors.append(f"警告：缓存不可用，已跳过：{e}")
+            return None
+    
+    def lookup(self, filepath: str, citekeys: Iterable[str]) -> List[BibEntry]:
+        """
+        按引用键随机读取条目，按请求顺序返回
+        借助 .bib 旁的偏移索引（<bib>.index.db，文件变化时自动重建）只解析所需条目及其之前的 @string
+        """
+        self._reset()
+        citekeys = list(dict.fromkeys(citekeys))
+        try:
+            with BibIndex(filepath) as index:
+                strings, texts = index.read_many(citekeys)
+        except FileNotFoundError:
+            self.errors.append(f"错误：文件不存在：{filepath}")
+            return []
+        except (OSError, sqlite3.Error, UnicodeDecodeError) as e:
+            self.errors.append(f"错误：{e}")
+            return []
+        
+        # 按原文顺序解析，@string 只作用于其后的条目
+        found = {}
+        strings = iter(strings)
+        next_string = next(strings, None)
+        for citekey, (offset, text) in sorted(texts.items(), key=lambda item: item[1][0]):
+            while next_string is not None and next_string[0] < offset:
+                for entry_type, body in self._scan_entries(next_string[1].encode('utf-8').splitlines(True)):
+                    self._build_entry(entry_type, body)
+                next_string = next(strings, None)
+            for entry_type, body in self._scan_entries(text.encode('utf-8').splitlines(True)):
+                entry = self._build_entry(entry_type, body)
+                if entry is not None:
+                    found[citekey] = entry
+        
+        self.entries = [found[citekey] for citekey in citekeys if citekey in found]
+        for citekey in citekeys:
+            if citekey not in texts:
+                self.errors.append(f"警告：未找到引用键 {citekey}")
+        return self.entries
+    
+    def parse_string(self, content: str) -> List[BibEntry]:
+        """解析 BibTeX 字符串"""
+        entries = []
+        self._reset()
+        
+        prof = self.profiler
+        for entry_type, body in self._scan_entries(content.encode('utf-8').splitlines(True)):
+            start = time.perf_counter() if prof is not None else 0.0
+            entry = self._build_entry(entry_type, body)
+            if entry is not None:
+                entries.append(entry)
+                if prof is not None:
+                    prof.add_entry(entry.citekey, time.perf_counter() - start)
         
         self.entries = entries
         return entries
     
-    def _parse_fields(self, fields_str: str) -> Dict:
-        """解析字段字符串"""
-        fields = {}
+    def _scan_entries(self, lines: Iterable[bytes], first_line: int = 1,
+                      inline_warnings: bool = False) -> Iterator[Tuple[Optional[str], str]]:
+        """
+        切分条目（规则见 scan_entries），产出 (条目类型, 条目主体)，跳过 @comment 与 @preamble
+        lines 为按行读取的字节串；first_line 为第一行的行号（用于警告信息）
+        括号不匹配的条目记录警告并跳过；inline_warnings 为 True 时改为按原文位置产出 (None, 警告)
+        """
+        prof = self.profiler
+        clock = time.perf_counter
+        spans = scan_entries(lines, 0, first_line)
+        while True:
+            if prof is not None:
+                t1 = clock()
+            span = next(spans, None)
+            if prof is not None:
+                prof.add('match_entries', clock() - t1, 0 if span is None else 1)
+            if span is None:
+                return
+            entry_type, body, start, end, line, resync_line = span
+            if end is None or resync_line:
+                warning = self._unbalanced_warning(entry_type, body, line, resync_line)
+                if inline_warnings:
+                    yield None, warning
+                else:
+                    self.errors.append(warning)
+            elif entry_type.lower() not in SKIP_TYPES:
+                yield entry_type, body.decode('utf-8')
+    
+    @staticmethod
+    def _unbalanced_warning(entry_type: str, body: bytes, line: int, resync_line: int) -> str:
+        """括号不匹配、被跳过的条目的警告信息"""
+        citekey = body.partition(b',')[0].strip().decode('utf-8', 'replace') or f"@{entry_type}"
+        resync = f"，已从第 {resync_line} 行重新同步" if resync_line else ""
+        return f"警告：第 {line} 行的条目 {citekey} 括号未闭合{resync}，该条目已跳过"
+    
+    def _build_entry(self, entry_type: str, body: str) -> Optional[BibEntry]:
+        """由条目主体构建条目，同时更新统计与错误信息"""
+        if entry_type.lower() == 'string':
+            # @string{name = value}：登记宏，供后续条目引用
+            for name, value in self._parse_fields(body).items():
+                self.macros[name] = value
+            return None
         
-        # 匹配字段：name = {value} 或 name = "value" 或 name = number
-        pattern = r'(\w+)\s*=\s*(?:\{([^}]*)\}|"([^"]*)"|(\d+)|([\w:/.-]+))'
-        matches = re.findall(pattern, fields_str, re.DOTALL)
+        cite_key, sep, fields_str = body.partition(',')
+        cite_key = cite_key.strip()
+        if not sep or not cite_key or any(c.isspace() for c in cite_key):
+            return None
         
-        for match in matches:
-            name = match[0].lower()
-            # value 可能在第 2、3、4 或 5 个组
-            value = match[1] or match[2] or match[3] or match[4] or ''
-            value = ' '.join(value.split())  # 清理多余空白
-            fields[name] = value.strip()
+        self.stats['total'] += 1
+        try:
+            if self.profiler is not None:
+                start = time.perf_counter()
+                fields = self._parse_fields(fields_str)
+                self.profiler.add('parse_fields', time.perf_counter() - start)
+            else:
+                fields = self._parse_fields(fields_str)
+            entry = BibEntry(entry_type.lower(), cite_key, fields)
+            self.errors.extend(self._validate(entry))
+            self.stats['success'] += 1
+            return entry
+        except Exception as e:
+            self.errors.append(f"解析 {cite_key} 失败：{str(e)}")
+            self.stats['failed'] += 1
+            return None
+    
+    def _validate(self, fields: Dict) -> List[str]:
+        """验证必填字段，返回警告信息"""
+        if not fields.get('title'):
+            return [f"警告：{fields.get('citekey', '')} 缺少标题字段"]
+        return []
+    
+    def _process_entry(self, entry_type: str, body: str, render: bool) -> Tuple:
+        """处理单个原始条目，返回 (结果, 条目, 格式化结果, 错误信息) 记录"""
+        n_errors = len(self.errors)
+        success, failed = self.stats['success'], self.stats['failed']
+        start = time.perf_counter() if self.profiler is not None else 0.0
+        entry = self._build_entry(entry_type, body)
         
-        return fields
+        outcome = None
+        if self.stats['success'] != success:
+            outcome = 'success'
+        elif self.stats['failed'] != failed:
+            outcome = 'failed'
+        formatted = self.format_entry(entry) if render and entry is not None else ''
+        if self.profiler is not None and entry is not None:
+            self.profiler.add_entry(entry.citekey, time.perf_counter() - start)
+        errors = self.errors[n_errors:]
+        del self.errors[n_errors:]
+        return outcome, entry, formatted, errors
     
-    def _format_author(self, author: str) -> str:
+    def _parse_fields(self, fields_str: str) -> Dict:
         """
-        格式化作者姓名（优化版）
-        支持多种 BibTeX 作者格式
+        解析字段字符串
+        支持 {嵌套 {括号}}、"引号"、数字、宏名以及 # 拼接；取值中的括号组原样保留，由 BibEntry 去除
         """
-        if not author:
-            return ""
+        # 快速路径：没有 # 拼接且每个 { 都属于一个简单字段值时，一次 findall 即可
+        if '#' not in fields_str:
+            fields = {}
+            macros = self.macros
+            braced_count = 0
+            for name, braced, quoted, bare in self.SIMPLE_FIELD_RE.findall(fields_str):
+                if bare:
+                    value = macros.get(bare.lower(), bare)
+                elif quoted:
+                    value = quoted[1:-1]
+                else:
+                    value = braced
+                    braced_count += 1
+                    if '{' in value:
+                        braced_count += value.count('{')
+                fields[name.lower()] = ' '.join(value.split())  # 清理多余空白
+            if braced_count == fields_str.count('{'):
+                return fields
         
-        authors = []
-        # BibTeX 作者格式：First Last and First Last 或 Last, First and Last, First
-        author_list = re.split(r'\s+and\s+', author, flags=re.IGNORECASE)
+        return self._scan_fields(fields_str)
+    
+    def _scan_fields(self, fields_str: str) -> Dict:
+        """按括号深度单遍扫描字段，处理嵌套括号、# 拼接等一般情形"""
+        fields = {}
+        n = len(fields_str)
+        pos = 0
         
-        for a in author_list:
-            a = a.strip()
-            if not a:
+        while pos < n:
+            m = self.FIELD_NAME_RE.match(fields_str, pos)
+            if not m:
+                # 无法识别的片段：跳到下一个逗号继续
+                nxt = fields_str.find(',', pos + 1)
+                if nxt == -1:
+                    break
+                pos = nxt
                 continue
             
-            # 清理括号（如 {\L}ukasz）
-            a = re.sub(r'\{\\[A-Za-z]+\}', lambda m: m.group().replace('{', '').replace('}', ''), a)
+            name = m.group(1).lower()
+            pos = m.end()
             
-            # 处理 "Last, First" 格式
-            if ',' in a:
-                parts = a.split(',', 1)  # 只分割第一个逗号
-                if len(parts) >= 2:
-                    last = parts[0].strip().upper()
-                    first = parts[1].strip()
-                    # 名缩写
-                    first_parts = first.split()
-                    first_initials = ' '.join([p[0].upper() for p in first_parts if p and p not in [',', ';']])
-                    if first_initials:
-                        authors.append(f"{last} {first_initials}")
-                    else:
-                        authors.append(last)
+            pieces = []
+            while pos < n:
+                c = fields_str[pos]
+                if c == '{':
+                    end = self._match_delimiter(fields_str, pos, self.BRACE_RE)
+                    pieces.append(fields_str[pos + 1:end])
+                elif c == '"':
+                    end = self._match_delimiter(fields_str, pos, self.QUOTE_SCAN_RE)
+                    pieces.append(fields_str[pos + 1:end])
                 else:
-                    authors.append(a.upper())
-            else:
-                # 处理 "First Last" 格式
-                parts = a.split()
-                if len(parts) >= 2:
-                    # 最后一个是姓
-                    last = parts[-1].upper()
-                    # 前面是名
-                    first_parts = parts[:-1]
-                    first_initials = ' '.join([p[0].upper() for p in first_parts if p and p not in [',', ';']])
-                    if first_initials:
-                        authors.append(f"{last} {first_initials}")
-                    else:
-                        authors.append(last)
-                elif len(parts) == 1:
-                    authors.append(parts[0].upper())
+                    token = self.BARE_VALUE_RE.match(fields_str, pos)
+                    if not token:
+                        break
+                    end = token.end() - 1
+                    word = token.group()
+                    pieces.append(self.macros.get(word.lower(), word))
+                pos = end + 1
+                
+                concat = self.CONCAT_RE.match(fields_str, pos)
+                if not concat:
+                    break
+                pos = concat.end()
+            
+            fields[name] = ' '.join(''.join(pieces).split())  # 清理多余空白
         
-        if len(authors) > 3:
-            return ', '.join(authors[:3]) + ', et al.'
-        return ', '.join(authors)
+        return fields
     
-    def to_gbt7714(self, entry: Dict) -> str:
-        """将 BibTeX 条目转换为 GB/T 7714 格式"""
-        entry_type = entry.get('type', 'misc')
-        ref_type = self.TYPE_MAP.get(entry_type, 'EB/OL')
-        
-        author = self._format_author(entry.get('author', ''))
-        title = entry.get('title', '').strip()
-        
-        if not title:
-            title = "无标题"
-        
-        if entry_type in ['article', 'inproceedings', 'proceedings']:
-            return self._format_journal_conference(entry, author, title, ref_type)
-        elif entry_type in ['book', 'inbook', 'incollection']:
-            return self._format_book(entry, author, title, ref_type)
-        elif entry_type in ['phdthesis', 'mastersthesis', 'thesis']:
-            return self._format_thesis(entry, author, title, ref_type)
-        elif entry_type in ['online', 'misc', 'www']:
-            return self._format_electronic(entry, author, title, ref_type)
-        else:
-            return self._format_generic(entry, author, title, ref_type)
-    
-    def _format_journal_conference(self, entry: Dict, author: str, title: str, ref_type: str) -> str:
-        journal = entry.get('journal', entry.get('booktitle', '')).strip()
-        year = entry.get('year', '').strip()
-        volume = entry.get('volume', '').strip()
-        number = entry.get('number', entry.get('issue', '')).strip()
-        pages = entry.get('pages', '').strip()
-        publisher = entry.get('publisher', '').strip()
+    @staticmethod
+    def _match_delimiter(text: str, start: int, scan_re) -> int:
+        """
+        返回与 text[start] 处 { 或 " 配对的结束位置
+        只在括号深度为 0 时识别结束引号；未闭合时返回文本末尾
+        """
+        quoted = text[start] == '"'
+        # 常见情形：结束符之前没有其他括号，直接用 str.find 定位
+        end = text.find('"' if quoted else '}', start + 1)
+        if end != -1 and text.find('{', start + 1, end) == -1 and \
+                not (quoted and text.find('}', start + 1, end) != -1):
+            return end
+        depth = 0 if quoted else 1
+        for m in scan_re.finditer(text, start + 1):
+            c = m.group()
+            if c == '{':
+                depth += 1
+            elif c == '}':
+                depth -= 1
+                if depth == 0 and not quoted:
+                    return m.start()
+            elif depth == 0:
+                return m.start()
+        return len(text)
+    
+    def _format_author(self, author: str, style: Optional[CitationStyle] = None) -> str:
+        """
+        格式化作者姓名（优化版）
+        支持多种 BibTeX 作者格式，结果由 AuthorNormalizer 缓存
+        """
+        return self.authors.format(author, style or self.style)
+    
+    def author_table(self, entries: Optional[Iterable] = None) -> Dict[str, List[str]]:
+        """作者表：规范化作者名 -> 引用键列表，默认使用已解析的条目"""
+        return self.authors.build_table(self.entries if entries is None else entries)
+    
+    def find_duplicates(self, entries: Optional[Iterable] = None,
+                        threshold: float = DuplicateFinder.THRESHOLD) -> List[Dict]:
+        """
+        查找重复/近似重复文献，默认使用已解析的条目
+        返回 [{'canonical': 建议保留的引用键, 'members': [...], 'reasons': [...]}, ...]
+        """
+        finder = DuplicateFinder(threshold)
+        finder.add_all(self.entries if entries is None else entries)
+        return finder.clusters()
+    
+    def sort_entries(self, entries: Optional[Iterable] = None) -> List:
+        """
+        按著者-出版年制排序（见 bib_sort），默认使用已解析的条目
+        同一著者同一年的多篇文献，返回的条目年份带 a、b ... 后缀（为副本，不修改原条目）
+        """
+        start = time.perf_counter() if self.profiler is not None else 0.0
+        builder = SortKeyBuilder(self.authors.split)
+        result = [self._with_year_suffix(entry, suffix) if suffix else entry
+                  for entry, suffix in sort_author_year(self.entries if entries is None else entries, builder)]
+        if self.profiler is not None:
+            self.profiler.add('sort', time.perf_counter() - start, len(result))
+        return result
+    
+    @staticmethod
+    def _with_year_suffix(entry: Dict, suffix: str) -> Dict:
+        copy = entry.copy() if isinstance(entry, BibEntry) else dict(entry)
+        copy['year'] = entry.get('year', '').strip() + suffix
+        return copy
+    
+    def to_bibtex(self, entry: Dict) -> str:
+        """将条目序列化为规范化的 BibTeX 文本（宏已展开，字段值统一用括号包裹，保留原文中保护大小写的括号组）"""
+        fields = entry.to_dict(raw=True) if isinstance(entry, BibEntry) else entry
+        body = ',\n'.join(f"  {name} = {{{value}}}" for name, value in fields.items()
+                          if name != 'type' and name != 'citekey')
+        return f"@{entry.get('type', 'misc')}{{{entry.get('citekey', '')},\n{body}\n}}\n"
+    
+    def format_entry(self, entry: Dict, style: Optional[CitationStyle] = None) -> str:
+        """按著录样式格式化条目，默认使用解析器的样式"""
+        style = style or self.style
+        prof = self.profiler
+        if prof is not None:
+            start = time.perf_counter()
         
-        if entry.get('type') == 'inproceedings':
-            result = f"{author}. {title}[C]//{journal}"
-            if publisher:
-                result += f". {publisher}"
-        else:
-            result = f"{author}. {title}[{ref_type}]. {journal}"
+        author = self.authors.format(entry.get('author', ''), style)
         
-        if year:
-            result += f", {year}"
-            if volume:
-                if number:
-                    result += f", {volume}({number})"
-                else:
-                    result += f", {volume}"
+        if prof is not None:
+            mid = time.perf_counter()
+            prof.add('format_author', mid - start)
         
-        if pages:
-            pages = re.sub(r'^p\.?\s*', '', pages, flags=re.IGNORECASE)
-            pages = re.sub(r'^pp\.?\s*', '', pages, flags=re.IGNORECASE)
-            pages = pages.replace('--', '-')
-            result += f": {pages}"
+        # 模板在样式加载时已编译，这里只做一次查表与函数调用
+        result = style.render(entry, author, entry.get('title', '').strip() or "无标题")
         
-        result += "."
+        if prof is not None:
+            prof.add('render', time.perf_counter() - mid)
         return result
     
-    def _format_book(self, entry: Dict, author: str, title: str, ref_type: str) -> str:
-        publisher = entry.get('publisher', '').strip()
-        address = entry.get('address', entry.get('location', '出版地不详')).strip()
-        year = entry.get('year', '').strip()
-        edition = entry.get('edition', '').strip()
-        pages = entry.get('pages', '').strip()
-        
-        result = f"{author}. {title}[{ref_type}]"
-        if edition:
-            result += f". {edition}版"
-        result += f". {address}: {publisher}"
-        if year:
-            result += f", {year}"
-        if pages:
-            result += f": {pages}"
-        result += "."
-        return result
+    def to_gbt7714(self, entry: Dict) -> str:
+        """将 BibTeX 条目转换为 GB/T 7714 格式"""
+        return self.format_entry(entry, GBT7714)
     
-    def _format_thesis(self, entry: Dict, author: str, title: str, ref_type: str) -> str:
-        school = entry.get('school', entry.get('university', '')).strip()
-        address = entry.get('address', entry.get('location', '地点不详')).strip()
-        year = entry.get('year', '').strip()
-        
-        return f"{author}. {title}[{ref_type}]. {address}: {school}, {year}."
+    def iter_formatted(self, entries: Iterable[Dict], show_citekey: bool = False) -> Iterator[str]:
+        """逐条格式化，可直接接在 iter_entries 之后流式输出"""
+        hits, misses = self.authors.hits, self.authors.misses
+        try:
+            for i, entry in enumerate(entries, 1):
+                formatted = self.format_entry(entry)
+                citekey = entry.get('citekey', '')
+                if formatted:
+                    if show_citekey and citekey:
+                        yield f"[{i}] {citekey}: {formatted}"
+                    else:
+                        yield f"[{i}] {formatted}"
+        finally:
+            self.author_stats['hits'] += self.authors.hits - hits
+            self.author_stats['misses'] += self.authors.misses - misses
     
-    def _format_electronic(self, entry: Dict, author: str, title: str, ref_type: str) -> str:
-        url = entry.get('url', '').strip()
-        year = entry.get('year', '').strip()
-        urldate = entry.get('urldate', entry.get('note', '')).strip()
-        
-        result = f"{author}. {title}[{ref_type}]"
-        if url:
-            result += f". {url}"
-        if year:
-            result += f", {year}"
-        if urldate:
-            result += f" ({urldate})"
-        result += "."
-        return result
+    def write_file(self, filepath: str, out: TextIO, fmt: str = 'gbt', show_citekey: bool = False,
+                   jobs: int = 1) -> int:
+        """
+        解析 BibTeX 文件并以指定格式（见 bib_writers.WRITERS）逐条写入 out，返回写出的条目数
+        需要 GB/T 7714 结果的格式在解析时一并渲染（jobs > 1 时在工作进程中完成）
+        """
+        writer = make_writer(fmt, out, self, show_citekey)
+        try:
+            for outcome, entry, formatted, errors in self._iter_records(filepath, jobs, writer.NEEDS_RENDER):
+                if entry is not None:
+                    writer.write(entry, formatted if writer.NEEDS_RENDER else None)
+        finally:
+            writer.close()
+        return writer.count
     
-    def _format_generic(self, entry: Dict, author: str, title: str, ref_type: str) -> str:
-        journal = entry.get('journal', entry.get('booktitle', '')).strip()
-        year = entry.get('year', '').strip()
-        
-        result = f"{author}. {title}[{ref_type}]"
-        if journal:
-            result += f". {journal}"
-        if year:
-            result += f", {year}"
-        result += "."
-        return result
+    def write_entries(self, entries: Iterable[Dict], out: TextIO, fmt: str = 'gbt',
+                      show_citekey: bool = False) -> int:
+        """将已解析的条目以指定格式逐条写入 out，返回写出的条目数"""
+        writer = make_writer(fmt, out, self, show_citekey)
+        hits, misses = self.authors.hits, self.authors.misses
+        try:
+            for entry in entries:
+                writer.write(entry)
+        finally:
+            writer.close()
+            self.author_stats['hits'] += self.authors.hits - hits
+            self.author_stats['misses'] += self.authors.misses - misses
+        return writer.count
     
     def format_all(self, show_citekey: bool = False) -> Tuple[List[str], Dict]:
         """格式化所有条目"""
-        results = []
-        for i, entry in enumerate(self.entries, 1):
-            formatted = self.to_gbt7714(entry)
-            citekey = entry.get('citekey', '')
-            if formatted:
-                if show_citekey and citekey:
-                    results.append(f"[{i}] {citekey}: {formatted}")
-                else:
-                    results.append(f"[{i}] {formatted}")
-        
+        results = list(self.iter_formatted(self.entries, show_citekey))
         return results, self.stats
     
     def get_errors(self) -> List[str]:
@@ -287,39 +1147,164 @@ class BibTeXParser:
         total = self.stats['total']
         success = self.stats['success']
         failed = self.stats['failed']
-        return f"共 {total} 篇文献，成功 {success} 篇" + (f"，失败 {failed} 篇" if failed > 0 else "")
+        summary = f"共 {total} 篇文献，成功 {success} 篇" + (f"，失败 {failed} 篇" if failed > 0 else "")
+        hits = self.cache_stats['hits']
+        misses = self.cache_stats['misses']
+        if hits or misses:
+            summary += f"（缓存命中 {hits} 篇，未命中 {misses} 篇）"
+        lookups = self.author_stats['hits'] + self.author_stats['misses']
+        if lookups:
+            summary += f"，作者缓存命中率 {self.author_stats['hits'] / lookups:.1%}"
+        return summary
+
+
+# 进程池中每个工作进程复用的解析器（保留作者缓存）
+_worker_parser = None
+
+
+def _process_chunk(macros: Dict, chunk: List[Tuple[str, str]], render: bool, profile: bool = False,
+                   style: str = GBT7714.name,
+                   parser: Optional[BibTeXParser] = None) -> Tuple[List[Tuple], int, int, Optional[Dict]]:
+    """
+    进程池任务：解析（并格式化）一个分块
+    返回 (逐条记录, 作者缓存命中数, 作者缓存未命中数, 分阶段统计快照)
+    传入 parser 时（串行模式）统计直接累计在其 profiler 上，不返回快照
+    """
+    global _worker_parser
+    snapshot = parser is None and profile
+    if parser is None:
+        if _worker_parser is None:
+            _worker_parser = BibTeXParser()
+        parser = _worker_parser
+        parser.profiler = StageProfiler() if profile else None
+    parser.style = STYLES[style]
+    parser.macros = macros
+    hits, misses = parser.authors.hits, parser.authors.misses
+    records = [parser._process_entry(entry_type, body, render) for entry_type, body in chunk]
+    return (records, parser.authors.hits - hits, parser.authors.misses - misses,
+            parser.profiler.snapshot() if snapshot else None)
+
+
+# 输出文件的写缓冲大小
+OUTPUT_BUFFER = 1 << 20
+
+
+def dedup_main(parser_obj: BibTeXParser, args):
+    """--dedup：流式解析条目并输出重复分组报告"""
+    finder = DuplicateFinder(args.dedup_threshold)
+    count = 0
+    for entry in parser_obj.iter_entries(args.input, jobs=args.jobs):
+        finder.add(entry)
+        count += 1
+    
+    if count == 0:
+        print("❌ 未找到任何 BibTeX 条目")
+        for err in parser_obj.get_errors():
+            print(f"  {err}")
+        return
+    
+    clusters = finder.clusters()
+    lines = finder.format_report(clusters) if clusters else ["✅ 未发现重复文献"]
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for line in lines:
+                f.write(line + '\n')
+        print(f"✅ 已保存到：{args.output}")
+    else:
+        for line in lines:
+            print(line)
+    
+    if not args.quiet:
+        duplicates = sum(len(cluster['members']) - 1 for cluster in clusters)
+        print(f"\n📊 共检查 {count} 篇，{len(clusters)} 组重复，可移除 {duplicates} 篇")
 
 
 def main():
     parser = argparse.ArgumentParser(description='BibTeX 文件解析工具 v1.2')
     parser.add_argument('--input', '-i', type=str, required=True, help='输入 .bib 文件路径')
     parser.add_argument('--output', '-o', type=str, help='输出文件路径（可选）')
+    parser.add_argument('--format', '-f', choices=list(WRITERS), default='gbt',
+                        help='输出格式：gbt=著录文本（默认，样式见 --style），jsonl，csv，bibtex=规范化 BibTeX，markdown')
+    parser.add_argument('--style', '-s', choices=list(STYLES), default=GBT7714.name,
+                        help='著录样式：gbt7714（默认），apa，ieee；作用于 gbt 与 markdown 格式')
+    parser.add_argument('--sort', choices=['file', 'author-year'], default='file',
+                        help='条目顺序：file=原文顺序（默认），author-year=著者-出版年制（按文种、著者拼音/字母、出版年排序）')
     parser.add_argument('--with-citekey', action='store_true', help='显示引用键')
     parser.add_argument('--quiet', '-q', action='store_true', help='静默模式（不显示统计信息）')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='并行进程数（默认 1，即串行）')
+    parser.add_argument('--no-cache', action='store_true', help='不读写 .bib 旁的解析缓存')
+    parser.add_argument('--profile', nargs='?', const='', metavar='JSON',
+                        help='输出分阶段耗时；指定路径时写入 JSON 文件')
+    parser.add_argument('--keys', '-k', nargs='+', metavar='CITEKEY',
+                        help='只输出指定引用键的条目（可用逗号分隔；借助偏移索引随机读取）')
+    parser.add_argument('--tex', type=str, metavar='MAIN_TEX',
+                        help='只输出 LaTeX 正文中引用的条目，按首次引用顺序编号（跟随 \\input / \\include）')
+    parser.add_argument('--dedup', action='store_true', help='查找重复文献（不输出格式化结果）')
+    parser.add_argument('--dedup-threshold', type=float, default=DuplicateFinder.THRESHOLD,
+                        help=f'近似重复的相似度阈值（默认 {DuplicateFinder.THRESHOLD}）')
     
     args = parser.parse_args()
+    if args.tex and args.keys:
+        parser.error('--tex 与 --keys 不能同时使用')
+    
+    parser_obj = BibTeXParser(use_cache=not args.no_cache, profile=args.profile is not None,
+                              style=args.style)
+    
+    if args.dedup:
+        dedup_main(parser_obj, args)
+        return
+    
+    # 从 LaTeX 源文件收集引用键（顺序编码制：按首次引用顺序）
+    scanner = None
+    if args.tex:
+        scanner = CitationScanner(jobs=args.jobs)
+        args.keys = scanner.scan(args.tex)
+        if not args.keys:
+            print(f"❌ 未在 {args.tex} 及其包含的文件中找到引用")
+            for err in scanner.errors:
+                print(f"  {err}")
+            return
     
-    parser_obj = BibTeXParser()
-    entries = parser_obj.parse_file(args.input)
+    # 流式输出结果
+    entries = None
+    out = open(args.output, 'w', encoding='utf-8', newline='', buffering=OUTPUT_BUFFER) if args.output else sys.stdout
+    try:
+        if args.keys or args.sort != 'file':
+            if args.keys:
+                citekeys = args.keys if scanner else [key for arg in args.keys for key in arg.split(',') if key]
+                entries = parser_obj.lookup(args.input, citekeys)
+            else:
+                entries = parser_obj.iter_entries(args.input, jobs=args.jobs)
+            if args.sort == 'author-year':
+                # 排序需要全部条目，不能流式输出
+                entries = parser_obj.sort_entries(entries)
+            count = parser_obj.write_entries(entries, out, args.format, show_citekey=args.with_citekey)
+        else:
+            count = parser_obj.write_file(args.input, out, args.format, show_citekey=args.with_citekey,
+                                          jobs=args.jobs)
+    finally:
+        if out is not sys.stdout:
+            out.close()
     
-    if not entries:
+    missing = []
+    if scanner is not None:
+        missing = missing_keys(args.keys, entries)
+        print(f"\n📑 扫描 {len(scanner.files)} 个 .tex 文件，引用 {len(args.keys)} 篇，缺失 {len(missing)} 篇")
+        if missing:
+            print("\n❓ 以下引用键未在 .bib 中找到：")
+            for key in missing:
+                path, line = scanner.locations[key]
+                print(f"  {key}（{os.path.relpath(path)}:{line}）")
+    
+    if count == 0:
         print("❌ 未找到任何 BibTeX 条目")
         if parser_obj.get_errors():
             for err in parser_obj.get_errors():
                 print(f"  {err}")
         return
     
-    results, stats = parser_obj.format_all(show_citekey=args.with_citekey)
-    
-    # 输出结果
     if args.output:
-        with open(args.output, 'w', encoding='utf-8') as f:
-            for result in results:
-                f.write(result + '\n')
         print(f"✅ 已保存到：{args.output}")
-    else:
-        for result in results:
-            print(result)
     
     # 显示统计信息
     if not args.quiet:
@@ -327,10 +1312,23 @@ def main():
         
         # 显示警告/错误
         errors = parser_obj.get_errors()
+        if scanner is not None:
+            # 缺失的引用键已在上面列出（含引用位置）
+            reported = {f"警告：未找到引用键 {key}" for key in missing}
+            errors = scanner.errors + [err for err in errors if err not in reported]
         if errors:
             print(f"\n⚠️ 警告信息：")
             for err in errors:
                 print(f"  {err}")
+    
+    # 分阶段耗时
+    if parser_obj.profiler is not None:
+        if args.profile:
+            with open(args.profile, 'w', encoding='utf-8') as f:
+                json.dump(parser_obj.profiler.snapshot(), f, ensure_ascii=False, indent=2)
+            print(f"\n⏱️ 分阶段耗时已保存到：{args.profile}")
+        else:
+            print(f"\n{parser_obj.profiler.report()}")
 
 
 if __name__ == '__main__':
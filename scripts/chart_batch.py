@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+批量生成图表（data_visualize.py --batch）
+规格文件为 JSON：
+    {
+      "defaults": {"type": "line", "max_points": 5000},
+      "charts": [
+        {"input": "train_log.csv", "x": "step", "y": "loss", "output": "fig/loss.png",
+         "filter": {"name": "baseline"}, "title": "Loss"},
+        {"input": "train_log.csv", "type": "scatter", "x": "loss", "y": "acc", "output": "fig/acc.png"}
+      ]
+    }
+相对路径以规格文件所在目录为基准；filter 的值为单个值时按相等筛选，为列表时按成员筛选；
+热力图可另设 sample、top_k、cluster（含义同命令行的 --sample、--top-k、--cluster）
+每个数据文件只读取一次（只读各图表用到的列），绘图在常驻的工作进程中并行，进程内 pandas/matplotlib 只导入一次
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from data_visualize import (CHART_TYPES, MAX_POINTS, downsample_frame, draw_chart, heatmap_matrix,
+                            read_table, setup_pyplot)
+
+# 图表规格允许的字段
+CHART_FIELDS = ('input', 'type', 'x', 'y', 'output', 'filter', 'title', 'max_points', 'downsample',
+                'sample', 'top_k', 'cluster')
+# 需要整张表的图表类型
+WHOLE_TABLE_TYPES = ('heatmap', 'box')
+
+
+def load_spec(path: str) -> List[dict]:
+    """读取规格文件，合并默认值并校验，返回图表规格列表（路径已转为相对当前目录可用的路径）"""
+    with open(path, 'r', encoding='utf-8') as f:
+        spec = json.load(f)
+    if isinstance(spec, list):
+        spec = {'charts': spec}
+    defaults = spec.get('defaults', {})
+    base = os.path.dirname(path)
+    charts = []
+    for index, item in enumerate(spec.get('charts', []), 1):
+        chart = {'type': 'line', 'max_points': MAX_POINTS, 'downsample': 'lttb', 'filter': {},
+                 'sample': 0, 'top_k': 0, 'cluster': False}
+        chart.update(defaults)
+        chart.update(item)
+        unknown = [name for name in chart if name not in CHART_FIELDS]
+        if unknown:
+            raise ValueError(f"第 {index} 张图表包含未知字段：{', '.join(unknown)}")
+        if not chart.get('input') or not chart.get('output'):
+            raise ValueError(f"第 {index} 张图表缺少 input 或 output")
+        if chart['type'] not in CHART_TYPES:
+            raise ValueError(f"第 {index} 张图表的类型不支持：{chart['type']}（可选：{', '.join(CHART_TYPES)}）")
+        if chart['type'] == 'scatter' and not (chart.get('x') and chart.get('y')):
+            raise ValueError(f"第 {index} 张图表：散点图需要指定 x 和 y")
+        chart['input'] = os.path.join(base, chart['input'])
+        chart['output'] = os.path.join(base, chart['output'])
+        charts.append(chart)
+    return charts
+
+
+def needed_columns(charts: List[dict]) -> Dict[str, Optional[List[str]]]:
+    """每个数据文件需要读取的列（各图表用到的列的并集）；有图表需要整张表时为 None"""
+    columns = {}
+    for chart in charts:
+        path = chart['input']
+        if chart['type'] in WHOLE_TABLE_TYPES or not (chart.get('x') and chart.get('y')):
+            columns[path] = None
+            continue
+        if path in columns and columns[path] is None:
+            continue
+        used = columns.setdefault(path, [])
+        for name in [chart['x'], chart['y'], *chart['filter']]:
+            if name not in used:
+                used.append(name)
+    return columns
+
+
+def load_sources(pd, charts: List[dict], cache=None) -> Iterator[Tuple[str, object, float]]:
+    """逐个读取数据文件（提供 cache 时经由列式缓存），产出 (路径, DataFrame, 读取秒数)"""
+    for path, columns in needed_columns(charts).items():
+        start = time.perf_counter()
+        df = read_table(pd, path, columns, cache)
+        yield path, df, time.perf_counter() - start
+
+
+def render_charts(charts: List[dict], frames: Dict[str, object],
+                  jobs: int = 1) -> Iterator[Tuple[int, float, str]]:
+    """
+    按规格顺序产出 (序号, 绘图秒数, 错误信息)，成功时错误信息为空
+    jobs > 1 时在进程池中绘图：数据在创建进程池时随初始化参数交给每个工作进程一次（fork 时直接继承，不复制），
+    之后每个任务只传递图表规格
+    """
+    if jobs <= 1 or len(charts) <= 1:
+        _init_worker(frames)
+        yield from map(_render_chart, range(len(charts)), charts)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(jobs, len(charts)), initializer=_init_worker,
+                             initargs=(frames,)) as executor:
+        yield from executor.map(_render_chart, range(len(charts)), charts)
+
+
+def run_batch(pd, spec_path: str, jobs: int = 1, cache=None) -> bool:
+    """执行批量模式并打印每张图表的用时，全部成功时返回 True"""
+    start = time.perf_counter()
+    try:
+        charts = load_spec(spec_path)
+    except FileNotFoundError:
+        print(f"错误：规格文件不存在：{spec_path}")
+        return False
+    except (ValueError, json.JSONDecodeError) as e:
+        print(f"错误：规格文件无效：{e}")
+        return False
+
+    frames = {}
+    try:
+        for path, df, seconds in load_sources(pd, charts, cache):
+            frames[path] = df
+            print(f"✓ 读取 {path}：{len(df)} 行，{len(df.columns)} 列（{seconds:.2f} 秒）")
+    except FileNotFoundError as e:
+        print(f"错误：文件不存在：{e.filename}")
+        return False
+    except ValueError as e:
+        print(f"错误：读取数据失败：{e}")
+        return False
+    loaded = time.perf_counter()
+
+    for chart in charts:
+        os.makedirs(os.path.dirname(chart['output']) or '.', exist_ok=True)
+    failed = 0
+    total = len(charts)
+    for index, seconds, error in render_charts(charts, frames, jobs):
+        output = charts[index]['output']
+        if error:
+            failed += 1
+            print(f"  ✗ [{index + 1}/{total}] {output}：{error}")
+        else:
+            print(f"  ✓ [{index + 1}/{total}] {output}（{seconds:.2f} 秒）")
+
+    end = time.perf_counter()
+    print(f"✓ 生成 {total - failed}/{total} 张图表：读取 {loaded - start:.2f} 秒，"
+          f"绘图 {end - loaded:.2f} 秒，总用时 {end - start:.2f} 秒")
+    return failed == 0
+
+
+# 工作进程内常驻的数据与 pyplot
+_worker_frames = None
+_worker_plt = None
+
+
+def _init_worker(frames: Dict[str, object]):
+    global _worker_frames, _worker_plt
+    _worker_frames = frames
+    if _worker_plt is None:
+        _worker_plt = setup_pyplot()
+
+
+def _render_chart(index: int, chart: dict) -> Tuple[int, float, str]:
+    """筛选、降采样并绘制一张图表，返回 (序号, 绘图秒数, 错误信息)"""
+    import pandas as pd
+
+    start = time.perf_counter()
+    try:
+        df = _worker_frames[chart['input']]
+        for column, value in chart['filter'].items():
+            if isinstance(value, list):
+                df = df[df[column].isin(value)]
+            else:
+                df = df[df[column] == value]
+        kind, x, y = chart['type'], chart.get('x'), chart.get('y')
+        corr = None
+        if kind in ('line', 'scatter') and x and y:
+            df = downsample_frame(pd, df, x, y, kind, chart['max_points'], chart['downsample'])
+        elif kind == 'heatmap':
+            corr = heatmap_matrix(df, chart['sample'], chart['top_k'], chart['cluster'])
+        draw_chart(_worker_plt, df, kind, chart['output'], x, y, chart.get('title'), corr)
+    except Exception as e:
+        return index, time.perf_counter() - start, str(e) or type(e).__name__
+    return index, time.perf_counter() - start, ''
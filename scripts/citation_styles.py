@@ -0,0 +1,423 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+引文著录样式
+每种样式为每类文献声明一个模板（文本片段 + 条件片段 + 字段取值规则），
+模板在加载时编译为渲染函数：字段读取、标点与条件判断都在编译时确定
+bibtex_parser.py 与 format_reference.py 共用；内置 GB/T 7714、APA、IEEE
+"""
+
+import re
+import string
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+
+class Field:
+    """字段取值规则：依次尝试 sources 中的字段，都不存在时取 default；取值去除首尾空白后可再经 transform 处理"""
+
+    __slots__ = ('sources', 'default', 'transform')
+
+    def __init__(self, *sources: str, default: str = '', transform: Optional[Callable[[str], str]] = None):
+        self.sources = sources
+        self.default = default
+        self.transform = transform
+
+
+class If:
+    """条件片段：字段非空时输出 then，否则输出 otherwise"""
+
+    __slots__ = ('field', 'then', 'otherwise')
+
+    def __init__(self, field: str, *then, otherwise: Sequence = ()):
+        self.field = field
+        self.then = then
+        self.otherwise = tuple(otherwise)
+
+
+class Template:
+    """
+    一类文献的著录模板
+    片段为字符串（可含 {字段} 占位）或 If 条件片段；fields 可覆盖样式中同名字段的取值规则
+    """
+
+    # 由调用方直接传入、不从条目读取的字段
+    ARGUMENTS = ('author', 'title', 'label')
+    # 单个顶层条件片段内展开为独立分支的条件数上限
+    MAX_EXPAND = 4
+
+    def __init__(self, *segments, fields: Optional[Dict[str, Field]] = None):
+        self.segments = segments
+        self.fields = fields or {}
+
+    def compile(self, base_fields: Dict[str, Field], name: str = 'render') -> Callable:
+        """编译为 render(entry, author, title, label) -> str"""
+        fields = dict(base_fields)
+        fields.update(self.fields)
+        namespace = {}
+        used = []
+        body = []
+
+        def var(field: str) -> str:
+            if field in self.ARGUMENTS:
+                return field
+            if field not in used:
+                used.append(field)
+            return '_' + field
+
+        def placeholders(text: str) -> Tuple[str, bool]:
+            """模板文本 -> f-string 内容（{字段} 换成局部变量），以及是否含占位"""
+            parts = []
+            has_field = False
+            for literal, field, spec, conv in string.Formatter().parse(text):
+                parts.append(literal.replace('{', '{{').replace('}', '}}'))
+                if field is not None:
+                    has_field = True
+                    parts.append('{' + var(field) + '}')
+            return ''.join(parts), has_field
+
+        def literal(text: str) -> str:
+            content, has_field = placeholders(text)
+            return 'f' + repr(content) if has_field else repr(text)
+
+        def expression(segments: Sequence) -> str:
+            """条件片段内部：相邻文本合并为一个字面量，嵌套条件写成条件表达式"""
+            terms = []
+            pending = ''
+            for segment in segments:
+                if isinstance(segment, str):
+                    pending += segment
+                    continue
+                if pending:
+                    terms.append(literal(pending))
+                    pending = ''
+                terms.append(f"({expression(segment.then)} if {var(segment.field)} "
+                             f"else {expression(segment.otherwise)})")
+            if pending:
+                terms.append(literal(pending))
+            return ' + '.join(terms) or "''"
+
+        def count(segments: Sequence) -> int:
+            return sum(1 + count(s.then) + count(s.otherwise) for s in segments if not isinstance(s, str))
+
+        def assign(target: str, segments: Sequence, indent: str):
+            """
+            展开条件：每个分支直接赋值为一个完整的字面量，省去逐段拼接
+            分支数过多时退回条件表达式
+            """
+            index = next((i for i, s in enumerate(segments) if not isinstance(s, str)), None)
+            if index is None:
+                body.append(f"{indent}{target} = {literal(''.join(segments))}")
+                return
+            if count(segments) > self.MAX_EXPAND:
+                body.append(f"{indent}{target} = {expression(segments)}")
+                return
+            head, segment, tail = segments[:index], segments[index], segments[index + 1:]
+            body.append(f"{indent}if {var(segment.field)}:")
+            assign(target, head + segment.then + tail, indent + '    ')
+            body.append(f"{indent}else:")
+            assign(target, head + segment.otherwise + tail, indent + '    ')
+
+        # 顶层片段拼成一个 f-string；每个顶层条件先算成局部变量再嵌入
+        content = []
+        for segment in self.segments:
+            if isinstance(segment, str):
+                content.append(placeholders(segment)[0])
+            else:
+                temp = f'_part{len(content)}'
+                assign(temp, (segment,), '    ')
+                content.append('{' + temp + '}')
+        body.append(f"    return f{''.join(content)!r}")
+
+        # 字段读取：只读取模板用到的字段
+        head = ['    get = entry.get']
+        for field in used:
+            spec = fields.get(field) or Field(field)
+            target = '_' + field
+            sources = spec.sources or (field,)
+            # 只有一个来源时一次 get 取值；多个来源时依次回退，最后一个来源带默认值
+            if len(sources) == 1:
+                head.append(f"    {target} = get({sources[0]!r}, {spec.default!r}).strip()")
+            else:
+                head.append(f"    {target} = get({sources[0]!r})")
+                for i, source in enumerate(sources[1:], 1):
+                    default = f', {spec.default!r}' if i == len(sources) - 1 else ''
+                    head.append(f"    if {target} is None:")
+                    head.append(f"        {target} = get({source!r}{default})")
+                head.append(f"    {target} = {target}.strip()")
+            if spec.transform is not None:
+                namespace[f'_transform_{field}'] = spec.transform
+                head.append(f"    if {target}:")
+                head.append(f"        {target} = _transform_{field}({target})")
+
+        source = f"def {name}(entry, author, title, label):\n" + '\n'.join(head + body) + '\n'
+        exec(compile(source, f'<style {name}>', 'exec'), namespace)
+        render = namespace[name]
+        render.source = source
+        return render
+
+
+class CitationStyle:
+    """
+    一种著录样式：文献类型 -> 模板、类型标识、字段取值规则与作者姓名写法
+    模板在构造时编译，render() 只做一次字典查找与一次函数调用
+    """
+
+    def __init__(self, name: str, templates: Dict[str, Template], kinds: Dict[str, str],
+                 labels: Dict[str, str], default_label: str, fields: Dict[str, Field],
+                 format_name: Callable[[str, Sequence[str]], str],
+                 join_names: Callable[[List[str]], str],
+                 default_kind: str = 'generic'):
+        self.name = name
+        self.kinds = kinds
+        self.labels = labels
+        self.default_label = default_label
+        self.default_kind = default_kind
+        self.format_name = format_name
+        self.join_names = join_names
+        self.templates = templates
+        self._renderers = {kind: template.compile(fields, f'render_{name}_{kind}')
+                           for kind, template in templates.items()}
+        # 条目类型 -> (渲染函数, 类型标识)，渲染时只查一次表
+        self._dispatch = {entry_type: (self._renderers[kinds.get(entry_type, default_kind)],
+                                       labels.get(entry_type, default_label))
+                          for entry_type in set(kinds) | set(labels)}
+        self._fallback = (self._renderers[default_kind], default_label)
+
+    def render(self, entry, author: str, title: str) -> str:
+        """按条目的 type 选择模板渲染；author 为已按本样式格式化的作者串"""
+        return self.render_as(entry.get('type', 'misc'), entry, author, title)
+
+    def render_as(self, entry_type: str, entry, author: str, title: str) -> str:
+        """按指定的条目类型渲染（忽略 entry 中的 type）"""
+        renderer, label = self._dispatch.get(entry_type) or self._fallback
+        return renderer(entry, author, title, label)
+
+    def plan(self, entry_type: str) -> Tuple[Callable, str]:
+        """条目类型对应的 (渲染函数, 类型标识)；渲染函数签名为 (entry, author, title, label)"""
+        return self._dispatch.get(entry_type) or self._fallback
+
+    def format_authors(self, names: Iterable[Tuple[str, Sequence[str]]]) -> str:
+        """由 (姓, 名首字母) 列表生成作者串"""
+        return self.join_names([self.format_name(surname, initials) for surname, initials in names])
+
+    def __repr__(self) -> str:
+        return f"CitationStyle({self.name!r})"
+
+
+PAGES_PREFIX_RE = re.compile(r'^p\.?\s*(?:p\.?\s*)?', re.IGNORECASE)
+
+
+def normalize_pages(pages: str) -> str:
+    """去掉 p./pp. 前缀，-- 改为 -"""
+    if pages[0] in 'pP':
+        pages = PAGES_PREFIX_RE.sub('', pages)
+    return pages.replace('--', '-')
+
+
+def en_dash_pages(pages: str) -> str:
+    return normalize_pages(pages).replace('-', '–')
+
+
+def ordinal_edition(edition: str) -> str:
+    """纯数字的版次写成英文序数（3 -> 3rd），其余原样返回"""
+    if not edition.isdigit():
+        return edition
+    n = int(edition)
+    suffix = 'th' if 10 <= n % 100 <= 20 else {1: 'st', 2: 'nd', 3: 'rd'}.get(n % 10, 'th')
+    return f"{n}{suffix}"
+
+
+# 各样式共用的字段取值规则
+BASE_FIELDS = {
+    'container': Field('journal', 'booktitle'),
+    'number': Field('number', 'issue'),
+    'address': Field('address', 'location'),
+    'school': Field('school', 'university'),
+    'urldate': Field('urldate', 'note'),
+}
+
+# 条目类型 -> 模板类别
+KINDS = {
+    'article': 'journal',
+    'proceedings': 'journal',
+    'inproceedings': 'conference',
+    'book': 'book',
+    'inbook': 'book',
+    'incollection': 'book',
+    'phdthesis': 'thesis',
+    'mastersthesis': 'thesis',
+    'thesis': 'thesis',
+    'online': 'electronic',
+    'misc': 'electronic',
+    'www': 'electronic',
+}
+
+
+# ---------------- GB/T 7714-2015 ----------------
+
+def _gbt_name(surname: str, initials: Sequence[str]) -> str:
+    surname = surname.upper()
+    return f"{surname} {' '.join(initials)}" if initials else surname
+
+
+def _gbt_join(names: List[str]) -> str:
+    # 超过三人时只列前三位
+    if len(names) > 3:
+        return ', '.join(names[:3]) + ', et al.'
+    return ', '.join(names)
+
+
+_GBT_TAIL = (
+    If('year', ', {year}', If('volume', ', {volume}', If('number', '({number})'))),
+    If('pages', ': {pages}'),
+    '.',
+)
+
+GBT7714 = CitationStyle(
+    'gbt7714',
+    templates={
+        'journal': Template('{author}. {title}[{label}]. {container}', *_GBT_TAIL,
+                            fields={'pages': Field('pages', transform=normalize_pages)}),
+        'conference': Template('{author}. {title}[{label}]//{container}', If('publisher', '. {publisher}'),
+                               *_GBT_TAIL, fields={'pages': Field('pages', transform=normalize_pages)}),
+        'book': Template('{author}. {title}[{label}]', If('edition', '. {edition}版'),
+                         '. {address}: {publisher}', If('year', ', {year}'), If('pages', ': {pages}'), '.',
+                         fields={'address': Field('address', 'location', default='出版地不详')}),
+        'thesis': Template('{author}. {title}[{label}]. {address}: {school}, {year}.',
+                           fields={'address': Field('address', 'location', default='地点不详')}),
+        'electronic': Template('{author}. {title}[{label}]', If('url', '. {url}'), If('year', ', {year}'),
+                               If('urldate', ' ({urldate})'), '.'),
+        'generic': Template('{author}. {title}[{label}]', If('container', '. {container}'),
+                            If('year', ', {year}'), '.'),
+    },
+    kinds=KINDS,
+    labels={
+        'article': 'J',
+        'inproceedings': 'C',
+        'proceedings': 'C',
+        'book': 'M',
+        'inbook': 'M',
+        'incollection': 'M',
+        'phdthesis': 'D',
+        'mastersthesis': 'D',
+        'thesis': 'D',
+        'techreport': 'R',
+        'manual': 'R',
+        'misc': 'EB/OL',
+        'online': 'EB/OL',
+        'www': 'EB/OL',
+        'patent': 'P',
+        'standard': 'S',
+    },
+    default_label='EB/OL',
+    fields=BASE_FIELDS,
+    format_name=_gbt_name,
+    join_names=_gbt_join,
+)
+
+
+# ---------------- APA 7 ----------------
+
+def _apa_name(surname: str, initials: Sequence[str]) -> str:
+    return f"{surname}, {' '.join(i + '.' for i in initials)}" if initials else surname
+
+
+def _apa_join(names: List[str]) -> str:
+    # 最多列 20 位；更多时列前 19 位、省略号与最后一位
+    if len(names) <= 1:
+        return ''.join(names)
+    if len(names) > 20:
+        return ', '.join(names[:19]) + ', . . . ' + names[-1]
+    return ', '.join(names[:-1]) + ', & ' + names[-1]
+
+
+_APA_HEAD = (If('author', '{author} '), If('year', '({year}).', otherwise=('(n.d.).',)))
+
+APA = CitationStyle(
+    'apa',
+    templates={
+        'journal': Template(*_APA_HEAD, ' {title}.',
+                            If('container', ' {container}', If('volume', ', {volume}', If('number', '({number})')),
+                               If('pages', ', {pages}'), '.')),
+        'conference': Template(*_APA_HEAD, ' {title}.', If('container', ' In {container}',
+                                                         If('pages', ' (pp. {pages})'), '.'),
+                               If('publisher', ' {publisher}.')),
+        'book': Template(*_APA_HEAD, ' {title}', If('edition', ' ({edition} ed.)'), '.',
+                         If('publisher', ' {publisher}.')),
+        'thesis': Template(*_APA_HEAD, ' {title} [{label}', If('school', ', {school}'), '].'),
+        'electronic': Template(*_APA_HEAD, ' {title}.', If('url', ' {url}')),
+        'generic': Template(*_APA_HEAD, ' {title}.', If('container', ' {container}.')),
+    },
+    kinds=KINDS,
+    labels={
+        'phdthesis': 'Doctoral dissertation',
+        'mastersthesis': "Master's thesis",
+    },
+    default_label='Thesis',
+    fields=dict(BASE_FIELDS, pages=Field('pages', transform=en_dash_pages),
+                edition=Field('edition', transform=ordinal_edition)),
+    format_name=_apa_name,
+    join_names=_apa_join,
+)
+
+
+# ---------------- IEEE ----------------
+
+def _ieee_name(surname: str, initials: Sequence[str]) -> str:
+    return f"{' '.join(i + '.' for i in initials)} {surname}" if initials else surname
+
+
+def _ieee_join(names: List[str]) -> str:
+    # 超过六人时只列第一位
+    if len(names) > 6:
+        return names[0] + ' et al.'
+    if len(names) <= 2:
+        return ' and '.join(names)
+    return ', '.join(names[:-1]) + ', and ' + names[-1]
+
+
+_IEEE_AUTHOR = If('author', '{author}, ')
+
+IEEE = CitationStyle(
+    'ieee',
+    templates={
+        'journal': Template(_IEEE_AUTHOR, '"{title},"', If('container', ' {container}'),
+                            If('volume', ', vol. {volume}'), If('number', ', no. {number}'),
+                            If('pages', ', pp. {pages}'), If('year', ', {year}'), '.'),
+        'conference': Template(_IEEE_AUTHOR, '"{title},"', If('container', ' in {container}'),
+                               If('address', ', {address}'), If('year', ', {year}'),
+                               If('pages', ', pp. {pages}'), '.'),
+        'book': Template(_IEEE_AUTHOR, '{title}', If('edition', ', {edition} ed'), '.',
+                         If('publisher', If('address', ' {address}:'), ' {publisher}', If('year', ', {year}'), '.',
+                            otherwise=(If('year', ' {year}.'),))),
+        'thesis': Template(_IEEE_AUTHOR, '"{title}," {label}', If('school', ', {school}'),
+                           If('address', ', {address}'), If('year', ', {year}'), '.'),
+        'electronic': Template(_IEEE_AUTHOR, '{title}.', If('year', ' {year}.'),
+                               If('url', ' [Online]. Available: {url}')),
+        # 后面还有内容时逗号写在引号内："Title," Container, 2020.
+        'generic': Template(_IEEE_AUTHOR, '"{title}',
+                            If('container', '," {container}', If('year', ', {year}'), '.',
+                               otherwise=(If('year', '," {year}.', otherwise=('."',)),))),
+    },
+    kinds=KINDS,
+    labels={
+        'phdthesis': 'Ph.D. dissertation',
+        'mastersthesis': 'M.S. thesis',
+    },
+    default_label='Thesis',
+    fields=dict(BASE_FIELDS, pages=Field('pages', transform=en_dash_pages),
+                edition=Field('edition', transform=ordinal_edition)),
+    format_name=_ieee_name,
+    join_names=_ieee_join,
+)
+
+
+STYLES = {style.name: style for style in (GBT7714, APA, IEEE)}
+
+
+def get_style(name: str) -> CitationStyle:
+    """按名称获取样式"""
+    style = STYLES.get(name)
+    if style is None:
+        raise ValueError(f"不支持的著录样式：{name}（可选：{', '.join(STYLES)}）")
+    return style
@@ -0,0 +1,295 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+CSV/Excel 解析结果的列式缓存（data_visualize.py 使用）
+每个输入文件对应缓存目录下的一个子目录（以绝对路径的哈希命名）：
+- schema.json：源文件路径、修改时间、大小、行数与各列的名称、类型、文件名
+- c<i>.bin：每列一个原始二进制文件，读取时以 np.memmap 映射，只有访问到的页才从磁盘读入
+- c<i>.json：字符串列的取值表（列文件中保存 int32 编码，-1 表示缺失）
+缓存可以只含部分列（流式读取只缓存所需的列，取值过多的字符串列不缓存），请求未缓存的列时视为未命中
+源文件的修改时间或大小变化时视为未命中并重建；缓存总大小超过上限时按最近使用时间淘汰，单个文件的缓存超过上限时不写入
+"""
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+
+def check_columns(columns: Iterable, available: Iterable):
+    """请求的列不在 available 中时抛出 ValueError"""
+    available = set(available)
+    missing = [name for name in columns if name not in available]
+    if missing:
+        raise ValueError(f"列不存在：{', '.join(map(str, missing))}")
+
+
+class ColumnCache:
+    """按文件缓存解析后的列；load() 命中时返回由内存映射列组成的 DataFrame"""
+
+    # 缓存格式版本；修改列文件或 schema 的格式时递增，使旧缓存失效
+    VERSION = '2'
+    DEFAULT_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'academic-assistant', 'columns')
+    # 超出上限时按最近使用时间淘汰整个文件的缓存
+    MAX_BYTES = 2 * 1024 ** 3
+    SCHEMA = 'schema.json'
+
+    def __init__(self, root: str = DEFAULT_DIR, max_bytes: int = MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, path: str) -> str:
+        digest = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=12).hexdigest()
+        return os.path.join(self.root, digest)
+
+    @staticmethod
+    def signature(path: str) -> Dict:
+        st = os.stat(path)
+        return {'source': os.path.abspath(path), 'mtime_ns': st.st_mtime_ns, 'size': st.st_size}
+
+    def lookup(self, path: str) -> Optional[Dict]:
+        """返回与源文件一致的 schema 并刷新其使用时间；不存在或已过期时返回 None"""
+        schema_path = os.path.join(self.entry_dir(path), self.SCHEMA)
+        try:
+            with open(schema_path, 'r', encoding='utf-8') as f:
+                schema = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if schema.get('version') != self.VERSION or any(
+                schema.get(key) != value for key, value in self.signature(path).items()):
+            return None
+        os.utime(schema_path)
+        return schema
+
+    def load(self, pd, path: str, columns: Optional[List] = None):
+        """
+        命中时返回只含 columns（默认全部列，按文件中的顺序）的 DataFrame，数值列直接引用内存映射，不复制
+        未命中（含请求的列未被缓存）时返回 None；请求的列在源文件中不存在时抛出 ValueError
+        """
+        schema = self.lookup(path)
+        if schema is None:
+            return None
+        specs = schema['columns']
+        names = {spec['name'] for spec in specs}
+        if columns is None:
+            if schema['partial']:
+                return None
+        else:
+            if schema['partial'] and not names.issuperset(columns):
+                check_columns(columns, schema['header'])
+                return None
+            check_columns(columns, names)
+            specs = [spec for spec in specs if spec['name'] in columns]
+        directory = self.entry_dir(path)
+        rows = schema['rows']
+        data = {}
+        for spec in specs:
+            file = os.path.join(directory, spec['file'])
+            if spec['kind'] == 'array':
+                data[spec['name']] = self._map(file, spec['dtype'], rows)
+                continue
+            with open(file[:-len('.bin')] + '.json', 'r', encoding='utf-8') as f:
+                categories = pd.Index(json.load(f), dtype=object)
+            codes = self._map(file, '<i4', rows)
+            data[spec['name']] = pd.Series(pd.Categorical.from_codes(codes, categories=categories)).astype(spec['dtype'])
+        return pd.DataFrame(data, copy=False)
+
+    @staticmethod
+    def _map(file: str, dtype: str, rows: int) -> np.ndarray:
+        if rows == 0:
+            return np.empty(0, dtype=dtype)
+        # 以普通 ndarray 视图交给 pandas，底层仍是同一段内存映射
+        return np.memmap(file, dtype=np.dtype(dtype), mode='r', shape=(rows,)).view(np.ndarray)
+
+    def writer(self, path: str, header: Optional[List] = None) -> 'ColumnWriter':
+        """header 为源文件的全部列名，仅在分块只含部分列时需要（用于判断请求的列是否存在）"""
+        return ColumnWriter(self, path, header)
+
+    def store(self, pd, path: str, df, header: Optional[List] = None) -> bool:
+        """缓存一个读入的 DataFrame（header 见 writer()）；列类型不支持或超过缓存上限时返回 False"""
+        writer = self.writer(path, header)
+        try:
+            writer.append(pd, df)
+        except TypeError:
+            writer.abort()
+            return False
+        except BaseException:
+            writer.abort()
+            raise
+        return writer.commit()
+
+    def evict(self, keep: Optional[str] = None):
+        """缓存总大小超过上限时删除最久未使用的文件缓存（keep 指定的目录除外，除非它本身就超过上限）"""
+        if not os.path.isdir(self.root):
+            return
+        entries = []
+        total = 0
+        for name in os.listdir(self.root):
+            directory = os.path.join(self.root, name)
+            schema_path = os.path.join(directory, self.SCHEMA)
+            if not os.path.isfile(schema_path):
+                continue
+            size = sum(entry.stat().st_size for entry in os.scandir(directory) if entry.is_file())
+            entries.append((os.stat(schema_path).st_mtime, size, directory))
+            total += size
+        entries.sort()
+        for _, size, directory in entries:
+            if total <= self.max_bytes:
+                break
+            if directory == keep and size <= self.max_bytes:
+                continue
+            shutil.rmtree(directory, ignore_errors=True)
+            total -= size
+
+
+class ColumnWriter:
+    """
+    逐块追加 DataFrame 并在 commit() 时原子地替换旧缓存
+    后续分块的数值类型可以提升（如 int64 → float64），已写入的数据随之转换；其他类型变化抛出 TypeError
+    已写入的数据超过缓存上限时也抛出 TypeError（该文件不缓存）
+    字符串列的不同取值超过 MAX_CATEGORIES 个时放弃该列（取值表常驻内存），其余列照常缓存
+    """
+
+    # 能直接按原始字节保存的 NumPy 类型：布尔、整数、浮点、复数、时间差、无时区的日期时间
+    ARRAY_KINDS = 'biufcmM'
+    # 字符串列取值表的大小上限
+    MAX_CATEGORIES = 100_000
+
+    def __init__(self, cache: ColumnCache, path: str, header: Optional[List] = None):
+        self.cache = cache
+        self.path = path
+        self.header = header
+        self.bytes = 0
+        self.target = cache.entry_dir(path)
+        self.signature = cache.signature(path)
+        self.tmp = f"{self.target}.tmp{os.getpid()}"
+        shutil.rmtree(self.tmp, ignore_errors=True)
+        os.makedirs(self.tmp)
+        self.rows = 0
+        self.specs = None
+        self._files = []
+        self._codes = []
+
+    def append(self, pd, df):
+        if self.specs is None:
+            self._start(pd, df)
+        if len(df.columns) != len(self.specs):
+            raise TypeError("分块的列数不一致")
+        for i, spec in enumerate(self.specs):
+            series = df.iloc[:, i]
+            if spec['kind'] == 'array':
+                values = self._array_values(i, series)
+            elif spec['kind'] == 'category':
+                values = self._category_codes(pd, i, series)
+                if len(self._codes[i]) > self.MAX_CATEGORIES:
+                    self._drop(i)
+                    continue
+            else:
+                continue
+            values.tofile(self._files[i])
+            self.bytes += values.nbytes
+        self.rows += len(df)
+        if self.bytes > self.cache.max_bytes:
+            raise TypeError("数据超过缓存上限")
+
+    def _start(self, pd, df):
+        self.specs = []
+        for i, name in enumerate(df.columns):
+            if not isinstance(name, (str, int, float)):
+                raise TypeError(f"列名 {name!r} 不支持缓存")
+            dtype = df.dtypes.iloc[i]
+            if isinstance(dtype, np.dtype) and dtype.kind in self.ARRAY_KINDS:
+                spec = {'name': name, 'kind': 'array', 'dtype': dtype.str}
+            elif pd.api.types.infer_dtype(df.iloc[:, i], skipna=True) in ('string', 'empty'):
+                spec = {'name': name, 'kind': 'category', 'dtype': str(dtype)}
+            else:
+                raise TypeError(f"列 {name} 的类型 {dtype} 不支持缓存")
+            spec['file'] = f"c{i}.bin"
+            self.specs.append(spec)
+            self._files.append(open(os.path.join(self.tmp, spec['file']), 'wb'))
+            self._codes.append({})
+
+    def _array_values(self, i: int, series) -> np.ndarray:
+        spec = self.specs[i]
+        dtype = series.dtype
+        if not isinstance(dtype, np.dtype) or dtype.kind not in self.ARRAY_KINDS:
+            raise TypeError(f"列 {spec['name']} 的类型在分块间不一致")
+        old = np.dtype(spec['dtype'])
+        if dtype != old:
+            new = np.result_type(old, dtype)
+            if new != old:
+                self._rewrite(i, old, new)
+        return np.ascontiguousarray(series.to_numpy(), dtype=np.dtype(spec['dtype']))
+
+    def _rewrite(self, i: int, old: np.dtype, new: np.dtype):
+        """把已写入的列数据提升为新类型"""
+        spec = self.specs[i]
+        file = os.path.join(self.tmp, spec['file'])
+        self._files[i].close()
+        values = np.fromfile(file, dtype=old).astype(new)
+        self._files[i] = open(file, 'wb')
+        values.tofile(self._files[i])
+        spec['dtype'] = new.str
+
+    def _drop(self, i: int):
+        """放弃第 i 列：删除已写入的数据，之后的分块跳过该列"""
+        spec = self.specs[i]
+        self._files[i].close()
+        file = os.path.join(self.tmp, spec['file'])
+        self.bytes -= os.path.getsize(file)
+        os.remove(file)
+        self._codes[i] = {}
+        spec['kind'] = 'dropped'
+
+    def _category_codes(self, pd, i: int, series) -> np.ndarray:
+        """把字符串列编码为 int32，取值表在各分块间共享；整块缺失时（分块读取会推断为浮点）全部编码为 -1"""
+        if series.isna().all():
+            return np.full(len(series), -1, dtype=np.int32)
+        if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+            raise TypeError(f"列 {self.specs[i]['name']} 的类型在分块间不一致")
+        local, uniques = pd.factorize(series)
+        mapping = self._codes[i]
+        table = np.array([mapping.setdefault(value, len(mapping)) for value in uniques] + [-1],
+                         dtype=np.int32)
+        # 缺失值的局部编码为 -1，正好取到表末尾的 -1
+        return table[local]
+
+    def commit(self) -> bool:
+        """写入 schema 并替换旧缓存；读取期间源文件被修改或缓存超过上限时放弃并返回 False"""
+        for f in self._files:
+            f.close()
+        try:
+            if self.cache.signature(self.path) != self.signature:
+                self.abort()
+                return False
+            specs = self.specs or []
+            for i, spec in enumerate(specs):
+                if spec['kind'] == 'category':
+                    with open(os.path.join(self.tmp, f"c{i}.json"), 'w', encoding='utf-8') as f:
+                        json.dump(list(self._codes[i]), f, ensure_ascii=False)
+            kept = [spec for spec in specs if spec['kind'] != 'dropped']
+            header = self.header if self.header is not None else [spec['name'] for spec in specs]
+            schema = {'version': self.cache.VERSION, **self.signature, 'rows': self.rows,
+                      'columns': kept, 'header': header, 'partial': len(kept) < len(header),
+                      'created': int(time.time())}
+            with open(os.path.join(self.tmp, self.cache.SCHEMA), 'w', encoding='utf-8') as f:
+                json.dump(schema, f, ensure_ascii=False)
+            if sum(entry.stat().st_size for entry in os.scandir(self.tmp)) > self.cache.max_bytes:
+                self.abort()
+                return False
+            shutil.rmtree(self.target, ignore_errors=True)
+            os.replace(self.tmp, self.target)
+        except BaseException:
+            self.abort()
+            raise
+        self.cache.evict(keep=self.target)
+        return True
+
+    def abort(self):
+        for f in self._files:
+            f.close()
+        shutil.rmtree(self.tmp, ignore_errors=True)
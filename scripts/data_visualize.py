@@ -3,94 +3,454 @@
 """
 实验数据可视化脚本
 支持 CSV/Excel 文件生成常见图表
+折线图与散点图的点数超过 --max-points 时自动降采样（见 downsample.py）；
+--stream 模式只分块读取 --x/--y 两列，内存与绘图耗时只与目标点数有关，适合千万行级的训练日志
+--batch 模式按规格文件一次生成多张图表（见 chart_batch.py）
+读取的数据默认缓存为内存映射的列文件（见 data_cache.py），再次绘制同一文件时不再重新解析
+--aggregate 模式按键列流式分组汇总多次运行的结果，绘制均值曲线与置信带（见 aggregate.py）
 """
 
 import argparse
 import sys
+import time
+
+# 流式模式每个分块的行数
+CHUNK_SIZE = 1_000_000
+# 折线图/散点图的默认目标点数
+MAX_POINTS = 5000
+CHART_TYPES = ('line', 'bar', 'scatter', 'heatmap', 'box')
+
+
+def is_excel(path: str) -> bool:
+    return path.endswith('.xlsx') or path.endswith('.xls')
+
+
+def parse_table(pd, path: str, columns=None):
+    """解析 CSV/Excel 文件，columns 为 None 时读取全部列"""
+    if is_excel(path):
+        return pd.read_excel(path, usecols=columns)
+    return pd.read_csv(path, usecols=columns)
+
+
+def read_table(pd, path: str, columns=None, cache=None, cache_all: bool = True):
+    """
+    读取数据文件并打印缓存情况；提供 cache（data_cache.ColumnCache）时优先映射缓存的列，
+    未命中时解析全部列（cache_all 为 False 时只解析所需的列）并写入缓存，再返回所需的列
+    请求的列不存在时抛出 ValueError
+    """
+    if cache is None:
+        return parse_table(pd, path, columns)
+    from data_cache import check_columns
+    
+    start = time.perf_counter()
+    df = cache.load(pd, path, columns)
+    if df is not None:
+        print(f"⚡ 缓存命中：映射 {len(df.columns)} 列（{time.perf_counter() - start:.2f} 秒）")
+        return df
+    header = None
+    if cache_all or columns is None:
+        df = parse_table(pd, path)
+        if columns is not None:
+            check_columns(columns, df.columns)
+    else:
+        header = list(read_header(pd, path))
+        check_columns(columns, header)
+        df = parse_table(pd, path, columns)
+    parsed = time.perf_counter()
+    try:
+        stored = cache.store(pd, path, df, header)
+    except OSError as e:
+        print(f"  ⚠ 写入缓存失败：{e}")
+    else:
+        report_cache_miss(parsed - start, stored, time.perf_counter() - parsed)
+    return df if columns is None else df[columns]
+
+
+def read_header(pd, path: str):
+    """只读取表头，返回列名"""
+    if is_excel(path):
+        return pd.read_excel(path, nrows=0).columns
+    return pd.read_csv(path, nrows=0).columns
+
+
+def report_cache_miss(parse_seconds: float, stored: bool, store_seconds=None):
+    """store_seconds 为 None 表示边读边写缓存，写入耗时已计入解析耗时"""
+    if not stored:
+        print(f"  缓存未命中：解析 {parse_seconds:.2f} 秒（列类型不支持缓存、超过缓存上限或文件在读取期间被修改，未写入）")
+    elif store_seconds is None:
+        print(f"  缓存未命中：分块解析并写入缓存 {parse_seconds:.2f} 秒")
+    else:
+        print(f"  缓存未命中：解析 {parse_seconds:.2f} 秒，写入缓存 {store_seconds:.2f} 秒")
+
+
+def iter_column_chunks(pd, path: str, columns, chunk_size: int = CHUNK_SIZE, cache=None):
+    """
+    分块读取指定列，逐块产出 DataFrame；Excel 不支持分块读取，只读取所需列后整体产出
+    缓存命中时按块切分内存映射的列；未命中时分块读取所需的列，边产出边追加到缓存（只缓存这些列）
+    """
+    if is_excel(path):
+        yield read_table(pd, path, columns, cache, cache_all=False)
+        return
+    if cache is None:
+        yield from pd.read_csv(path, usecols=columns, chunksize=chunk_size)
+        return
+    
+    start = time.perf_counter()
+    df = cache.load(pd, path, columns)
+    if df is not None:
+        print(f"⚡ 缓存命中：映射 {len(df.columns)} 列（{time.perf_counter() - start:.2f} 秒）")
+        for offset in range(0, len(df), chunk_size):
+            yield df.iloc[offset:offset + chunk_size]
+        return
+    
+    header = None
+    if columns is not None:
+        from data_cache import check_columns
+        header = list(read_header(pd, path))
+        check_columns(columns, header)
+    try:
+        writer = cache.writer(path, header)
+    except OSError as e:
+        print(f"  ⚠ 写入缓存失败：{e}")
+        writer = None
+    stored = False
+    try:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunk_size):
+            if writer is not None:
+                try:
+                    writer.append(pd, chunk)
+                except TypeError:
+                    writer.abort()
+                    writer = None
+            yield chunk if columns is None else chunk[columns]
+        if writer is not None:
+            stored = writer.commit()
+            writer = None
+    finally:
+        if writer is not None:
+            writer.abort()
+    report_cache_miss(time.perf_counter() - start, stored)
+
+
+def stream_series(pd, path: str, x, y: str, kind: str, max_points: int, method: str,
+                  chunk_size: int = CHUNK_SIZE, cache=None):
+    """
+    流式读取 (x, y) 两列并逐块降采样，返回 (x 数组, y 数组, 读取行数, 分块数)
+    未指定 x 时以行号为横轴；无法转换为数值的行被丢弃
+    """
+    import numpy as np
+    from downsample import StreamingDownsampler
+    
+    sampler = StreamingDownsampler(max_points, method, kind)
+    columns = [y] if x is None else [x, y]
+    rows = chunks = 0
+    for chunk in iter_column_chunks(pd, path, columns, chunk_size, cache):
+        ys = pd.to_numeric(chunk[y], errors='coerce').to_numpy(dtype=float)
+        if x is None:
+            xs = np.arange(rows, rows + len(chunk), dtype=float)
+        else:
+            xs = pd.to_numeric(chunk[x], errors='coerce').to_numpy(dtype=float)
+        sampler.add(xs, ys)
+        rows += len(chunk)
+        chunks += 1
+    xs, ys = sampler.result()
+    return xs, ys, rows, chunks
+
+
+def stream_correlation(pd, path: str, chunk_size: int = CHUNK_SIZE, cache=None):
+    """
+    流式计算数值列（由第一块确定）的相关矩阵，返回 (矩阵, 列名, 读取行数, 分块数)
+    内存只与列数的平方和分块大小有关；之后分块中无法转换为数值的值按缺失处理
+    """
+    import numpy as np
+    from correlation import BLOCK_ROWS, CorrelationAccumulator, numeric_columns
+    
+    names = accumulator = None
+    rows = chunks = 0
+    for chunk in iter_column_chunks(pd, path, None, chunk_size, cache):
+        if names is None:
+            names = numeric_columns(chunk)
+            if not names:
+                raise ValueError("没有数值列，无法绘制热力图")
+            accumulator = CorrelationAccumulator(len(names))
+        for start in range(0, len(chunk), BLOCK_ROWS):
+            part = chunk.iloc[start:start + BLOCK_ROWS]
+            block = np.empty((len(part), len(names)))
+            for j, name in enumerate(names):
+                block[:, j] = pd.to_numeric(part[name], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+            accumulator.add(block)
+        rows += len(chunk)
+        chunks += 1
+    if accumulator is None:
+        raise ValueError("数据为空，无法绘制热力图")
+    return accumulator.result(), names, rows, chunks
+
+
+def aggregate_series(pd, path: str, keys, y: str, chunk_size: int = CHUNK_SIZE, cache=None):
+    """流式读取键列与 y 列并逐块累加分组统计，返回 aggregate.GroupAccumulator"""
+    from aggregate import GroupAccumulator
+    
+    accumulator = GroupAccumulator(keys, y)
+    for chunk in iter_column_chunks(pd, path, list(dict.fromkeys([*keys, y])), chunk_size, cache):
+        accumulator.add(pd, chunk)
+    return accumulator
+
+
+def heatmap_matrix(df, sample: int = 0, top_k: int = 0, cluster: bool = False):
+    """数值列的相关矩阵（可只用 sample 行），按 top_k 筛选、按聚类排序，返回 (矩阵, 列名)"""
+    from correlation import correlation, select_columns
+    
+    corr, names = correlation(df, sample)
+    if not names:
+        raise ValueError("没有数值列，无法绘制热力图")
+    return select_columns(corr, names, top_k, cluster)
+
+
+def downsample_frame(pd, df, x: str, y: str, kind: str, max_points: int, method: str):
+    """对已读入的数据降采样，返回保留的行；横轴不是数值时按行号计算，绘图仍用原横轴的值"""
+    if max_points <= 0 or len(df) <= max_points:
+        return df
+    import numpy as np
+    from downsample import grid_indices, lttb_indices, minmax_indices
+    
+    ys = pd.to_numeric(df[y], errors='coerce').to_numpy(dtype=float)
+    xs = pd.to_numeric(df[x], errors='coerce').to_numpy(dtype=float)
+    if np.isnan(xs).all():
+        xs = np.arange(len(df), dtype=float)
+    valid = np.flatnonzero(np.isfinite(xs) & np.isfinite(ys))
+    xs, ys = xs[valid], ys[valid]
+    if kind == 'scatter':
+        side = int(max_points ** 0.5)
+        idx = grid_indices(xs, ys, side, side)
+    elif method == 'minmax':
+        idx = minmax_indices(ys, max((max_points - 4) // 2, 1))
+    else:
+        idx = lttb_indices(xs, ys, max_points)
+    return df.iloc[valid[idx]]
+
+
+def setup_pyplot():
+    """切换到 Agg 后端（只输出图片文件，不需要图形界面）并设置中文字体，返回 pyplot"""
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot as plt
+    
+    plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
+    plt.rcParams['axes.unicode_minus'] = False
+    return plt
+
+
+def draw_chart(plt, df, kind: str, output: str, x=None, y=None, title=None, corr=None):
+    """
+    绘制一张图表并保存到 output，保存后关闭图形以释放内存
+    热力图可传入预先算好的 corr = (相关矩阵, 列名)，否则由 df 的数值列计算
+    """
+    fig, ax = plt.subplots(figsize=(10, 6))
+    try:
+        if kind == 'line':
+            if x and y:
+                ax.plot(df[x], df[y], marker='o')
+                ax.set_xlabel(x)
+                ax.set_ylabel(y)
+            else:
+                df.plot(ax=ax, marker='o')
+            ax.set_title(title or '趋势图')
+        
+        elif kind == 'bar':
+            if x and y:
+                ax.bar(df[x], df[y])
+                ax.set_xlabel(x)
+                ax.set_ylabel(y)
+            else:
+                df.plot(kind='bar', ax=ax)
+            ax.set_title(title or '柱状图')
+            plt.xticks(rotation=45)
+        
+        elif kind == 'scatter':
+            if not (x and y):
+                raise ValueError("散点图需要指定 --x 和 --y 参数")
+            ax.scatter(df[x], df[y])
+            ax.set_xlabel(x)
+            ax.set_ylabel(y)
+            ax.set_title(title or '散点图')
+        
+        elif kind == 'heatmap':
+            from correlation import plot_heatmap
+            plot_heatmap(ax, *(corr or heatmap_matrix(df)), title)
+        
+        elif kind == 'box':
+            df.plot(kind='box', ax=ax)
+            ax.set_title(title or '箱线图')
+            plt.xticks(rotation=45)
+        
+        plt.tight_layout()
+        plt.savefig(output, dpi=150, bbox_inches='tight')
+    finally:
+        plt.close(fig)
 
 
 def main():
     parser = argparse.ArgumentParser(description='实验数据可视化工具')
-    parser.add_argument('--input', '-i', type=str, required=True, help='输入数据文件 (CSV/Excel)')
+    parser.add_argument('--input', '-i', type=str, help='输入数据文件 (CSV/Excel)')
     parser.add_argument('--type', '-t', type=str, default='line',
-                       choices=['line', 'bar', 'scatter', 'heatmap', 'box'],
+                       choices=CHART_TYPES,
                        help='图表类型')
     parser.add_argument('--output', '-o', type=str, default='output.png', help='输出文件路径')
     parser.add_argument('--x', type=str, help='X 轴列名')
     parser.add_argument('--y', type=str, help='Y 轴列名')
+    parser.add_argument('--stream', action='store_true',
+                       help='流式模式：只分块读取 --x/--y 列并逐块降采样（line / scatter），'
+                            '或逐块累加相关矩阵（heatmap），适合超大文件')
+    parser.add_argument('--max-points', type=int, default=MAX_POINTS,
+                       help=f'折线图/散点图的目标点数，超过时降采样（默认 {MAX_POINTS}，0 表示不降采样）')
+    parser.add_argument('--downsample', choices=['lttb', 'minmax'], default='lttb',
+                       help='折线图降采样方法：lttb（默认，最接近原曲线）或 minmax（保留每段的最大最小值）')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                       help=f'流式模式每个分块的行数（默认 {CHUNK_SIZE}）')
+    parser.add_argument('--sample', type=int, default=0,
+                       help='热力图：只用随机抽取的 N 行计算相关矩阵（默认 0，使用全部行）')
+    parser.add_argument('--top-k', type=int, default=0,
+                       help='热力图：只显示与其他列相关性最强的 K 列（默认 0，显示全部数值列）')
+    parser.add_argument('--cluster', action='store_true',
+                       help='热力图：按层次聚类重排列顺序，相关的列相邻')
+    parser.add_argument('--aggregate', action='store_true',
+                       help='汇总模式：按 --x 与 --group 列分组，流式计算 --y 的均值、标准差与置信区间（折线图）')
+    parser.add_argument('--group', type=str,
+                       help='汇总模式的分组列，多个列用逗号分隔，每组画一条曲线（如 method 或 method,lr）')
+    parser.add_argument('--band', choices=['ci', 'std'], default='ci',
+                       help='汇总模式的区间：ci（默认，均值的置信区间）或 std（±1 个标准差）')
+    parser.add_argument('--confidence', type=float, default=0.95,
+                       help='汇总模式置信区间的置信水平（默认 0.95）')
+    parser.add_argument('--error-bars', action='store_true',
+                       help='汇总模式以误差棒代替阴影带')
+    parser.add_argument('--summary', type=str, metavar='CSV',
+                       help='汇总模式：另将分组统计表保存为 CSV')
+    parser.add_argument('--batch', type=str, metavar='SPEC',
+                       help='批量模式：按 JSON 规格文件生成多张图表，每个数据文件只读取一次')
+    parser.add_argument('--jobs', '-j', type=int, default=1,
+                       help='批量模式的绘图进程数（默认 1）')
+    parser.add_argument('--no-cache', action='store_true', help='不读写列式数据缓存')
+    parser.add_argument('--cache-dir', type=str, help='列式数据缓存目录（默认 ~/.cache/academic-assistant/columns）')
+    parser.add_argument('--cache-limit', type=int, default=2048,
+                       help='列式数据缓存的总大小上限，单位 MB，超出时淘汰最久未用的文件（默认 2048）')
     
     args = parser.parse_args()
+    if not args.batch and not args.input:
+        parser.error('需要 --input 或 --batch')
     
     # 检查依赖
     try:
         import pandas as pd
-        import matplotlib.pyplot as plt
+        plt = setup_pyplot()
     except ImportError as e:
         print(f"错误：缺少依赖库，请运行：pip install pandas matplotlib openpyxl")
         print(f"详情：{e}")
         sys.exit(1)
     
-    # 设置中文字体
-    plt.rcParams['font.sans-serif'] = ['SimHei', 'Arial Unicode MS', 'DejaVu Sans']
-    plt.rcParams['axes.unicode_minus'] = False
+    cache = None
+    if not args.no_cache:
+        from data_cache import ColumnCache
+        cache = ColumnCache(args.cache_dir or ColumnCache.DEFAULT_DIR, args.cache_limit * 1024 ** 2)
+    
+    if args.batch:
+        from chart_batch import run_batch
+        sys.exit(0 if run_batch(pd, args.batch, args.jobs, cache) else 1)
+    
+    groups = [name.strip() for name in args.group.split(',') if name.strip()] if args.group else []
+    if args.aggregate:
+        if args.type != 'line' or not (args.x and args.y):
+            print("错误：汇总模式只支持折线图，需要 --x 和 --y")
+            sys.exit(1)
+        if not 0 < args.confidence < 1:
+            print("错误：--confidence 需要在 0 与 1 之间")
+            sys.exit(1)
+    
+    if args.stream and args.type != 'heatmap':
+        if args.type not in ('line', 'scatter') or not args.y or (args.type == 'scatter' and not args.x):
+            print("错误：流式模式只支持折线图（需 --y，可选 --x）、散点图（需 --x 和 --y）与热力图")
+            sys.exit(1)
+        if args.max_points <= 0:
+            print("错误：流式模式需要正的 --max-points")
+            sys.exit(1)
     
     try:
+        start = time.perf_counter()
+        if args.aggregate:
+            from aggregate import plot_bands
+            
+            accumulator = aggregate_series(pd, args.input, [args.x, *groups], args.y, args.chunk_size, cache)
+            table = accumulator.result(pd, args.confidence)
+            print(f"✓ 流式汇总 {accumulator.rows} 行，{len(table)} 个分组，用时 {time.perf_counter() - start:.2f} 秒")
+            if args.summary:
+                table.to_csv(args.summary, index=False)
+                print(f"✓ 分组统计已保存至：{args.summary}")
+            
+            fig, ax = plt.subplots(figsize=(10, 6))
+            plot_bands(ax, table, args.x, groups, args.band, args.error_bars, args.max_points, args.y)
+            band = f"{args.confidence:.0%} 置信区间" if args.band == 'ci' else '±1 标准差'
+            ax.set_title(f'趋势图（均值，{band}）')
+            ax.set_xlabel(args.x)
+            ax.set_ylabel(args.y)
+            plt.tight_layout()
+            plt.savefig(args.output, dpi=150, bbox_inches='tight')
+            plt.close(fig)
+            print(f"✓ 图表已保存至：{args.output}（总用时 {time.perf_counter() - start:.2f} 秒）")
+            return
+        
+        if args.stream and args.type == 'heatmap':
+            from correlation import select_columns
+            
+            corr, names, rows, chunks = stream_correlation(pd, args.input, args.chunk_size, cache)
+            corr = select_columns(corr, names, args.top_k, args.cluster)
+            print(f"✓ 流式读取 {rows} 行（{chunks} 块），计算 {len(names)} 个数值列的相关矩阵，"
+                  f"用时 {time.perf_counter() - start:.2f} 秒")
+            draw_chart(plt, None, 'heatmap', args.output, corr=corr)
+            print(f"✓ 图表已保存至：{args.output}（总用时 {time.perf_counter() - start:.2f} 秒）")
+            return
+        
+        if args.stream:
+            xs, ys, rows, chunks = stream_series(pd, args.input, args.x, args.y, args.type,
+                                                 args.max_points, args.downsample, args.chunk_size, cache)
+            print(f"✓ 流式读取 {rows} 行（{chunks} 块），降采样至 {len(xs)} 点，"
+                  f"用时 {time.perf_counter() - start:.2f} 秒")
+            
+            fig, ax = plt.subplots(figsize=(10, 6))
+            if args.type == 'line':
+                ax.plot(xs, ys, linewidth=1)
+                ax.set_title('趋势图')
+            else:
+                ax.scatter(xs, ys, s=4)
+                ax.set_title('散点图')
+            ax.set_xlabel(args.x or '行号')
+            ax.set_ylabel(args.y)
+            plt.tight_layout()
+            plt.savefig(args.output, dpi=150, bbox_inches='tight')
+            plt.close(fig)
+            print(f"✓ 图表已保存至：{args.output}（总用时 {time.perf_counter() - start:.2f} 秒）")
+            return
+        
         # 读取数据
-        if args.input.endswith('.xlsx') or args.input.endswith('.xls'):
-            df = pd.read_excel(args.input)
-        else:
-            df = pd.read_csv(args.input)
+        df = read_table(pd, args.input, cache=cache)
         
         print(f"✓ 成功读取数据：{len(df)} 行，{len(df.columns)} 列")
         print(f"  列名：{list(df.columns)}")
         
-        # 创建图表
-        fig, ax = plt.subplots(figsize=(10, 6))
+        if args.type in ('line', 'scatter') and args.x and args.y and len(df) > args.max_points > 0:
+            total = len(df)
+            df = downsample_frame(pd, df, args.x, args.y, args.type, args.max_points, args.downsample)
+            print(f"  已降采样：{total} → {len(df)} 点")
         
-        if args.type == 'line':
-            if args.x and args.y:
-                ax.plot(df[args.x], df[args.y], marker='o')
-                ax.set_xlabel(args.x)
-                ax.set_ylabel(args.y)
-            else:
-                df.plot(ax=ax, marker='o')
-            ax.set_title('趋势图')
-            
-        elif args.type == 'bar':
-            if args.x and args.y:
-                ax.bar(df[args.x], df[args.y])
-                ax.set_xlabel(args.x)
-                ax.set_ylabel(args.y)
-            else:
-                df.plot(kind='bar', ax=ax)
-            ax.set_title('柱状图')
-            plt.xticks(rotation=45)
-            
-        elif args.type == 'scatter':
-            if args.x and args.y:
-                ax.scatter(df[args.x], df[args.y])
-                ax.set_xlabel(args.x)
-                ax.set_ylabel(args.y)
-            else:
-                print("错误：散点图需要指定 --x 和 --y 参数")
-                sys.exit(1)
-            ax.set_title('散点图')
-            
-        elif args.type == 'heatmap':
-            import seaborn as sns
-            corr = df.corr()
-            sns.heatmap(corr, annot=True, cmap='coolwarm', ax=ax)
-            ax.set_title('相关性热力图')
-            
-        elif args.type == 'box':
-            df.plot(kind='box', ax=ax)
-            ax.set_title('箱线图')
-            plt.xticks(rotation=45)
+        corr = None
+        if args.type == 'heatmap':
+            computed = time.perf_counter()
+            corr = heatmap_matrix(df, args.sample, args.top_k, args.cluster)
+            print(f"  相关矩阵：{len(corr[1])} 列（{args.sample if 0 < args.sample < len(df) else len(df)} 行），"
+                  f"用时 {time.perf_counter() - computed:.2f} 秒")
         
-        plt.tight_layout()
-        plt.savefig(args.output, dpi=150, bbox_inches='tight')
+        # 创建图表
+        draw_chart(plt, df, args.type, args.output, args.x, args.y, corr=corr)
         print(f"✓ 图表已保存至：{args.output}")
-        
+    
     except FileNotFoundError:
         print(f"错误：文件不存在：{args.input}")
         sys.exit(1)
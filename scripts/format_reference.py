@@ -2,144 +2,143 @@
 # -*- coding: utf-8 -*-
 """
 参考文献格式化工具 - GB/T 7714-2015 标准
+著录格式与 bibtex_parser.py 共用 citation_styles 中的编译模板，也可选 APA、IEEE
 """
 
 import re
 import sys
 import argparse
-from typing import Dict, List
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from citation_styles import GBT7714, STYLES, get_style
 
 
 class ReferenceFormatter:
-    def __init__(self):
-        pass
+    # 字段标记表：字段 -> 标记（同一字段出现多个标记时按此顺序优先）
+    # 新增标记只需在此登记，识别与切分由 _parse_text 统一完成
+    FIELD_MARKERS = {
+        'author': ('作者：', '作者:', 'Authors:', 'Author:'),
+        'title': ('标题：', '标题:', '题名：', '题名:', 'Title:', '题目:'),
+        'journal': ('期刊：', '期刊:', '杂志：', 'Journal:', '来源:'),
+        'year': ('年份：', '年份:', '年:', 'Year:'),
+        'volume': ('卷：', '卷:', 'Volume:'),
+        'issue': ('期：', '期:', 'Number:'),
+        'pages': ('页码：', '页码:', '页:', 'Pages:'),
+        'publisher': ('出版社：', '出版社:', '出版者:', 'Publisher:'),
+        'school': ('学校：', '学校:', '单位:', 'School:', 'University:'),
+    }
+    
+    AUTHOR_SPLIT_RE = re.compile(r'[，,;；]')
+    # 含汉字的姓名整体输出，不缩写为首字母
+    CJK_RE = re.compile(r'[\u3400-\u9fff\uf900-\ufaff]')
+    # 字段值末尾需要清理的标点
+    TRAILING_PUNCT = '，,;:：'
+    
+    def __init__(self, markers: Optional[Dict[str, Iterable[str]]] = None, style: str = GBT7714.name):
+        """markers 可补充或覆盖 FIELD_MARKERS 中的字段标记；style 为著录样式名（见 citation_styles.STYLES）"""
+        self.style = get_style(style)
+        # 三种著录类型的渲染函数与类型标识，按样式预先取出
+        self._plans = {entry_type: self.style.plan(entry_type) for entry_type in ('article', 'thesis', 'book')}
+        table = dict(self.FIELD_MARKERS)
+        if markers:
+            table.update({field: tuple(values) for field, values in markers.items()})
+        self.field_markers = table
+        # 标记 -> (字段, 优先级)
+        self._marker_rank = {marker: (field, rank) for field, values in table.items()
+                             for rank, marker in enumerate(values)}
+        self._marker_re = re.compile(self._build_marker_pattern(self._marker_rank))
+    
+    @staticmethod
+    def _build_marker_pattern(markers: Iterable[str]) -> str:
+        """
+        将全部标记编译为一个按前缀树组织的多选正则（如 作者(?:：|:)|Author(?:s:|:)）
+        每个位置只需比较一次首字符，且总是匹配最长的标记
+        """
+        root = {}
+        for marker in markers:
+            node = root
+            for ch in marker:
+                node = node.setdefault(ch, {})
+            node[''] = {}
+        
+        def build(node: Dict) -> str:
+            alternatives = [re.escape(ch) + build(child) for ch, child in node.items() if ch]
+            if not alternatives:
+                return ''
+            if len(alternatives) == 1 and '' not in node:
+                return alternatives[0]
+            # 标记在此结束时追加空分支，放在最后以保证更长的标记优先
+            return '(?:' + '|'.join(alternatives) + ('|' if '' in node else '') + ')'
+        
+        return build(root)
     
     def parse_author(self, author_str: str) -> str:
         """解析作者姓名"""
         if not author_str:
             return ""
         
+        format_name = self.style.format_name
         authors = []
-        for author in re.split(r'[，,;；]', author_str):
+        for author in self.AUTHOR_SPLIT_RE.split(author_str):
             author = author.strip()
             if not author:
                 continue
             
-            if re.match(r'^[\u4e00-\u9fa5]+$', author):
-                authors.append(author)
+            # 纯 ASCII 的姓名不可能是中文名，省去一次正则匹配
+            if not author.isascii() and self.CJK_RE.search(author):
+                authors.append(format_name(''.join(author.split()), ()))
             else:
-                parts = author.strip().split()
-                if len(parts) >= 1:
-                    surname = parts[-1].upper().rstrip(',;:')
-                    given_names = ' '.join([p[0].upper() for p in parts[:-1] if p])
-                    if given_names:
-                        authors.append(f"{surname} {given_names}")
-                    else:
-                        authors.append(surname)
+                parts = author.split()
+                authors.append(format_name(parts[-1].rstrip(',;:'), [p[0].upper() for p in parts[:-1] if p]))
         
-        if len(authors) > 3:
-            return ', '.join(authors[:3]) + ', et al.'
-        return ', '.join(authors)
+        return self.style.join_names(authors)
     
-    def format_journal(self, data: Dict) -> str:
+    def _format(self, data: Dict, entry_type: str) -> str:
         author = self.parse_author(data.get('author', ''))
         title = data.get('title', '').strip()
-        journal = data.get('journal', '').strip()
-        year = data.get('year', '').strip()
-        volume = data.get('volume', '').strip()
-        issue = data.get('issue', '').strip()
-        pages = data.get('pages', '').strip()
         
         if not author and not title:
             return ""
         
-        result = f"{author}. {title}[J]. {journal}"
-        if year:
-            result += f", {year}"
-            if volume:
-                if issue:
-                    result += f", {volume}({issue})"
-                else:
-                    result += f", {volume}"
-        if pages:
-            result += f": {pages}"
-        result += "."
-        return result
+        render, label = self._plans[entry_type]
+        return render(data, author, title, label)
+    
+    def format_journal(self, data: Dict) -> str:
+        return self._format(data, 'article')
     
     def format_thesis(self, data: Dict) -> str:
-        author = self.parse_author(data.get('author', ''))
-        title = data.get('title', '').strip()
-        school = data.get('school', '').strip()
-        location = data.get('location', '未知地点').strip()
-        year = data.get('year', '').strip()
-        
-        if not author and not title:
-            return ""
-        
-        return f"{author}. {title}[D]. {location}: {school}, {year}."
+        return self._format(data if 'location' in data else dict(data, location='未知地点'), 'thesis')
     
     def format_book(self, data: Dict) -> str:
-        author = self.parse_author(data.get('author', ''))
-        title = data.get('title', '').strip()
-        publisher = data.get('publisher', '').strip()
-        location = data.get('location', '未知地点').strip()
-        year = data.get('year', '').strip()
-        
-        if not author and not title:
-            return ""
-        
-        result = f"{author}. {title}[M]. {location}: {publisher}"
-        if year:
-            result += f", {year}"
-        result += "."
-        return result
-    
-    def _extract_field(self, text: str, markers: List[str], next_markers: List[str] = None) -> str:
-        """提取字段值"""
-        for marker in markers:
-            idx = text.find(marker)
-            if idx != -1:
-                start = idx + len(marker)
-                # 找到下一个标记的位置
-                end = len(text)
-                if next_markers:
-                    for nm in next_markers:
-                        nm_idx = text.find(nm, start)
-                        if nm_idx != -1 and nm_idx < end:
-                            end = nm_idx
-                
-                value = text[start:end].strip()
-                # 清理末尾的标点
-                value = re.sub(r'[，,;:：]+$', '', value)
-                if value:
-                    return value
-        return ""
+        return self._format(data if 'location' in data else dict(data, location='未知地点'), 'book')
+    
+    def _scan_markers(self, text: str) -> Dict[str, Tuple[int, int]]:
+        """
+        一次扫描找出所有字段标记，按位置切分
+        返回 {标记: (值起点, 值终点)}，同一标记只取第一次出现；值终点为下一个任意标记的起点
+        """
+        matches = [(m.group(), m.start(), m.end()) for m in self._marker_re.finditer(text)]
+        spans = {}
+        for i, (marker, _, end) in enumerate(matches):
+            if marker not in spans:
+                spans[marker] = (end, matches[i + 1][1] if i + 1 < len(matches) else len(text))
+        return spans
     
     def _parse_text(self, text: str) -> Dict:
-        """解析文本"""
-        data = {}
-        
-        # 定义字段标记
-        author_markers = ['作者：', '作者:', 'Authors:', 'Author:']
-        title_markers = ['标题：', '标题:', '题名：', '题名:', 'Title:', '题目:']
-        journal_markers = ['期刊：', '期刊:', '杂志：', 'Journal:', '来源:']
-        year_markers = ['年份：', '年份:', '年:', 'Year:']
-        volume_markers = ['卷：', '卷:', 'Volume:']
-        issue_markers = ['期：', '期:', 'Number:']
-        pages_markers = ['页码：', '页码:', '页:', 'Pages:']
-        publisher_markers = ['出版社：', '出版社:', '出版者:', 'Publisher:']
-        school_markers = ['学校：', '学校:', '单位:', 'School:', 'University:']
-        
-        data['author'] = self._extract_field(text, author_markers, title_markers)
-        data['title'] = self._extract_field(text, title_markers, journal_markers)
-        data['journal'] = self._extract_field(text, journal_markers, year_markers)
-        data['year'] = self._extract_field(text, year_markers, volume_markers)
-        data['volume'] = self._extract_field(text, volume_markers, issue_markers)
-        data['issue'] = self._extract_field(text, issue_markers, pages_markers)
-        data['pages'] = self._extract_field(text, pages_markers)
-        data['publisher'] = self._extract_field(text, publisher_markers, year_markers)
-        data['school'] = self._extract_field(text, school_markers, year_markers)
-        
+        """解析文本：先定位全部标记，再按字段的标记优先级取第一个非空值"""
+        data = dict.fromkeys(self.field_markers, '')
+        ranks = {}  # 字段 -> 已取值标记的优先级
+        for marker, (start, end) in self._scan_markers(text).items():
+            field, rank = self._marker_rank[marker]
+            if field in ranks and ranks[field] < rank:
+                continue
+            # 清理末尾的标点
+            value = text[start:end].strip().rstrip(self.TRAILING_PUNCT)
+            if value:
+                data[field] = value
+                ranks[field] = rank
         return data
     
     def format_reference(self, text: str) -> str:
@@ -152,24 +151,108 @@ class ReferenceFormatter:
             return self.format_book(data)
         else:
             return self.format_journal(data)
+    
+    # 批量模式下每个分块的默认行数
+    CHUNK_SIZE = 1000
+    
+    def format_lines(self, lines: Iterable[str], jobs: int = 1,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[Tuple[int, str, str]]:
+        """
+        批量格式化，按输入顺序流式产出 (行号, 结果, 错误信息)，空行跳过
+        输入按 chunk_size 行分块；jobs > 1 时分块在进程池中处理，同时在途的分块数受限
+        """
+        chunks = self._iter_chunks(lines, max(chunk_size, 1))
+        if jobs <= 1:
+            for first_lineno, chunk in chunks:
+                yield from _format_chunk(first_lineno, chunk, self)
+            return
+        
+        with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                 initargs=(self.field_markers, self.style.name)) as executor:
+            pending = deque()
+            for first_lineno, chunk in chunks:
+                pending.append(executor.submit(_format_chunk, first_lineno, chunk))
+                if len(pending) >= jobs * 2:
+                    yield from pending.popleft().result()
+            while pending:
+                yield from pending.popleft().result()
+    
+    @staticmethod
+    def _iter_chunks(lines: Iterable[str], chunk_size: int) -> Iterator[Tuple[int, List[str]]]:
+        """产出 (首行行号, 行列表)，行号从 1 开始"""
+        chunk = []
+        first_lineno = 1
+        for lineno, line in enumerate(lines, 1):
+            if not chunk:
+                first_lineno = lineno
+            chunk.append(line)
+            if len(chunk) >= chunk_size:
+                yield first_lineno, chunk
+                chunk = []
+        if chunk:
+            yield first_lineno, chunk
+
+
+# 进程池工作进程内常驻的格式化器
+_worker_formatter = None
+
+
+def _init_worker(markers: Dict[str, Tuple[str, ...]], style: str = GBT7714.name):
+    global _worker_formatter
+    _worker_formatter = ReferenceFormatter(markers, style)
+
+
+def _format_chunk(first_lineno: int, lines: List[str],
+                  formatter: Optional[ReferenceFormatter] = None) -> List[Tuple[int, str, str]]:
+    """格式化一个分块，返回非空行的 (行号, 结果, 错误信息)；无法格式化的行结果为空并附带原因"""
+    formatter = formatter or _worker_formatter
+    results = []
+    for lineno, line in enumerate(lines, first_lineno):
+        text = line.strip()
+        if not text:
+            continue
+        try:
+            result = formatter.format_reference(text)
+        except Exception as e:
+            results.append((lineno, '', f"格式化失败：{e}"))
+            continue
+        if result:
+            results.append((lineno, result, ''))
+        else:
+            results.append((lineno, '', '未识别到作者或标题'))
+    return results
 
 
 def main():
     parser = argparse.ArgumentParser(description='参考文献格式化工具')
     parser.add_argument('--input', '-i', type=str, help='输入文献信息')
-    parser.add_argument('--file', '-f', type=str, help='输入文件')
+    parser.add_argument('--file', '-f', type=str, help='输入文件，每行一条文献（- 表示标准输入）')
+    parser.add_argument('--jobs', '-j', type=int, default=1, help='批量模式的并行进程数（默认 1，即串行）')
+    parser.add_argument('--chunk-size', type=int, default=ReferenceFormatter.CHUNK_SIZE,
+                        help=f'批量模式每个分块的行数（默认 {ReferenceFormatter.CHUNK_SIZE}）')
+    parser.add_argument('--style', '-s', choices=list(STYLES), default=GBT7714.name,
+                        help='著录样式：gbt7714（默认），apa，ieee')
     
     args = parser.parse_args()
     
-    formatter = ReferenceFormatter()
+    formatter = ReferenceFormatter(style=args.style)
     
     if args.file:
-        with open(args.file, 'r', encoding='utf-8') as f:
-            for line in f:
-                if line.strip():
-                    result = formatter.format_reference(line.strip())
-                    if result:
-                        print(result)
+        f = sys.stdin if args.file == '-' else open(args.file, 'r', encoding='utf-8')
+        total = failed = 0
+        try:
+            for lineno, result, error in formatter.format_lines(f, args.jobs, args.chunk_size):
+                total += 1
+                if error:
+                    failed += 1
+                    print(f"⚠️ 第 {lineno} 行：{error}", file=sys.stderr)
+                else:
+                    print(result)
+        finally:
+            if f is not sys.stdin:
+                f.close()
+        if failed:
+            print(f"📊 共 {total} 条，成功 {total - failed} 条，失败 {failed} 条", file=sys.stderr)
     elif args.input:
         result = formatter.format_reference(args.input)
         print(result)
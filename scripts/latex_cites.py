@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LaTeX 引用扫描
+从主文件出发，跟随 \\input / \\include 找出全部 .tex 文件，收集 \\cite、\\citep、\\citet 中的引用键，
+按首次引用的先后（即正文展开后的顺序）排列，供顺序编码制参考文献表使用
+各文件相互独立地扫描（可在进程池中并行），最后按包含关系在主进程中拼出全文顺序
+"""
+
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Tuple
+
+
+class CitationScanner:
+    """
+    引用键扫描器
+    - 注释（% 到行尾）与 comment 环境中的命令被忽略
+    - 同一文件被多次包含时只在第一次展开，包含关系成环时不会重复展开
+    """
+
+    CITE_COMMANDS = ('cite', 'citep', 'citet')
+    INCLUDE_COMMANDS = ('input', 'include')
+
+    # 一次扫描识别注释、comment 环境、引用命令（可带 * 与最多两个可选参数）与文件包含命令
+    # 其他反斜杠命令只吞掉紧随的一个字符，使 \% 不被当作注释、\\% 仍是注释（比逐位置的后行断言快约一倍）
+    TOKEN_RE = re.compile(
+        r'%[^\n]*'
+        r'|\\begin\{comment\}.*?\\end\{comment\}'
+        r'|\\(?:(' + '|'.join(CITE_COMMANDS) + r')\*?\s*(?:\[[^\]]*\]\s*){0,2}\{([^}]*)\}'
+        r'|(' + '|'.join(INCLUDE_COMMANDS) + r')\s*\{([^}]+)\}'
+        r'|.)',
+        re.DOTALL)
+
+    def __init__(self, jobs: int = 1):
+        self.jobs = jobs
+        self.files = []         # 按展开顺序排列的已扫描文件
+        self.locations = {}     # 引用键 -> (文件, 行号)，首次引用的位置
+        self.errors = []
+
+    def scan(self, main_path: str) -> List[str]:
+        """扫描主文件及其包含的文件，返回按首次引用顺序去重的引用键"""
+        self.files, self.locations, self.errors = [], {}, []
+        root = os.path.dirname(os.path.abspath(main_path))
+        main_path = os.path.abspath(main_path)
+        events = self._scan_all(main_path, root)
+
+        # 按包含关系深度优先展开；每个文件只展开一次
+        citekeys = {}
+        visited = set()
+        stack = [iter([('input', main_path, 0, '')])]
+        while stack:
+            event = next(stack[-1], None)
+            if event is None:
+                stack.pop()
+                continue
+            kind, value, line, path = event
+            if kind == 'cite':
+                if value not in citekeys:
+                    citekeys[value] = None
+                    self.locations[value] = (path, line)
+            elif value not in visited:
+                visited.add(value)
+                file_events = events.get(value)
+                if file_events is not None:
+                    self.files.append(value)
+                    stack.append(iter(file_events))
+        return list(citekeys)
+
+    def _scan_all(self, main_path: str, root: str) -> Dict[str, List[Tuple]]:
+        """按包含层次逐批扫描所有可达文件，返回 {文件: 事件列表}；jobs > 1 时每批在进程池中并行"""
+        events = {}
+        pending = [main_path]
+        executor = ProcessPoolExecutor(max_workers=self.jobs) if self.jobs > 1 else None
+        try:
+            while pending:
+                if executor is not None and len(pending) > 1:
+                    results = executor.map(_scan_file, pending, [root] * len(pending))
+                else:
+                    results = (_scan_file(path, root) for path in pending)
+                found = []
+                for path, (file_events, error) in zip(pending, results):
+                    if error:
+                        self.errors.append(error)
+                        continue
+                    events[path] = file_events
+                    found.extend(value for kind, value, _, _ in file_events if kind == 'input')
+                pending = list(dict.fromkeys(path for path in found if path not in events))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        return events
+
+    @staticmethod
+    def resolve(name: str, command: str, root: str) -> str:
+        """按 LaTeX 的规则解析被包含文件的路径：相对于主文件目录，\\include 与无扩展名的 \\input 补 .tex"""
+        path = os.path.join(root, name.strip())
+        if command == 'include' or not os.path.splitext(path)[1]:
+            path += '.tex'
+        return os.path.normpath(path)
+
+
+def _scan_file(path: str, root: str) -> Tuple[List[Tuple[str, str, int, str]], str]:
+    """
+    扫描单个文件，返回 (事件列表, 错误信息)
+    事件为 ('cite', 引用键, 行号, 文件) 或 ('input', 被包含文件的绝对路径, 行号, 文件)，按出现顺序排列
+    """
+    try:
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            text = f.read()
+    except OSError as e:
+        return [], f"警告：无法读取 {path}（{e.strerror or e}）"
+
+    events = []
+    line, last = 1, 0
+    for m in CitationScanner.TOKEN_RE.finditer(text):
+        cite, keys, command, name = m.groups()
+        if cite is None and command is None:
+            continue
+        line += text.count('\n', last, m.start())
+        last = m.start()
+        if cite is not None:
+            events.extend(('cite', key.strip(), line, path) for key in keys.split(',') if key.strip())
+        else:
+            events.append(('input', CitationScanner.resolve(name, command, root), line, path))
+    return events, ''
+
+
+def missing_keys(citekeys: List[str], entries: List[Dict]) -> List[str]:
+    """按引用顺序列出 .bib 中找不到的引用键"""
+    found = {entry.get('citekey', '') for entry in entries}
+    return [key for key in citekeys if key not in found]
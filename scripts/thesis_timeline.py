@@ -5,6 +5,7 @@
 根据答辩日期倒推各阶段时间节点
 """
 
+import sys
 import argparse
 from datetime import datetime, timedelta
 from typing import Dict, List